@@ -30,6 +30,14 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
+# Point the Twilio client at another host, e.g. the load-test fake world; empty uses api.twilio.com
+TWILIO_API_BASE_URL = config('TWILIO_API_BASE_URL', default='')
+
+# Chatbot upstreams: SerpAPI web search, then OpenAI. OPENAI_BASE_URL empty uses api.openai.com
+SERPAPI_URL = config('SERPAPI_URL', default='https://serpapi.com/search.json')
+SERPAPI_API_KEY = config('SERPAPI_API_KEY', default='YOUR_SERPAPI_KEY')
+OPENAI_API_KEY = config('OPENAI_API_KEY', default='OPENAI_API_KEY')
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='') or None
 
 # Validate Twilio settings
 if DEBUG:
@@ -45,6 +53,7 @@ ALLOWED_HOSTS = ['*']  # For development. In production, specify your domain
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',  # ASGI runserver with WebSocket support; must come before staticfiles
     'userauth.apps.UserauthConfig',  # Must come before django.contrib.auth
     'django.contrib.admin',
     'django.contrib.auth',
@@ -61,6 +70,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'predictor.query_budget.QueryBudgetMiddleware',  # first, so it counts every query of a request; DEBUG only
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +99,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "food_price_project.wsgi.application"
+ASGI_APPLICATION = "food_price_project.asgi.application"
 
 
 # Database
@@ -144,6 +155,106 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Speech recording uploads
+SPEECH_MAX_UPLOAD_SIZE = config('SPEECH_MAX_UPLOAD_SIZE', default=25 * 1024 * 1024, cast=int)  # bytes
+SPEECH_MAX_RECORDING_SECONDS = config('SPEECH_MAX_RECORDING_SECONDS', default=30 * 60, cast=int)
+SPEECH_UPLOAD_CHUNK_SIZE = config('SPEECH_UPLOAD_CHUNK_SIZE', default=1024 * 1024, cast=int)  # bytes
+
+# Where recordings are kept. Use 'speech_analysis.storage.S3RecordingStorage' with
+# OPTIONS like {'bucket': ..., 'endpoint_url': ...} for S3 or a local stand-in such as MinIO.
+SPEECH_RECORDING_STORAGE = {
+    'BACKEND': config('SPEECH_RECORDING_STORAGE_BACKEND', default='speech_analysis.storage.LocalRecordingStorage'),
+    'OPTIONS': {},
+}
+if config('SPEECH_RECORDING_S3_BUCKET', default=''):
+    SPEECH_RECORDING_STORAGE['OPTIONS'] = {
+        'bucket': config('SPEECH_RECORDING_S3_BUCKET'),
+        'endpoint_url': config('SPEECH_RECORDING_S3_ENDPOINT_URL', default=None),
+    }
+SPEECH_RECORDING_CODEC = config('SPEECH_RECORDING_CODEC', default='opus')  # 'opus', 'flac' or 'original'
+SPEECH_RECORDING_BITRATE = config('SPEECH_RECORDING_BITRATE', default='32k')
+
+# Community price reports: most rows accepted in one bulk ingestion request
+COMMUNITY_BULK_MAX_ROWS = config('COMMUNITY_BULK_MAX_ROWS', default=20000, cast=int)
+
+# Predictions older than this many days are moved to monthly Parquet files by
+# `manage.py archive_predictions`; the API and CSV export still read them from there
+PREDICTION_HOT_DAYS = config('PREDICTION_HOT_DAYS', default=90, cast=int)
+PREDICTION_ARCHIVE_DIR = config('PREDICTION_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive', 'predictions'))
+
+# Predictions and their SHAP explanations are cached per input (seconds); keys include the model version
+# (per process by default; set CACHE_BACKEND/CACHE_LOCATION to share it, e.g. with Redis)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='food-price-predictor'),
+    }
+}
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=100000, cast=int)}
+PREDICTION_CACHE_TIMEOUT = config('PREDICTION_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+EXPLANATION_BATCH_MAX_ROWS = config('EXPLANATION_BATCH_MAX_ROWS', default=5000, cast=int)
+# Largest acceptable cached single-prediction explanation time as a fraction of inference time. Only the cached
+# path is checked (by benchmark_explanations); uncached TreeSHAP timings are reported, not budgeted.
+EXPLANATION_OVERHEAD_BUDGET = config('EXPLANATION_OVERHEAD_BUDGET', default=0.25, cast=float)
+
+# Household basket pricing: values for the model features a basket item does not set itself,
+# and how long (seconds) a market's predicted price table is reused before it is rebuilt
+BASKET_FEATURE_DEFAULTS = {
+    'Unit_Quantity': 1,
+    'Pricetype': 'Retail',
+    'Priceflag': 'actual',
+    'Currency(USD)': config('BASKET_CURRENCY_USD', default=129.0, cast=float),
+    'Inflation Rate': config('BASKET_INFLATION_RATE', default=4.1, cast=float),
+}
+BASKET_PRICE_TABLE_TIMEOUT = config('BASKET_PRICE_TABLE_TIMEOUT', default=6 * 60 * 60, cast=int)
+
+# The trained price model, an XGBRegressor saved with joblib. It is deployed with the site rather than kept in git.
+PREDICTION_MODEL_PATH = config('PREDICTION_MODEL_PATH',
+                               default=os.path.join(BASE_DIR, 'predictor', 'models', 'final_model3_top10.pkl'))
+# Tests run against a small model trained on synthetic prices instead (predictor/test_runner.py)
+TEST_RUNNER = 'predictor.test_runner.SyntheticModelTestRunner'
+
+# Optional inference server (`manage.py inference_server`): with INFERENCE_SOCKET set, web workers send
+# predictions to it over this Unix socket instead of loading the model. The server batches requests that
+# arrive within INFERENCE_BATCH_WINDOW_MS of each other, up to INFERENCE_BATCH_MAX_ROWS rows per model call.
+INFERENCE_SOCKET = config('INFERENCE_SOCKET', default='')
+INFERENCE_TIMEOUT = config('INFERENCE_TIMEOUT', default=5.0, cast=float)  # seconds, then predict locally
+INFERENCE_BATCH_WINDOW_MS = config('INFERENCE_BATCH_WINDOW_MS', default=2.0, cast=float)
+INFERENCE_BATCH_MAX_ROWS = config('INFERENCE_BATCH_MAX_ROWS', default=512, cast=int)
+
+# How the loaded model is run (predictor/model_backends.py): 'estimator' (XGBRegressor.predict), 'booster'
+# (Booster.inplace_predict), 'numpy' (trees flattened into NumPy arrays) or 'native' (numpy for small
+# batches, booster for large ones). All give identical predictions; `manage.py benchmark_inference` times them.
+MODEL_BACKEND = config('MODEL_BACKEND', default='native')
+
+# Seasonality profiles (`manage.py compute_seasonality`, nightly): prices needed per commodity/region/month
+SEASONALITY_MIN_OBSERVATIONS = config('SEASONALITY_MIN_OBSERVATIONS', default=3, cast=int)
+
+# Largest ?page_size= the predictions API serves (the default page is REST_FRAMEWORK PAGE_SIZE)
+PREDICTION_API_MAX_PAGE_SIZE = config('PREDICTION_API_MAX_PAGE_SIZE', default=5000, cast=int)
+
+# Conditional GET (ETag/304) on polled per-user JSON endpoints. Writes bump a version token in the default
+# cache, which every worker must share to see them, so this is on by default only with a shared CACHE_BACKEND.
+# Turn it on with the per-process LocMem cache only when a single process serves requests.
+CONDITIONAL_GET = config('CONDITIONAL_GET', cast=bool,
+                         default=not CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache')))
+
+# Sliding-window rate limits per client (user, else IP) as "requests/period" (s, min, hour, day);
+# an empty rate turns a scope off. Counters live in the default cache: use Redis or memcached to share
+# them between workers (the database cache's incr() is not atomic).
+THROTTLE_RATES = {
+    'prediction': config('THROTTLE_PREDICTION_RATE', default='30/min'),  # prediction form submissions
+    'prediction_api': config('THROTTLE_PREDICTION_API_RATE', default='120/min'),  # predictions, explanations, baskets
+    'chatbot': config('THROTTLE_CHATBOT_RATE', default='10/min'),  # calls paid search and OpenAI APIs
+}
+# Only behind a proxy that sets X-Forwarded-For; otherwise clients could pick their own bucket
+THROTTLE_TRUST_FORWARDED_FOR = config('THROTTLE_TRUST_FORWARDED_FOR', default=False, cast=bool)
+
+# Warm each web worker up (model, explainer, speech analysis JIT) on a background thread as it boots;
+# /ready answers 503 until that finishes. Turn off to warm lazily on the first /ready probe instead.
+WARMUP_ON_START = config('WARMUP_ON_START', default=True, cast=bool)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -155,9 +266,9 @@ LOGOUT_REDIRECT_URL = 'login'
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_USE_SSL = False
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
@@ -168,6 +279,8 @@ EMAIL_SUBJECT_PREFIX = '[Food Price Predictor] '
 # Security settings for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
+    # Load balancers probe workers over plain HTTP
+    SECURE_REDIRECT_EXEMPT = [r'^ready/?$']
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_BROWSER_XSS_FILTER = True
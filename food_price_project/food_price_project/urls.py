@@ -17,10 +17,11 @@ Including another URLconf
 # food_price_project/urls.py
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
+from predictor.views import ready
 
 def root_redirect(request):
     if request.user.is_authenticated:
@@ -30,6 +31,7 @@ def root_redirect(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', root_redirect, name='root'),
+    re_path(r'^ready/?$', ready, name='ready'),  # Load balancer readiness probe
     path('predictor/', include('predictor.urls')),  # Include predictor URLs under /predictor/
     path('accounts/', include('userauth.urls')),  # Include userauth URLs
     path('speech/', include('speech_analysis.urls')),  # Include speech analysis URLs
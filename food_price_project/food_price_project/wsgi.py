@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "food_price_project.settings")
 
 application = get_wsgi_application()
+
+from django.conf import settings
+from predictor.warmup import start_warmup
+
+if settings.WARMUP_ON_START:
+    start_warmup()
@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for production: gunicorn -c gunicorn.conf.py
+
+Workers serve the ASGI application (HTTP and the live speech WebSockets)
+under uvicorn. With PRELOAD_APP on, the default, the master imports the
+application and warms it up once, then forks the workers. They start ready
+and share the model, imported libraries and JIT-compiled code with the
+master copy-on-write. `manage.py benchmark_worker_memory` measures the
+difference.
+"""
+import os
+
+# Gunicorn reads every module-level name as a setting, and `config` is one of them
+import decouple
+
+wsgi_app = 'food_price_project.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+bind = decouple.config('BIND', default='0.0.0.0:8000')
+workers = decouple.config('WEB_CONCURRENCY', default=4, cast=int)
+timeout = decouple.config('GUNICORN_TIMEOUT', default=120, cast=int)
+preload_app = decouple.config('PRELOAD_APP', default=True, cast=bool)
+accesslog = '-'
+
+if preload_app:
+    # The master warms up in when_ready; a warm-up thread started while importing the app would not survive the fork
+    os.environ['WARMUP_ON_START'] = 'False'
+
+
+def when_ready(server):
+    # Runs in the master after the application is imported and before any worker is forked
+    if preload_app:
+        from predictor.warmup import preload
+        state = preload()
+        server.log.info(f"Preloaded before forking workers: {state['status']} {state['steps']} {state['error'] or ''}")
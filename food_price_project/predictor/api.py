@@ -1,15 +1,31 @@
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.decorators import parser_classes, throttle_classes
+from rest_framework.parsers import BaseParser, JSONParser, MultiPartParser
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
 from .models import Prediction
-from .serializers import PredictionSerializer, UserSerializer
+from .serializers import PredictionSerializer, UserSerializer, prediction_read_plan
+from .renderers import FastJSONRenderer
+from .ingest import ingest_community_reports, BatchTooLarge
+from .archive import hot_cutoff, parse_date_range, predictions_for_user
+from .inference import MODEL_VERSION, encoders, encode_inputs, predict_prices
+from .explain import explain_predictions
+from .basket import default_basket, price_basket
+from .throttling import PredictionAPIThrottle
+from .conditional import conditional
+from .query_budget import query_budget
+from django.utils.decorators import method_decorator
 from django.core.mail import send_mail
 from django.conf import settings
 
+
 class UserRegistrationView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -24,6 +40,7 @@ class UserRegistrationView(APIView):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
 class UserLoginView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -40,16 +57,86 @@ class UserLoginView(APIView):
             })
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
+
+class PredictionPagination(PageNumberPagination):
+    """PAGE_SIZE rows per page unless the client asks for up to PREDICTION_API_MAX_PAGE_SIZE with ?page_size="""
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PREDICTION_API_MAX_PAGE_SIZE
+
+
 class PredictionViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [PredictionAPIThrottle]
     serializer_class = PredictionSerializer
+    pagination_class = PredictionPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def get_queryset(self):
-        return Prediction.objects.filter(user=self.request.user)
+        queryset = Prediction.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            start, end = parse_date_range(self.request.query_params)
+            if start is not None:
+                queryset = queryset.filter(timestamp__gte=start)
+            if end is not None:
+                queryset = queryset.filter(timestamp__lt=end)
+        return queryset
+
+    # Reads skip PredictionSerializer: rows come from values_list() and go through a precompiled
+    # field plan, which gives the same output several times faster on large pages. Clients that
+    # poll send back the ETag and get a 304 until one of their predictions changes.
+
+    @method_decorator(conditional('predictions', private=True, no_cache=True))
+    @method_decorator(query_budget(5))  # session, user, COUNT(*), the page; with the archive, rows in both
+    def list(self, request, *args, **kwargs):
+        """
+        Supports ?start=&end= (ISO dates), ?fields=prediction,timestamp for a subset
+        of fields and ?page_size= for larger pages. Archived predictions are included
+        with ?archived=1, or automatically when start is older than the hot window.
+        """
+        try:
+            start, end = parse_date_range(request.query_params)
+            plan = prediction_read_plan(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        include_archive = request.query_params.get('archived') in ('1', 'true')
+        if not (include_archive or (start is not None and start < hot_cutoff())):
+            rows = self.get_queryset().values_list(*plan.lookups)
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response(plan.from_tuples(page))
+            return Response(plan.from_tuples(rows))
+        predictions = predictions_for_user(request.user, start, end, include_archive=True)
+        page = self.paginate_queryset(predictions)
+        if page is not None:
+            return self.get_paginated_response(plan.from_instances(page))
+        return Response(plan.from_instances(predictions))
+
+    @method_decorator(conditional('predictions', private=True, no_cache=True))
+    @method_decorator(query_budget(3))
+    def retrieve(self, request, *args, **kwargs):
+        """Supports ?fields= like list"""
+        try:
+            plan = prediction_read_plan(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        row = get_object_or_404(self.get_queryset().values_list(*plan.lookups), pk=kwargs['pk'])
+        return Response(plan.from_tuples([row])[0])
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def explanation(self, request, pk=None):
+        """How much each input feature pushed this prediction up or down"""
+        prediction = self.get_object()
+        try:
+            features = encode_inputs([prediction.input_data])
+        except ValueError as e:
+            return Response({'error': f'Cannot explain this prediction: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'id': prediction.id, 'prediction': prediction.prediction, 'model_version': MODEL_VERSION,
+                         'explanation': explain_predictions(features)[0]})
+
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def contact_api(request):
@@ -70,4 +157,95 @@ def contact_api(request):
 
         return Response({'message': 'Message sent successfully'}, status=status.HTTP_200_OK)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CSVTextParser(BaseParser):
+    """Hands text/csv request bodies to the view as raw bytes"""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream.read()
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser, CSVTextParser, MultiPartParser])
+def bulk_community_reports(request):
+    """
+    Ingest a batch of community price reports: a JSON list (or {"reports": [...]}),
+    a text/csv body, or a CSV uploaded as the multipart field "file". Valid rows
+    are inserted together; the response lists every rejected row and why.
+    """
+    data = request.data
+    if request.content_type.startswith('multipart/'):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the CSV as the "file" field'}, status=status.HTTP_400_BAD_REQUEST)
+        data = upload.read()
+
+    try:
+        created, rejects = ingest_community_reports(request.user, data, encoders,
+                                                    max_rows=settings.COMMUNITY_BULK_MAX_ROWS)
+    except BatchTooLarge as e:
+        return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Could not read batch: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(
+        {'created': created, 'rejected': len(rejects), 'rejects': rejects},
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+    )
+
+
+@api_view(['POST'])
+@throttle_classes([PredictionAPIThrottle])
+def explain_batch(request):
+    """
+    Predict and explain a batch of inputs in one go: a JSON object of feature
+    values, a list of them, or {"inputs": [...]}. Inputs seen before are
+    answered from the cache.
+    """
+    inputs = request.data
+    if isinstance(inputs, dict):
+        inputs = inputs.get('inputs', [inputs])
+    if not isinstance(inputs, list) or not inputs or not all(isinstance(row, dict) for row in inputs):
+        return Response({'error': 'Expected an object of feature values, a list of them, or {"inputs": [...]}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if len(inputs) > settings.EXPLANATION_BATCH_MAX_ROWS:
+        return Response({'error': f'Batch has {len(inputs)} inputs; the limit is {settings.EXPLANATION_BATCH_MAX_ROWS}'},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    try:
+        features = encode_inputs(inputs)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = [
+        {'prediction': price, 'explanation': explanation}
+        for price, explanation in zip(predict_prices(features), explain_predictions(features))
+    ]
+    return Response({'model_version': MODEL_VERSION, 'results': results})
+
+
+@api_view(['POST'])
+@throttle_classes([PredictionAPIThrottle])
+def basket_price(request):
+    """
+    Price a household basket at a market: {"region", "county", "market",
+    "items": [{"commodity", "quantity"}, ...]}. Without items, a typical
+    monthly basket for "household_size" people (default 1) is priced.
+    """
+    data = request.data
+    if not isinstance(data, dict):
+        return Response({'error': 'Expected a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    items = data.get('items')
+    try:
+        if items is None:
+            items = default_basket(int(data.get('household_size', 1)))
+        elif not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ValueError('items must be a list of {"commodity", "quantity"} objects')
+        basket = price_basket(items, data.get('region'), data.get('county'), data.get('market'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(basket)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PredictorConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "predictor"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,329 @@
+import os
+import json
+import uuid
+import heapq
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Prediction
+
+# Predictions older than settings.PREDICTION_HOT_DAYS are moved out of the
+# database into zstd-compressed Parquet files, one directory per month:
+#   PREDICTION_ARCHIVE_DIR/year=2024/month=03/part-<first id>-<last id>.parquet
+# Reads go through pyarrow.dataset, which skips months outside the requested
+# date range without opening their files. Needs pyarrow.
+
+ARCHIVE_COLUMNS = ['id', 'user_id', 'timestamp', 'prediction', 'input_data']
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('prediction', pa.float64()),
+        ('input_data', pa.string()),  # JSON text
+    ])
+
+
+def hot_cutoff(now=None):
+    """Predictions made before this moment belong in the archive"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return now - datetime.timedelta(days=settings.PREDICTION_HOT_DAYS)
+
+
+def _write_part(rows, year, month):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = os.path.join(settings.PREDICTION_ARCHIVE_DIR, f"year={year}", f"month={month:02d}")
+    os.makedirs(directory, exist_ok=True)
+    # Named after its id range, so re-archiving the same rows overwrites instead of duplicating
+    path = os.path.join(directory, f"part-{rows[0][0]}-{rows[-1][0]}.parquet")
+    table = pa.Table.from_pydict({
+        'id': [row[0] for row in rows],
+        'user_id': [row[1] for row in rows],
+        'timestamp': [row[2] for row in rows],
+        'prediction': [row[3] for row in rows],
+        'input_data': [json.dumps(row[4]) for row in rows],
+    }, schema=_arrow_schema())
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_predictions(cutoff, batch_size=50000, dry_run=False):
+    """
+    Move predictions made before cutoff into the monthly Parquet archive.
+    Each batch is written to its own file before its rows are deleted, so an
+    interruption never loses data; at worst a row exists in both places,
+    and readers prefer the database copy. Returns {(year, month): rows moved}.
+    """
+    old = Prediction.objects.filter(timestamp__lt=cutoff)
+    months = (old.annotate(month=TruncMonth('timestamp', tzinfo=datetime.timezone.utc))
+              .values_list('month', flat=True).distinct().order_by('month'))
+    moved = {}
+    for month_start in months:
+        month_end = (month_start + datetime.timedelta(days=32)).replace(day=1)
+        in_month = old.filter(timestamp__gte=month_start, timestamp__lt=month_end).order_by('id')
+        key = (month_start.year, month_start.month)
+        if dry_run:
+            moved[key] = in_month.count()
+            continue
+        last_id = 0
+        while True:
+            rows = list(in_month.filter(id__gt=last_id)
+                        .values_list('id', 'user_id', 'timestamp', 'prediction', 'input_data')[:batch_size])
+            if not rows:
+                break
+            _write_part(rows, *key)
+            ids = [row[0] for row in rows]
+            with transaction.atomic():
+                # Also invalidates the owners' ETags (PredictionQuerySet.delete)
+                Prediction.objects.filter(id__in=ids).delete()
+            moved[key] = moved.get(key, 0) + len(rows)
+            last_id = ids[-1]
+    return moved
+
+
+def _month_filter(ds, start, end):
+    """Partition filter keeping only the months that overlap [start, end)"""
+    expression = None
+    if start is not None:
+        expression = (ds.field('year') > start.year) | (
+            (ds.field('year') == start.year) & (ds.field('month') >= start.month))
+    if end is not None:
+        before_end = (ds.field('year') < end.year) | (
+            (ds.field('year') == end.year) & (ds.field('month') <= end.month))
+        expression = before_end if expression is None else expression & before_end
+    return expression
+
+
+def _archive_dataset():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partitioning = ds.partitioning(pa.schema([('year', pa.int16()), ('month', pa.int8())]), flavor='hive')
+    return ds.dataset(settings.PREDICTION_ARCHIVE_DIR, format='parquet', partitioning=partitioning,
+                      schema=_arrow_schema().append(pa.field('year', pa.int16())).append(pa.field('month', pa.int8())),
+                      exclude_invalid_files=False, ignore_prefixes=['.', '_'])
+
+
+def _archive_months(start, end):
+    """The (year, month) partitions on disk that overlap [start, end), newest first"""
+    months = []
+    for year_dir in os.listdir(settings.PREDICTION_ARCHIVE_DIR):
+        year_path = os.path.join(settings.PREDICTION_ARCHIVE_DIR, year_dir)
+        if not (year_dir.startswith('year=') and os.path.isdir(year_path)):
+            continue
+        for month_dir in os.listdir(year_path):
+            try:
+                month = (int(year_dir[len('year='):]), int(month_dir[len('month='):]))
+            except ValueError:
+                continue
+            if (start is None or month >= (start.year, start.month)) and (end is None or month <= (end.year, end.month)):
+                months.append(month)
+    return sorted(months, reverse=True)
+
+
+def _row_filter(ds, user_id, start, end, exclude_ids=()):
+    import pyarrow as pa
+
+    expression = None
+    for condition in (
+        ds.field('user_id') == user_id if user_id is not None else None,
+        ds.field('timestamp') >= pa.scalar(start, pa.timestamp('us', tz='UTC')) if start is not None else None,
+        ds.field('timestamp') < pa.scalar(end, pa.timestamp('us', tz='UTC')) if end is not None else None,
+        ~ds.field('id').isin(list(exclude_ids)) if exclude_ids else None,
+    ):
+        if condition is not None:
+            expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _utc(moment):
+    return moment.astimezone(datetime.timezone.utc) if moment is not None else None
+
+
+def _newest_first(row):
+    return row['timestamp'], row['id']
+
+
+def query_archive(user_id=None, start=None, end=None, limit=None):
+    """
+    Archived predictions as a list of dicts, newest first (ties broken by id).
+    start/end are timezone-aware datetimes (end exclusive); months outside the
+    range are pruned before any file is read. With limit, only the newest
+    limit rows are returned, and months are read newest first until that many
+    have been found, so older months are never opened.
+    """
+    if not os.path.isdir(settings.PREDICTION_ARCHIVE_DIR):
+        return []
+    import pyarrow.dataset as ds
+
+    dataset = _archive_dataset()
+    start, end = _utc(start), _utc(end)
+    expression = _row_filter(ds, user_id, start, end)
+
+    rows = {}
+    if limit is None:
+        month_filter = _month_filter(ds, start, end)
+        if month_filter is not None:
+            expression = month_filter if expression is None else month_filter & expression
+        for row in dataset.to_table(columns=ARCHIVE_COLUMNS, filter=expression).to_pylist():
+            rows[row['id']] = row  # the same row can only appear twice after an interrupted archive run
+    else:
+        for year, month in _archive_months(start, end):
+            # Months hold disjoint time ranges, so once limit rows are in hand no older month can displace them
+            if len(rows) >= limit:
+                break
+            in_month = (ds.field('year') == year) & (ds.field('month') == month)
+            table = dataset.to_table(columns=ARCHIVE_COLUMNS,
+                                     filter=in_month if expression is None else in_month & expression)
+            for row in table.to_pylist():
+                rows[row['id']] = row
+    return sorted(rows.values(), key=_newest_first, reverse=True)[:limit]
+
+
+def count_archive(user_id=None, start=None, end=None, exclude_ids=()):
+    """How many archived predictions query_archive would return, without reading more than the id column"""
+    if not os.path.isdir(settings.PREDICTION_ARCHIVE_DIR):
+        return 0
+    import pyarrow.dataset as ds
+
+    start, end = _utc(start), _utc(end)
+    expression = _row_filter(ds, user_id, start, end, exclude_ids)
+    month_filter = _month_filter(ds, start, end)
+    if month_filter is not None:
+        expression = month_filter if expression is None else month_filter & expression
+    ids = _archive_dataset().to_table(columns=['id'], filter=expression).column('id')
+    return len(ids.unique())
+
+
+def _as_prediction(row):
+    return Prediction(id=row['id'], user_id=row['user_id'], prediction=row['prediction'],
+                      timestamp=row['timestamp'], input_data=json.loads(row['input_data']))
+
+
+def archived_predictions(user, start=None, end=None, exclude_ids=(), limit=None):
+    """Archived rows as unsaved Prediction instances, so serializers and exports can treat them like hot rows"""
+    exclude_ids = set(exclude_ids)
+    return [
+        _as_prediction(row)
+        for row in query_archive(user_id=user.pk, start=start, end=end, limit=limit)
+        if row['id'] not in exclude_ids
+    ]
+
+
+def parse_date_range(params):
+    """
+    Read ?start= and ?end= (ISO dates or datetimes) from a query dict. A plain
+    end date includes that whole day. Returns (start, end), either may be None;
+    raises ValueError for an unreadable value.
+    """
+    bounds = []
+    for name in ('start', 'end'):
+        value = params.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f"Invalid {name} '{value}'; use YYYY-MM-DD or an ISO datetime")
+            moment = datetime.datetime.combine(day, datetime.time())
+            if name == 'end':
+                moment += datetime.timedelta(days=1)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        bounds.append(moment)
+    return tuple(bounds)
+
+
+class PredictionHistory:
+    """
+    A user's predictions in [start, end), from the database and the archive,
+    newest first. Nothing is read up front: a slice fetches at most its stop
+    newest rows from each side and merges just those, so a page of a long
+    history costs one LIMIT query and the archive months that page reaches.
+    Supports count(), indexing, slicing and iteration, which is what
+    Paginator and the CSV export need.
+    """
+
+    def __init__(self, user, start=None, end=None):
+        self.user = user
+        self.start = start
+        self.end = end
+        hot = Prediction.objects.filter(user=user)
+        if start is not None:
+            hot = hot.filter(timestamp__gte=start)
+        if end is not None:
+            hot = hot.filter(timestamp__lt=end)
+        self.hot = hot.order_by('-timestamp', '-id')
+        self._count = None
+        self._stale_ids = None
+
+    def stale_ids(self):
+        """
+        Ids of database rows that may also be in the archive (an interrupted
+        archive run leaves both copies; the database one wins). Only rows past
+        the hot cutoff can have been archived, and there are few of them.
+        """
+        if self._stale_ids is None:
+            self._stale_ids = set(self.hot.filter(timestamp__lt=hot_cutoff()).values_list('id', flat=True))
+        return self._stale_ids
+
+    def count(self):
+        if self._count is None:
+            self._count = self.hot.count() + count_archive(
+                self.user.pk, self.start, self.end, exclude_ids=self.stale_ids())
+        return self._count
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if key < 0:
+                raise IndexError("negative indexing is not supported")
+            page = self[key:key + 1]
+            if not page:
+                raise IndexError("prediction index out of range")
+            return page[0]
+        if key.step not in (None, 1) or (key.start or 0) < 0 or (key.stop is not None and key.stop < 0):
+            raise ValueError("only forward slices with non-negative bounds are supported")
+        if key.stop is None:
+            return list(self)[key]
+        # The newest `stop` rows of the union are among the newest `stop` of each side
+        hot = list(self.hot[:key.stop])
+        cold = archived_predictions(self.user, self.start, self.end, limit=key.stop,
+                                    exclude_ids=[prediction.id for prediction in hot])
+        merged = sorted(hot + cold, key=lambda prediction: (prediction.timestamp, prediction.id), reverse=True)
+        return merged[key]
+
+    def __iter__(self):
+        stale_ids = self.stale_ids()
+        cold = archived_predictions(self.user, self.start, self.end, exclude_ids=stale_ids)
+        return heapq.merge(self.hot.iterator(), cold,
+                           key=lambda prediction: (prediction.timestamp, prediction.id), reverse=True)
+
+
+def predictions_for_user(user, start=None, end=None, include_archive=False):
+    """
+    A user's predictions in [start, end), newest first. The archive is only
+    read when asked to or when the range reaches back past the hot cutoff;
+    then the result is a lazy PredictionHistory, otherwise a queryset.
+    """
+    if include_archive or (start is not None and start < hot_cutoff()):
+        return PredictionHistory(user, start, end)
+    hot = Prediction.objects.filter(user=user)
+    if start is not None:
+        hot = hot.filter(timestamp__gte=start)
+    if end is not None:
+        hot = hot.filter(timestamp__lt=end)
+    return hot.order_by('-timestamp', '-id')
@@ -0,0 +1,125 @@
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .inference import MODEL_VERSION, model, encoders, encode_inputs
+
+# Monthly quantities for one person, in the unit each commodity is priced in
+# (kg, litres or pieces). A household's basket scales these by its size.
+DEFAULT_BASKET = {
+    'Maize flour': 6.0,
+    'Rice': 1.5,
+    'Beans': 1.5,
+    'Wheat flour': 1.0,
+    'Potatoes (Irish)': 2.0,
+    'Kale': 2.0,
+    'Cabbage': 1.0,
+    'Tomatoes': 1.5,
+    'Onions (red)': 0.75,
+    'Milk (cow, fresh)': 4.0,
+    'Oil (vegetable)': 0.75,
+    'Sugar': 1.0,
+    'Salt': 0.2,
+}
+
+# Commodity Category for each commodity, by name prefix (the first match wins)
+CATEGORY_PREFIXES = [
+    ('Cowpea leaves', 'vegetables and fruits'),
+    ('Beans', 'pulses and nuts'),
+    ('Cowpeas', 'pulses and nuts'),
+    ('Maize', 'cereals and tubers'),
+    ('Rice', 'cereals and tubers'),
+    ('Sorghum', 'cereals and tubers'),
+    ('Millet', 'cereals and tubers'),
+    ('Wheat', 'cereals and tubers'),
+    ('Bread', 'cereals and tubers'),
+    ('Potatoes', 'cereals and tubers'),
+    ('Meat', 'meat, fish and eggs'),
+    ('Fish', 'meat, fish and eggs'),
+    ('Milk', 'milk and dairy'),
+    ('Oil', 'oil and fats'),
+    ('Cooking fat', 'oil and fats'),
+    ('Fuel', 'non-food'),
+    ('Sugar', 'miscellaneous food'),
+    ('Salt', 'miscellaneous food'),
+]
+DEFAULT_CATEGORY = 'vegetables and fruits'
+
+COMMODITIES = list(encoders['Commodity'].classes_)
+
+
+def commodity_category(commodity):
+    for prefix, category in CATEGORY_PREFIXES:
+        if commodity.startswith(prefix):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def _table_key(region, county, market):
+    return f"price_table:{MODEL_VERSION}:{region}|{county}|{market}"
+
+
+def build_price_table(region, county, market):
+    """
+    Predicted retail price of one unit of every commodity at a market, from a
+    single vectorized model call. Raises ValueError for an unknown location.
+    """
+    defaults = settings.BASKET_FEATURE_DEFAULTS
+    rows = [
+        {**defaults, 'Commodity': commodity, 'Commodity Category': commodity_category(commodity),
+         'Region': region, 'County': county, 'Market': market}
+        for commodity in COMMODITIES
+    ]
+    # float64 before rounding, as predict_prices does: a float32 rounded to cents isn't a whole number of cents
+    prices = np.exp(model.predict(encode_inputs(rows))).astype(np.float64)
+    return {
+        'prices': dict(zip(COMMODITIES, np.round(prices, 2).tolist())),
+        'priced_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'model_version': MODEL_VERSION,
+    }
+
+
+def get_price_table(region, county, market, refresh=False):
+    """The cached price table for a market, rebuilt after BASKET_PRICE_TABLE_TIMEOUT or on refresh"""
+    key = _table_key(region, county, market)
+    table = None if refresh else cache.get(key)
+    if table is None:
+        table = build_price_table(region, county, market)
+        cache.set(key, table, timeout=settings.BASKET_PRICE_TABLE_TIMEOUT)
+    return table
+
+
+def default_basket(household_size):
+    return [{'commodity': commodity, 'quantity': round(quantity * household_size, 2)}
+            for commodity, quantity in DEFAULT_BASKET.items()]
+
+
+def price_basket(items, region, county, market):
+    """
+    Cost of a basket at a market. items is a list of {"commodity", "quantity"};
+    repeated commodities are priced separately. Returns per-item costs and the
+    total. Raises ValueError for unknown commodities or bad quantities.
+    """
+    table = get_price_table(region, county, market)
+    prices = table['prices']
+    priced = []
+    for index, item in enumerate(items, start=1):
+        commodity = item.get('commodity')
+        if commodity not in prices:
+            raise ValueError(f"Item {index}: unknown commodity '{commodity}'")
+        try:
+            quantity = float(item.get('quantity', 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"Item {index}: quantity must be a number")
+        if not quantity > 0:
+            raise ValueError(f"Item {index}: quantity must be positive")
+        priced.append({'commodity': commodity, 'quantity': quantity, 'unit_price': prices[commodity],
+                       'cost': round(prices[commodity] * quantity, 2)})
+    return {
+        'items': priced,
+        'total': round(sum(item['cost'] for item in priced), 2),
+        'priced_at': table['priced_at'],
+        'model_version': table['model_version'],
+    }
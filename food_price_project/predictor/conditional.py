@@ -0,0 +1,67 @@
+import uuid
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+# Conditional GET for endpoints that serve one user's data. Each (scope, user)
+# has a version token in the Django cache that is replaced on every write to
+# that data (see the signals modules and PredictionQuerySet), so an ETag can be
+# checked with one cache read: a client polling with If-None-Match gets a 304
+# before the view runs its query or serializer. Every worker has to see every
+# write, so this only runs with settings.CONDITIONAL_GET, which is off unless
+# the cache is shared between processes.
+
+
+def _version_key(scope, user_id):
+    return f"data_version:{scope}:{user_id}"
+
+
+def data_version(scope, user_id):
+    """The current version token of a user's data in scope"""
+    return cache.get_or_set(_version_key(scope, user_id), uuid.uuid4().hex[:16], timeout=None)
+
+
+def bump_data_version(scope, user_id):
+    """Mark a user's data in scope as changed. A fresh random token can never match an ETag handed out before."""
+    cache.set(_version_key(scope, user_id), uuid.uuid4().hex[:16], timeout=None)
+
+
+def data_etag(request, scope):
+    """ETag for this request's view of the user's data: version, URL (with query string) and Accept header"""
+    validator = '|'.join([
+        scope, str(request.user.pk), data_version(scope, request.user.pk),
+        request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return quote_etag(hashlib.blake2b(validator.encode(), digest_size=12).hexdigest())
+
+
+def conditional(scope, **cache_control):
+    """
+    Decorate a GET view of the logged-in user's data in scope: answer 304 when
+    If-None-Match still matches, otherwise tag a successful response with its
+    ETag. cache_control is passed to patch_cache_control (e.g. private=True,
+    no_cache=True). Works on function views and, through method_decorator, on
+    DRF viewset actions. Without settings.CONDITIONAL_GET the view just runs.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (not settings.CONDITIONAL_GET or request.method not in ('GET', 'HEAD')
+                    or not request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            etag = data_etag(request, scope)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            if cache_control:
+                patch_cache_control(response, **cache_control)
+            return response
+        return wrapper
+    return decorator
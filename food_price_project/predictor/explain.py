@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+
+from .inference import MODEL_VERSION, local_estimator, encoders, top_10_features, cached_rows
+
+# The model predicts log prices, so SHAP values add up in log space:
+#   log(price) = base + sum(contributions)
+# Each contribution is also reported as the factor it multiplies the price by.
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+
+def get_explainer():
+    """The TreeExplainer for the loaded model, built once per model version"""
+    explainer = _explainers.get(MODEL_VERSION)
+    if explainer is None:
+        import shap
+        with _explainers_lock:
+            explainer = _explainers.get(MODEL_VERSION)
+            if explainer is None:
+                explainer = shap.TreeExplainer(local_estimator())
+                _explainers[MODEL_VERSION] = explainer
+    return explainer
+
+
+# Class names per categorical feature, indexed by encoded value
+_class_names = {feature: [str(name) for name in encoders[feature].classes_]
+                for feature in top_10_features if feature in encoders}
+
+
+def _contributions(X):
+    # xgboost computes exact TreeSHAP itself, so shap's additivity re-check would only repeat the prediction
+    return np.atleast_2d(get_explainer().shap_values(X, check_additivity=False)).astype(np.float64)
+
+
+def _format(X, contributions):
+    """Explanation dicts for encoded rows and their contribution vectors, built column-wise"""
+    base = float(np.ravel(get_explainer().expected_value)[0])
+    prices = np.round(np.exp(base + contributions.sum(axis=1)), 2).tolist()
+    effects = np.round(contributions, 6).tolist()
+    factors = np.round(np.exp(contributions), 4).tolist()
+    orders = np.argsort(-np.abs(contributions), axis=1, kind='stable').tolist()
+    values = [
+        [_class_names[feature][int(code)] for code in X[:, column]] if feature in _class_names
+        else X[:, column].tolist()
+        for column, feature in enumerate(top_10_features)
+    ]
+    base_price = round(float(np.exp(base)), 2)
+    return [
+        {
+            'base_price': base_price,
+            'price': prices[index],
+            'contributions': [
+                {'feature': top_10_features[i], 'value': values[i][index],
+                 'effect': effects[index][i], 'factor': factors[index][i]}
+                for i in orders[index]
+            ],
+        }
+        for index in range(len(X))
+    ]
+
+
+def explain_predictions(X):
+    """
+    Explanations for an encoded feature matrix, one dict per row. They are
+    cached per row next to the predictions; the rows not in the cache are
+    de-duplicated and explained in a single vectorized TreeSHAP call.
+    """
+    return cached_rows('explanation', X, lambda rows: _format(rows, _contributions(rows)))
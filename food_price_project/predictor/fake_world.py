@@ -0,0 +1,146 @@
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+from aiohttp import web
+
+# Stand-ins for the third-party services the site calls (SerpAPI, OpenAI,
+# Twilio and an SMTP relay), so load tests exercise the full request path
+# without sending real messages or spending API credit. Each service answers
+# in the shape the client library expects after a configurable delay that
+# models the real service's latency. Run with `manage.py fake_world`.
+
+# Seconds each fake service waits before answering
+DEFAULT_LATENCY = {'serpapi': 0.4, 'openai': 0.8, 'twilio': 0.2, 'smtp': 0.1}
+
+SNIPPETS = [
+    "Maize flour retails at about KES 65 per kg in Nairobi markets this month.",
+    "Bean prices eased after the long-rains harvest reached western Kenya.",
+    "Traders expect tomato prices to rise as supply from Kirinyaga slows.",
+]
+
+
+def server_settings(http_url, smtp_port):
+    """Environment variables that point the site at a fake world on http_url and smtp_port"""
+    return {
+        'SERPAPI_URL': f"{http_url}/serpapi/search.json",
+        'SERPAPI_API_KEY': 'fake',
+        'OPENAI_BASE_URL': f"{http_url}/openai/v1",
+        'OPENAI_API_KEY': 'fake',
+        'TWILIO_API_BASE_URL': f"{http_url}/twilio",
+        'TWILIO_ACCOUNT_SID': 'ACfake',
+        'TWILIO_AUTH_TOKEN': 'fake',
+        'TWILIO_PHONE_NUMBER': '+15005550006',
+        'EMAIL_HOST': '127.0.0.1',
+        'EMAIL_PORT': str(smtp_port),
+        'EMAIL_USE_TLS': 'False',
+        'EMAIL_HOST_USER': 'loadtest@example.com',
+        'EMAIL_HOST_PASSWORD': 'fake',
+    }
+
+
+class FakeWorld:
+    def __init__(self, latency=None):
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.calls = Counter()
+
+    async def _respond(self, service):
+        self.calls[service] += 1
+        await asyncio.sleep(self.latency[service])
+
+    async def serpapi_search(self, request):
+        await self._respond('serpapi')
+        num = int(request.query.get('num', 3))
+        return web.json_response({
+            'search_metadata': {'status': 'Success'},
+            'organic_results': [{'position': i + 1, 'snippet': SNIPPETS[i % len(SNIPPETS)]} for i in range(num)],
+        })
+
+    async def openai_chat(self, request):
+        body = await request.json()
+        await self._respond('openai')
+        return web.json_response({
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-3.5-turbo'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': "Prices are usually lowest just after harvest."},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 120, 'completion_tokens': 12, 'total_tokens': 132},
+        })
+
+    async def twilio_message(self, request):
+        form = await request.post()
+        await self._respond('twilio')
+        return web.json_response({
+            'sid': f"SM{uuid.uuid4().hex}",
+            'account_sid': request.match_info['account_sid'],
+            'to': form.get('To'),
+            'from': form.get('From'),
+            'body': form.get('Body'),
+            'status': 'queued',
+            'num_segments': '1',
+            'direction': 'outbound-api',
+            'api_version': '2010-04-01',
+        }, status=201)
+
+    async def stats(self, request):
+        return web.json_response({'calls': dict(self.calls), 'latency': self.latency})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/serpapi/search.json', self.serpapi_search)
+        app.router.add_post('/openai/v1/chat/completions', self.openai_chat)
+        app.router.add_post('/twilio/2010-04-01/Accounts/{account_sid}/Messages.json', self.twilio_message)
+        app.router.add_get('/stats', self.stats)
+        return app
+
+    async def handle_smtp(self, reader, writer):
+        """Just enough SMTP for Django's backend: accept every message and drop it"""
+        writer.write(b"220 fake-world ESMTP\r\n")
+        await writer.drain()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('latin-1').strip().upper()
+                if command.startswith(('EHLO', 'HELO')):
+                    writer.write(b"250-fake-world\r\n250 AUTH PLAIN LOGIN\r\n")
+                elif command.startswith('AUTH'):
+                    writer.write(b"235 Authentication successful\r\n")
+                elif command == 'DATA':
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    await self._respond('smtp')
+                    writer.write(b"250 OK queued\r\n")
+                elif command == 'QUIT':
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    # MAIL, RCPT, RSET, NOOP
+                    writer.write(b"250 OK\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(host, port, smtp_port, latency=None):
+    """Run the fake HTTP services and SMTP server until cancelled"""
+    world = FakeWorld(latency)
+    runner = web.AppRunner(world.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    smtp = await asyncio.start_server(world.handle_smtp, host, smtp_port)
+    try:
+        async with smtp:
+            await smtp.serve_forever()
+    finally:
+        await runner.cleanup()
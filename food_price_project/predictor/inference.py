@@ -0,0 +1,147 @@
+import os
+import hashlib
+import threading
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .inference_server import RemoteModel
+from .model_backends import build_model
+
+# Path to models inside the predictor app
+MODEL_DIR = os.path.join(settings.BASE_DIR, 'predictor', 'models')
+
+# Full paths to the .pkl files
+model_path = settings.PREDICTION_MODEL_PATH
+encoder_path = os.path.join(MODEL_DIR, 'encoders_dict.pkl')
+features_path = os.path.join(MODEL_DIR, 'top_10_features2.pkl')
+
+
+def load_model():
+    return joblib.load(model_path)
+
+
+_local_estimator = None
+_local_model = None
+_local_model_lock = threading.RLock()
+
+
+def local_estimator():
+    """The fitted XGBRegressor loaded in this process, for SHAP (which needs the estimator itself)"""
+    global _local_estimator
+    with _local_model_lock:
+        if _local_estimator is None:
+            _local_estimator = load_model()
+    return _local_estimator
+
+
+def local_model():
+    """The model running in this process on MODEL_BACKEND, also when predictions normally go to the inference server"""
+    global _local_model
+    if not isinstance(model, RemoteModel):
+        return model
+    with _local_model_lock:
+        if _local_model is None:
+            _local_model = build_model(local_estimator(), settings.MODEL_BACKEND)
+    return _local_model
+
+
+# Load the model and files. With INFERENCE_SOCKET set, predictions go to `manage.py inference_server`
+# and this process only loads the model if it needs it for explanations or as a fallback.
+if settings.INFERENCE_SOCKET:
+    model = RemoteModel(settings.INFERENCE_SOCKET, settings.INFERENCE_TIMEOUT, local_model)
+else:
+    model = build_model(local_estimator(), settings.MODEL_BACKEND)
+encoders = joblib.load(encoder_path)
+top_10_features = list(joblib.load(features_path))
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+# Changes whenever the model file does; part of every cache key so a new model never serves old results
+MODEL_VERSION = _file_digest(model_path)
+
+# Category name -> encoded value, built once instead of calling LabelEncoder.transform per request
+_category_codes = {
+    feature: {name: code for code, name in enumerate(encoders[feature].classes_)}
+    for feature in top_10_features if feature in encoders
+}
+
+
+def encode_inputs(rows):
+    """
+    Turn a list of {feature name: value} dicts into the model's feature matrix.
+    Categorical features go through the saved encoders, the rest must be
+    numbers. Raises ValueError naming the first bad value.
+    """
+    X = np.empty((len(rows), len(top_10_features)), dtype=np.float64)
+    for column, feature in enumerate(top_10_features):
+        codes = _category_codes.get(feature)
+        for index, row in enumerate(rows):
+            value = row.get(feature)
+            if codes is not None:
+                if value not in codes:
+                    raise ValueError(f"Unknown {feature} '{value}'")
+                X[index, column] = codes[value]
+            else:
+                try:
+                    X[index, column] = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{feature} must be a number, got '{value}'")
+    return X
+
+
+def sample_inputs(count, rng):
+    """Random but valid model inputs, shaped like the prediction form"""
+    rows = []
+    for _ in range(count):
+        row = {}
+        for feature in top_10_features:
+            if feature in encoders:
+                row[feature] = str(rng.choice(encoders[feature].classes_))
+            else:
+                row[feature] = str(round(float(rng.uniform(0.5, 10)), 2))
+        rows.append(row)
+    return rows
+
+
+def row_keys(kind, X):
+    """Cache key per feature row: kind, model version and a hash of the encoded values"""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    return [f"{kind}:{MODEL_VERSION}:{hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest()}" for row in X]
+
+
+def cached_rows(kind, X, compute):
+    """
+    Look every row of X up in the cache and call compute(rows) once, on the
+    distinct rows that missed, to fill in the rest. compute returns one
+    picklable value per row. Returns the values in row order.
+    """
+    keys = row_keys(kind, X)
+    found = cache.get_many(keys)
+    missing = {}
+    for index, key in enumerate(keys):
+        if key not in found:
+            missing.setdefault(key, index)
+    if missing:
+        computed = compute(X[list(missing.values())])
+        fresh = dict(zip(missing, computed))
+        cache.set_many(fresh, timeout=settings.PREDICTION_CACHE_TIMEOUT)
+        found.update(fresh)
+    return [found[key] for key in keys]
+
+
+def predict_prices(X):
+    """Predicted prices (KES, rounded to cents) for an encoded feature matrix, cached per row"""
+    return cached_rows(
+        'prediction', X,
+        lambda rows: [round(float(price), 2) for price in np.exp(model.predict(rows))],
+    )
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# A local inference service. `manage.py inference_server` loads the model once
+# and listens on a Unix socket; web workers started with INFERENCE_SOCKET set
+# get a RemoteModel in place of the model and only load it for SHAP.
+# Requests that arrive within INFERENCE_BATCH_WINDOW_MS of each other (up to
+# INFERENCE_BATCH_MAX_ROWS rows) are stacked into one model.predict call, so
+# many one-row predictions from different workers cost about one vectorized
+# call, and the results are split back to each caller.
+#
+# Wire format, all integers big-endian:
+#   request:  rows (uint32), columns (uint32), rows * columns little-endian float64
+#   response: rows (int32) then rows little-endian float64, or -length (int32)
+#             then a UTF-8 error message of that length
+
+_REQUEST_HEADER = struct.Struct('!II')
+_RESPONSE_HEADER = struct.Struct('!i')
+_FLOAT = np.dtype('<f8')
+
+
+class InferenceError(RuntimeError):
+    """The inference server rejected a request"""
+
+
+class MicroBatcher:
+    """Coalesces concurrent predict requests into batched calls of predict(X)"""
+
+    def __init__(self, predict, window, max_rows):
+        self.predict = predict
+        self.window = window
+        self.max_rows = max_rows
+        self.queue = asyncio.Queue()
+        # One model call at a time; requests arriving meanwhile queue up for the next batch
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, X):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((X, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for a request, then take more until the window closes or the batch is full"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = loop.time() + self.window
+        while rows < self.max_rows:
+            if not self.queue.empty():
+                item = self.queue.get_nowait()
+            else:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            X = batch[0][0] if len(batch) == 1 else np.vstack([item[0] for item in batch])
+            try:
+                predictions = await loop.run_in_executor(self.executor, self.predict, X)
+            except Exception as e:
+                logger.exception(f"Prediction failed for a batch of {len(X)} rows")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(X)
+            offset = 0
+            for rows, future in batch:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(rows)])
+                offset += len(rows)
+
+
+async def _handle(batcher, columns, reader, writer, connections):
+    connections.add(asyncio.current_task())
+    try:
+        while True:
+            try:
+                rows, width = _REQUEST_HEADER.unpack(await reader.readexactly(_REQUEST_HEADER.size))
+                payload = await reader.readexactly(rows * width * _FLOAT.itemsize)
+            except asyncio.IncompleteReadError:
+                break
+            if width != columns:
+                message = f"expected {columns} feature columns, got {width}".encode()
+                writer.write(_RESPONSE_HEADER.pack(-len(message)) + message)
+            else:
+                try:
+                    X = np.frombuffer(payload, dtype=_FLOAT).reshape(rows, width)
+                    predictions = np.asarray(await batcher.submit(X), dtype=_FLOAT)
+                    writer.write(_RESPONSE_HEADER.pack(len(predictions)) + predictions.tobytes())
+                except Exception as e:
+                    message = str(e).encode()
+                    writer.write(_RESPONSE_HEADER.pack(-len(message)) + message)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        # Cancelled when the server shuts down with clients still connected
+        pass
+    finally:
+        connections.discard(asyncio.current_task())
+        writer.close()
+
+
+async def serve(socket_path, model, window, max_rows):
+    """Serve model.predict on a Unix socket until cancelled"""
+    columns = model.n_features_in_
+    batcher = MicroBatcher(model.predict, window, max_rows)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    connections = set()
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: _handle(batcher, columns, reader, writer, connections), path=socket_path)
+    batching = asyncio.create_task(batcher.run())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in [batching, *connections]:
+            task.cancel()
+        await asyncio.gather(batching, *connections, return_exceptions=True)
+        batcher.executor.shutdown(wait=False)
+        if batcher.batches:
+            logger.info(f"Served {batcher.rows} rows in {batcher.batches} batches "
+                        f"({batcher.rows / batcher.batches:.1f} rows per model call)")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def _recv_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("inference server closed the connection")
+        received += count
+    return bytes(buffer)
+
+
+class RemoteModel:
+    """
+    Stands in for the model in web workers: predict(X) is answered by the
+    inference server over one connection per thread. If the server cannot be
+    reached, fallback() provides a local model (loaded on first use) so
+    predictions keep working, and a warning is logged.
+    """
+
+    def __init__(self, socket_path, timeout, fallback):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.fallback = fallback
+        self._local = threading.local()
+        # A worker forked from a preloaded master must not share the master's connection
+        os.register_at_fork(after_in_child=self._forget_connections)
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self._local.sock = sock
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _request(self, X):
+        sock = getattr(self._local, 'sock', None) or self._connect()
+        sock.sendall(_REQUEST_HEADER.pack(*X.shape) + X.tobytes())
+        count, = _RESPONSE_HEADER.unpack(_recv_exactly(sock, _RESPONSE_HEADER.size))
+        if count < 0:
+            raise InferenceError(_recv_exactly(sock, -count).decode(errors='replace'))
+        return np.frombuffer(_recv_exactly(sock, count * _FLOAT.itemsize), dtype=_FLOAT).astype(np.float32)
+
+    def predict(self, X):
+        X = np.ascontiguousarray(np.atleast_2d(X), dtype=_FLOAT)
+        # A kept-alive connection may have gone stale (e.g. the server restarted), so try a fresh one once
+        for attempt in range(2):
+            try:
+                return self._request(X)
+            except OSError as e:
+                self._disconnect()
+                error = e
+        logger.warning(f"Inference server at {self.socket_path} unavailable ({error}); predicting locally")
+        return self.fallback().predict(X)
@@ -0,0 +1,135 @@
+import io
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .models import CommunityReport
+
+# Accepted column names (case-insensitive) for each CommunityReport field. The
+# capitalised names match the community reporting form and the encoders.
+COLUMN_ALIASES = {
+    'commodity': 'food_item',
+    'food_item': 'food_item',
+    'region': 'region',
+    'market': 'market',
+    'price': 'price',
+    'quantity': 'quantity',
+    'unit_quantity': 'quantity',
+}
+REQUIRED_COLUMNS = ['food_item', 'region', 'market', 'price']
+
+# Encoder whose classes are the valid values of each column
+VOCABULARY_ENCODERS = {'food_item': 'Commodity', 'region': 'Region', 'market': 'Market'}
+FIELD_LABELS = {'food_item': 'commodity', 'region': 'region', 'market': 'market', 'price': 'price'}
+
+BULK_CREATE_BATCH_SIZE = 1000
+
+# Currency written around a price: "KSh 120", "Ksh.120", "KES120", "120/="
+CURRENCY_PATTERN = r'(?i)(?<![a-z])(?:kshs?|kes|shs?)(?![a-z])\.?|/=|/-'
+# One price: digits and an optional decimal point, with commas only as thousands separators
+NUMBER_PATTERN = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?'
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def read_report_batch(data):
+    """
+    Turn a request payload into a DataFrame of strings: CSV text, a list of
+    report objects, or {"reports": [...]}. Raises ValueError for anything else.
+    """
+    if isinstance(data, (bytes, str)):
+        text = data.decode('utf-8-sig') if isinstance(data, bytes) else data
+        frame = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False, skipinitialspace=True)
+    else:
+        if isinstance(data, dict):
+            data = data.get('reports')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError("Expected a list of reports or {\"reports\": [...]}")
+        frame = pd.DataFrame.from_records(data)
+
+    frame = frame.rename(columns=lambda name: COLUMN_ALIASES.get(str(name).strip().lower(), name))
+    if frame.empty:
+        raise ValueError("The batch is empty")
+    missing = [FIELD_LABELS[column] for column in REQUIRED_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return frame.reset_index(drop=True)
+
+
+def validate_reports(frame, encoders):
+    """
+    Validate and normalize a batch in one pass per column. Names are matched
+    to the encoder vocabularies ignoring case and surrounding whitespace. A price
+    is one number, optionally with currency text and comma thousands separators;
+    decimal commas and ranges are rejected. Prices are divided by an optional
+    quantity column. Rows repeating an earlier valid row are dropped.
+    Returns (clean frame of valid rows, {row index: [errors]}).
+    """
+    errors = {}
+
+    def reject(mask, message):
+        for index in np.flatnonzero(mask):
+            errors.setdefault(int(index), []).append(message(int(index)))
+
+    clean = pd.DataFrame(index=frame.index)
+    for column, encoder_name in VOCABULARY_ENCODERS.items():
+        raw = frame[column].fillna('').astype(str).str.strip()
+        lookup = {name.casefold(): name for name in encoders[encoder_name].classes_}
+        clean[column] = raw.str.casefold().map(lookup)
+        label = FIELD_LABELS[column]
+        reject(clean[column].isna().to_numpy(),
+               lambda i, raw=raw, label=label:
+                   f"unknown {label} '{raw.iat[i]}'" if raw.iat[i] else f"missing {label}")
+
+    raw_price = frame['price'].fillna('').astype(str).str.strip()
+    text = raw_price.str.replace(CURRENCY_PATTERN, '', regex=True).str.strip()
+    numbers = text.str.count(r'\d[\d,.]*')
+    is_number = text.str.fullmatch(NUMBER_PATTERN)
+    reject((raw_price == '').to_numpy(), lambda i: "missing price")
+    reject((numbers > 1).to_numpy(), lambda i: f"more than one number in price '{raw_price.iat[i]}'")
+    # "1.200,50" or "120,50": a decimal comma can't be told apart from a thousands separator, so don't guess
+    ambiguous = ~is_number & text.str.fullmatch(r'[\d,.]+')
+    reject(ambiguous.to_numpy(),
+           lambda i: f"ambiguous price '{raw_price.iat[i]}': write decimals with a point, e.g. 1200.50")
+    reject(((raw_price != '') & (numbers <= 1) & ~is_number & ~ambiguous).to_numpy(), lambda i: f"invalid price '{raw_price.iat[i]}'")
+    price = pd.to_numeric(text.where(is_number).str.replace(',', ''), errors='coerce')
+    if 'quantity' in frame.columns:
+        raw_quantity = frame['quantity'].fillna('').astype(str).str.strip()
+        quantity = pd.to_numeric(raw_quantity, errors='coerce')
+        reject(((raw_quantity != '') & ~(quantity > 0)).to_numpy(),
+               lambda i: f"invalid quantity '{raw_quantity.iat[i]}'")
+        price = price / quantity.where(quantity > 0, 1)
+    price = price.round(2)
+    reject((is_number & ~(price > 0)).to_numpy(), lambda i: f"invalid price '{raw_price.iat[i]}'")
+    clean['price'] = price
+
+    valid = np.ones(len(frame), dtype=bool)
+    valid[list(errors)] = False
+    valid_rows = np.flatnonzero(valid)
+    duplicates = valid_rows[clean.iloc[valid_rows].duplicated(keep='first').to_numpy()]
+    reject(np.isin(np.arange(len(frame)), duplicates), lambda i: "duplicate of an earlier row")
+    valid[duplicates] = False
+    return clean[valid], errors
+
+
+def ingest_community_reports(user, data, encoders, max_rows=None):
+    """
+    Validate a batch and insert its valid rows with bulk_create in a single
+    transaction. Returns (number created, rejects) where each reject is
+    {"row": 1-based row number, "errors": [...]}.
+    """
+    frame = read_report_batch(data)
+    if max_rows and len(frame) > max_rows:
+        raise BatchTooLarge(f"Batch has {len(frame)} rows; the limit is {max_rows}")
+    clean, errors = validate_reports(frame, encoders)
+    reports = [
+        CommunityReport(user=user, food_item=food_item, region=region, market=market, price=float(price))
+        for food_item, region, market, price in clean[REQUIRED_COLUMNS].itertuples(index=False, name=None)
+    ]
+    with transaction.atomic():
+        CommunityReport.objects.bulk_create(reports, batch_size=BULK_CREATE_BATCH_SIZE)
+    rejects = [{"row": index + 1, "errors": messages} for index, messages in sorted(errors.items())]
+    return len(reports), rejects
@@ -0,0 +1,239 @@
+import asyncio
+import io
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+import aiohttp
+import numpy as np
+
+# A small load generator for capacity planning: virtual users log in, then
+# loop over weighted scenarios that mirror how the site is used, while the
+# number of concurrent users steps up through a series of stages. Each stage
+# reports latency percentiles, throughput and errors, so the point where
+# latency turns upward shows the capacity of the deployment under test. Run
+# it against a server wired to the fake world (`manage.py fake_world`) so
+# email, SMS and chatbot calls stay local. Driven by `manage.py loadtest`.
+
+DEFAULT_WEIGHTS = {
+    'predict': 4,
+    'cheapest_market': 3,
+    'community_report': 2,
+    'batch_api': 2,
+    'chatbot': 1,
+    'speech': 1,
+}
+PERCENTILES = (50, 95, 99)
+ACCOUNT_PREFIX = 'loadtest-'
+ACCOUNT_PASSWORD = 'loadtest-password'
+SPEECH_CLIP = 'speech_10s'
+
+
+def account(index):
+    """Credentials and profile for load-test user number index"""
+    return {
+        'username': f"{ACCOUNT_PREFIX}{index}",
+        'email': f"{ACCOUNT_PREFIX}{index}@example.com",
+        'password': ACCOUNT_PASSWORD,
+        # Valid Kenyan mobile numbers, so predictions also send an SMS
+        'phone_number': f"+2547{index:08d}",
+    }
+
+
+def ensure_accounts(count):
+    """Create any of the first count load-test users that do not exist yet. Returns how many were created."""
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    existing = set(User.objects.filter(username__startswith=ACCOUNT_PREFIX).values_list('username', flat=True))
+    created = 0
+    for index in range(count):
+        details = account(index)
+        if details['username'] in existing:
+            continue
+        User.objects.create_user(**details)
+        created += 1
+    return created
+
+
+def speech_clip():
+    """The bytes of a 10 second synthetic speech clip to upload"""
+    from speech_analysis.corpus import write_clip
+    with tempfile.TemporaryDirectory() as directory:
+        with open(write_clip(SPEECH_CLIP, directory)['path'], 'rb') as f:
+            return f.read()
+
+
+class Recorder:
+    """Latency and outcome of every request, by stage and scenario"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)  # (stage, name) -> [(latency, status)]
+
+    def add(self, stage, name, latency, status):
+        self.samples[(stage, name)].append((latency, status))
+
+    def summary(self, stage, duration):
+        """Per-request-name and overall statistics for one stage"""
+        by_name = {name: rows for (row_stage, name), rows in self.samples.items() if row_stage == stage}
+        result = {name: self._summarize(rows, duration) for name, rows in sorted(by_name.items())}
+        result['all'] = self._summarize([row for rows in by_name.values() for row in rows], duration)
+        return result
+
+    @staticmethod
+    def _summarize(rows, duration):
+        if not rows:
+            return {'requests': 0, 'rps': 0.0, 'errors': 0, 'throttled': 0,
+                    **{f"p{p}": None for p in PERCENTILES}}
+        latencies = np.array([latency for latency, _ in rows]) * 1000
+        statuses = [status for _, status in rows]
+        throttled = sum(status == 429 for status in statuses)
+        return {
+            'requests': len(rows),
+            'rps': round(len(rows) / duration, 2),
+            # Throttled requests are counted separately from failures
+            'errors': sum(status is None or (status >= 400 and status != 429) for status in statuses),
+            'throttled': throttled,
+            **{f"p{p}": round(float(value), 1) for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))},
+        }
+
+
+class VirtualUser:
+    """One simulated visitor with its own session, CSRF token and API token"""
+
+    def __init__(self, base_url, details, context, recorder, rng, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.details = details
+        self.context = context
+        self.recorder = recorder
+        self.rng = rng
+        self.stage = None
+        self.token = None
+        self.session = aiohttp.ClientSession(
+            # unsafe: keep cookies for IP-address hosts such as 127.0.0.1
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+
+    async def close(self):
+        await self.session.close()
+
+    def _csrf(self):
+        cookie = self.session.cookie_jar.filter_cookies(self.base_url).get('csrftoken')
+        return cookie.value if cookie else ''
+
+    async def request(self, name, method, path, expect=(200,), **kwargs):
+        """Time one request, reading the whole body. Returns (status, body) with status None on a network error."""
+        started = time.perf_counter()
+        status, body = None, None
+        try:
+            async with self.session.request(method, self.base_url + path, **kwargs) as response:
+                body = await response.read()
+                status = response.status
+                if status in expect and response.content_type == 'application/json':
+                    body = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        if status is not None and status not in expect and status < 400:
+            status = 599  # an unexpected success page (e.g. redirected to login) is a failure
+        self.recorder.add(self.stage, name, time.perf_counter() - started, status)
+        return status, body
+
+    async def post_form(self, name, path, data):
+        return await self.request(name, 'POST', path, data={**data, 'csrfmiddlewaretoken': self._csrf()},
+                                  headers={'Referer': self.base_url + path})
+
+    async def login(self):
+        """API token first (DRF would demand CSRF once the session is logged in), then the website session"""
+        status, body = await self.request('api_login', 'POST', '/predictor/api/login/', json={
+            'username': self.details['username'], 'password': self.details['password']})
+        if status == 200:
+            self.token = body['token']
+        await self.request('login_page', 'GET', '/accounts/login/')
+        status, _ = await self.request('login', 'POST', '/accounts/login/', data={
+            'username': self.details['username'], 'password': self.details['password'],
+            'csrfmiddlewaretoken': self._csrf()}, allow_redirects=False, expect=(302,))
+        return status == 302 and self.token is not None
+
+    def _inputs(self, count=1):
+        return [self.context['inputs'][self.rng.randrange(len(self.context['inputs']))] for _ in range(count)]
+
+    async def predict(self):
+        await self.post_form('make_prediction', '/predictor/predict/', self._inputs()[0])
+
+    async def cheapest_market(self):
+        row = self._inputs()[0]
+        await self.post_form('cheapest_market', '/predictor/cheapest-market/',
+                             {'Commodity': row['Commodity'], 'Region': row['Region']})
+
+    async def community_report(self):
+        row = self._inputs()[0]
+        await self.post_form('community_reporting', '/predictor/community-reporting/', {
+            'Commodity': row['Commodity'], 'Region': row['Region'], 'Market': row['Market'],
+            'price': f"{self.rng.uniform(20, 300):.2f}"})
+
+    async def batch_api(self):
+        await self.request('batch_api', 'POST', '/predictor/api/explanations/',
+                           json={'inputs': self._inputs(self.context['batch_size'])},
+                           headers={'Authorization': f"Token {self.token}"})
+
+    async def chatbot(self):
+        await self.request('chatbot', 'POST', '/predictor/api/chatbot/',
+                           json={'question': 'When is the cheapest time to buy maize in Nakuru?'})
+
+    async def speech(self):
+        form = aiohttp.FormData()
+        form.add_field('audio', io.BytesIO(self.context['clip']), filename=f"{SPEECH_CLIP}.flac",
+                       content_type='audio/flac')
+        form.add_field('topic', 'Load test')
+        status, body = await self.request('upload_recording', 'POST', '/speech/upload/', data=form)
+        if status == 200:
+            await self.request('analyze_recording', 'GET', f"/speech/analyze/{body['recording_id']}/")
+
+    async def run(self, deadline, weights, think_time):
+        names, counts = zip(*weights.items())
+        while time.monotonic() < deadline:
+            await getattr(self, self.rng.choices(names, counts)[0])()
+            if think_time:
+                await asyncio.sleep(self.rng.expovariate(1 / think_time))
+
+
+async def ramp(base_url, stages, stage_seconds, weights, context, think_time=0.0, timeout=60.0,
+               seed=0, report=None):
+    """
+    Run each stage's number of concurrent virtual users for stage_seconds. Users
+    carry over between stages and log in once, when they join. report(stage,
+    summary) is called as each stage finishes. Returns the summaries in order.
+    """
+    recorder = Recorder()
+    users = []
+    results = []
+    try:
+        for stage, concurrency in enumerate(stages):
+            started = time.monotonic()
+            joining = []
+            while len(users) < concurrency:
+                user = VirtualUser(base_url, account(len(users)), context, recorder,
+                                   random.Random(seed + len(users)), timeout)
+                user.stage = stage
+                users.append(user)
+                joining.append(user)
+            logged_in = await asyncio.gather(*(user.login() for user in joining))
+            if not all(logged_in):
+                raise RuntimeError(f"{logged_in.count(False)} virtual users could not log in; "
+                                   f"are the load-test accounts set up on this server?")
+
+            deadline = time.monotonic() + stage_seconds
+            active = users[:concurrency]
+            for user in active:
+                user.stage = stage
+            await asyncio.gather(*(user.run(deadline, weights, think_time) for user in active))
+            # Logins and requests still in flight at the deadline count, so measure the stage as it actually ran
+            summary = {'concurrency': concurrency, 'duration': round(time.monotonic() - started, 2)}
+            summary['requests'] = recorder.summary(stage, summary['duration'])
+            results.append(summary)
+            if report:
+                report(stage, summary)
+    finally:
+        await asyncio.gather(*(user.close() for user in users))
+    return results
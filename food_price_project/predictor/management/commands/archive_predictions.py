@@ -0,0 +1,50 @@
+import time
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from predictor.archive import archive_predictions, hot_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move predictions older than PREDICTION_HOT_DAYS out of the database into "
+        "zstd-compressed Parquet files partitioned by month. Archived predictions "
+        "stay available through the predictions API and the CSV export."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            help=f"Archive predictions older than this (default: PREDICTION_HOT_DAYS, "
+                                 f"currently {settings.PREDICTION_HOT_DAYS})")
+        parser.add_argument('--batch-size', type=int, default=50000,
+                            help="Rows per Parquet file and per delete transaction (default: 50000)")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be archived")
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] is not None:
+            cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=options['older_than_days'])
+        else:
+            cutoff = hot_cutoff()
+        self.stdout.write(f"Archiving predictions made before {cutoff:%Y-%m-%d %H:%M} UTC "
+                          f"to {settings.PREDICTION_ARCHIVE_DIR}")
+
+        started = time.monotonic()
+        moved = archive_predictions(cutoff, batch_size=max(1, options['batch_size']), dry_run=options['dry_run'])
+        elapsed = time.monotonic() - started
+        for (year, month), count in sorted(moved.items()):
+            self.stdout.write(f"  {year}-{month:02d}: {count} predictions")
+        total = sum(moved.values())
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run: {total} predictions would be archived"))
+            return
+        if total and connection.vendor == 'sqlite':
+            # SQLite keeps freed pages in the file until it is vacuumed
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} predictions in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/sec)"
+        ))
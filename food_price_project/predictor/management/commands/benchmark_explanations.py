@@ -0,0 +1,80 @@
+import time
+import statistics
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.inference import model, encode_inputs, row_keys, sample_inputs
+from predictor.explain import get_explainer, explain_predictions
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure SHAP explanation latency against inference latency (encoding plus "
+        "model.predict) for several batch sizes, with a cold and a warm cache. Only the "
+        "cached path is budgeted: the command fails if a cached single-prediction explanation "
+        "costs more than EXPLANATION_OVERHEAD_BUDGET times inference. Uncached explanations "
+        "(exact TreeSHAP) are timed and reported but not checked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-sizes', default='1,10,100,1000',
+                            help="Comma-separated batch sizes (default: 1,10,100,1000)")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per measurement; the median is reported")
+        parser.add_argument('--budget', type=float, default=settings.EXPLANATION_OVERHEAD_BUDGET,
+                            help=f"Allowed cached single-prediction explanation time / inference time "
+                                 f"(default: EXPLANATION_OVERHEAD_BUDGET = {settings.EXPLANATION_OVERHEAD_BUDGET})")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['batch_sizes'].split(',') if size.strip()]
+        repeat = max(1, options['repeat'])
+        rng = np.random.default_rng(0)
+
+        started = time.perf_counter()
+        get_explainer()
+        self.stdout.write(f"TreeExplainer built in {(time.perf_counter() - started) * 1000:.1f} ms (once per model version)")
+
+        header = f"{'batch':>6} {'inference ms':>13} {'explain cold':>13} {'explain warm':>13} {'cold/inf':>9} {'warm/inf':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        over_budget = []
+        for size in sizes:
+            rows = sample_inputs(size, rng)
+            X = encode_inputs(rows)
+            keys = row_keys('explanation', X)
+
+            def infer():
+                np.exp(model.predict(encode_inputs(rows)))
+
+            def explain_cold():
+                cache.delete_many(keys)
+                explain_predictions(X)
+
+            inference = self.median_ms(infer, repeat)
+            cold = self.median_ms(explain_cold, repeat)
+            warm = self.median_ms(lambda: explain_predictions(X), repeat)
+            cold_ratio, warm_ratio = cold / inference, warm / inference
+            self.stdout.write(f"{size:>6} {inference:>13.3f} {cold:>13.3f} {warm:>13.3f} "
+                              f"{cold_ratio:>8.2f}x {warm_ratio:>8.2f}x")
+
+            # Gate the interactive case: a repeated single prediction must be explained from the cache
+            # within budget. Uncached explanations run exact TreeSHAP, whose cost grows with leaves x depth
+            # per tree, so they are reported for capacity planning rather than gated.
+            if size == 1 and warm_ratio > options['budget']:
+                over_budget.append(f"cached single-prediction explanations take {warm_ratio:.2f}x inference")
+            cache.delete_many(keys)
+
+        if over_budget:
+            raise CommandError(f"Over the {options['budget']}x budget: " + '; '.join(over_budget))
+        self.stdout.write(self.style.SUCCESS(f"Explanations are within the {options['budget']}x budget"))
+
+    def median_ms(self, fn, repeat):
+        fn()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
@@ -0,0 +1,64 @@
+import time
+import statistics
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.inference import local_estimator, encode_inputs, sample_inputs
+from predictor.model_backends import MODEL_BACKENDS, build_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Time model.predict on every MODEL_BACKEND for several batch sizes, against the "
+        "estimator (XGBRegressor.predict). Fails if any backend's predictions differ from "
+        "the estimator's in any bit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-sizes', default='1,10,100,1000,10000',
+                            help="Comma-separated batch sizes (default: 1,10,100,1000,10000)")
+        parser.add_argument('--repeat', type=int, default=50, help="Timed runs per measurement; the median is reported")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['batch_sizes'].split(',') if size.strip()]
+        repeat = max(1, options['repeat'])
+        rng = np.random.default_rng(0)
+        estimator = local_estimator()
+
+        models = {}
+        for backend in MODEL_BACKENDS:
+            started = time.perf_counter()
+            models[backend] = build_model(estimator, backend)
+            self.stdout.write(f"{backend:<10} built in {(time.perf_counter() - started) * 1000:.1f} ms "
+                              f"({type(models[backend]).__name__})")
+
+        header = f"{'batch':>6}" + ''.join(f" {backend + ' µs':>13}" for backend in MODEL_BACKENDS) + \
+            ''.join(f" {backend + ' x':>10}" for backend in MODEL_BACKENDS[1:])
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        mismatches = []
+        for size in sizes:
+            X = encode_inputs(sample_inputs(size, rng))
+            expected = estimator.predict(X)
+            timings = {}
+            for backend, model in models.items():
+                if not np.array_equal(model.predict(X), expected):
+                    mismatches.append(f"{backend} at batch size {size}")
+                timings[backend] = self.median_us(lambda: model.predict(X), repeat)
+            self.stdout.write(
+                f"{size:>6}" + ''.join(f" {timings[backend]:>13.1f}" for backend in MODEL_BACKENDS)
+                + ''.join(f" {timings['estimator'] / timings[backend]:>10.2f}" for backend in MODEL_BACKENDS[1:]))
+        self.stdout.write("x: speed-up over the estimator")
+
+        if mismatches:
+            raise CommandError("Predictions differ from the estimator's: " + '; '.join(mismatches))
+
+    @staticmethod
+    def median_us(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        return statistics.median(timings)
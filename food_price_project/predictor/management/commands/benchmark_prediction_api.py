@@ -0,0 +1,83 @@
+import time
+import statistics
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from predictor.inference import sample_inputs
+from predictor.models import Prediction
+from predictor.renderers import FastJSONRenderer, orjson
+from predictor.serializers import PredictionSerializer, prediction_read_plan
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a page of the predictions API on the old path (PredictionSerializer over model "
+        "instances, rendered by JSONRenderer) against the read plan over values_list() rows "
+        "rendered by FastJSONRenderer, for several page sizes. Runs on synthetic predictions "
+        "that are rolled back afterwards; fails if the two paths disagree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', default='10,100,1000,5000',
+                            help="Comma-separated page sizes (default: 10,100,1000,5000)")
+        parser.add_argument('--fields', default='', help="Sparse fieldset to time as well, e.g. prediction,timestamp")
+        parser.add_argument('--repeat', type=int, default=10, help="Timed runs per measurement; the median is reported")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['page_sizes'].split(',') if size.strip()]
+        repeat = max(1, options['repeat'])
+        self.stdout.write(f"Renderer: {'orjson' if orjson else 'json (orjson not installed)'}")
+        try:
+            with transaction.atomic():
+                self.run(sizes, options['fields'], repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, fields, repeat):
+        user = get_user_model().objects.create_user(username='benchmark-prediction-api', password=None)
+        rows = sample_inputs(max(sizes), np.random.default_rng(0))
+        Prediction.objects.bulk_create(
+            [Prediction(user=user, input_data=row, prediction=float(index)) for index, row in enumerate(rows)],
+            batch_size=1000)
+        queryset = Prediction.objects.filter(user=user)
+        full_plan = prediction_read_plan()
+        sparse_plan = prediction_read_plan(fields) if fields else None
+
+        header = f"{'rows':>6} {'serializer ms':>14} {'read plan ms':>13} {'speedup':>8}"
+        if sparse_plan:
+            header += f" {'sparse ms':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for size in sizes:
+            def serializer():
+                return JSONRenderer().render(PredictionSerializer(queryset[:size], many=True).data)
+
+            def plan(read_plan=full_plan):
+                return FastJSONRenderer().render(read_plan.from_tuples(queryset.values_list(*read_plan.lookups)[:size]))
+
+            if serializer() != JSONRenderer().render(full_plan.from_tuples(queryset.values_list(*full_plan.lookups)[:size])):
+                raise CommandError(f"The read plan's output differs from PredictionSerializer's at {size} rows")
+            old = self.median_ms(serializer, repeat)
+            new = self.median_ms(plan, repeat)
+            line = f"{size:>6} {old:>14.2f} {new:>13.2f} {old / new:>7.1f}x"
+            if sparse_plan:
+                line += f" {self.median_ms(lambda: plan(sparse_plan), repeat):>10.2f}"
+            self.stdout.write(line)
+
+    def median_ms(self, fn, repeat):
+        fn()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
@@ -0,0 +1,108 @@
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+WARMED = re.compile(r"Warm-up (finished|step '\w+' failed)")
+
+
+def memory_kb(pid):
+    """Rss, Pss and private (Private_Clean + Private_Dirty, i.e. USS) memory of a process in kB, from /proc"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'], 'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name in parentheses may contain spaces; the parent pid is the second field after it
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return children
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn (gunicorn.conf.py) with and without PRELOAD_APP, wait until every "
+        "worker has warmed up, send some requests, and report each worker's memory: RSS, "
+        "PSS (shared pages split between the processes sharing them) and USS (pages only that "
+        "worker holds). Linux only; uses the local database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--requests', type=int, default=200, help="Requests sent before measuring (default: 200)")
+        parser.add_argument('--path', action='append', default=[],
+                            help="Path to request, repeatable (default: /ready and /accounts/login/)")
+        parser.add_argument('--timeout', type=float, default=300, help="Seconds to wait for the workers to warm up")
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError("Needs Linux /proc/<pid>/smaps_rollup")
+        paths = options['path'] or ['/ready', '/accounts/login/']
+        results = {}
+        for preload in (False, True):
+            label = 'preloaded' if preload else 'not preloaded'
+            self.stdout.write(f"Starting {options['workers']} workers, {label}...")
+            results[label] = self.measure(preload, paths, options)
+
+        self.stdout.write("MB per worker (mean), and PSS summed over the master and all workers:")
+        header = f"{'':<14} {'RSS':>8} {'PSS':>8} {'USS':>8} {'total PSS':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, (master, workers) in results.items():
+            mean = {key: sum(worker[key] for worker in workers) / len(workers) / 1024 for key in ('rss', 'pss', 'uss')}
+            total = (master['pss'] + sum(worker['pss'] for worker in workers)) / 1024
+            self.stdout.write(f"{label:<14} {mean['rss']:>8.1f} {mean['pss']:>8.1f} {mean['uss']:>8.1f} {total:>10.1f}")
+
+    def measure(self, preload, paths, options):
+        env = dict(os.environ, PRELOAD_APP=str(preload), WEB_CONCURRENCY=str(options['workers']),
+                   BIND=f"127.0.0.1:{options['port']}", WARMUP_ON_START='True')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        output = []
+        threading.Thread(target=lambda: output.extend(server.stdout), daemon=True).start()
+        try:
+            # The master warms up once when preloading; otherwise every worker does
+            expected = 1 if preload else options['workers']
+            deadline = time.monotonic() + options['timeout']
+            while (sum(bool(WARMED.search(line)) for line in list(output)) < expected
+                   or len(child_pids(server.pid)) < options['workers']):
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise CommandError("gunicorn did not come up:\n" + ''.join(output[-30:]))
+                time.sleep(0.5)
+
+            base_url = f"http://127.0.0.1:{options['port']}"
+            for index in range(options['requests']):
+                try:
+                    urllib.request.urlopen(base_url + paths[index % len(paths)], timeout=30).read()
+                except urllib.error.HTTPError:
+                    pass
+            time.sleep(1)
+            return memory_kb(server.pid), [memory_kb(pid) for pid in child_pids(server.pid)]
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
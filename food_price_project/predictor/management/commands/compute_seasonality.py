@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from predictor.seasonality import rebuild_seasonality
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the per-(commodity, region, month) price seasonality table from observed "
+        "prices only: community reports and imported historical prices (never the model's "
+        "predictions). Meant to run nightly, e.g. from cron: "
+        "0 2 * * * python manage.py compute_seasonality"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-observations', type=int, default=settings.SEASONALITY_MIN_OBSERVATIONS,
+                            help=f"Prices needed for a commodity/region/month "
+                                 f"(default: SEASONALITY_MIN_OBSERVATIONS = {settings.SEASONALITY_MIN_OBSERVATIONS})")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = rebuild_seasonality(options['min_observations'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} seasonality indices in {time.monotonic() - started:.1f}s"))
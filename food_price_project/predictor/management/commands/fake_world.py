@@ -0,0 +1,43 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.fake_world import DEFAULT_LATENCY, serve, server_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve fake SerpAPI, OpenAI, Twilio and SMTP backends for load testing. Start the "
+        "site with the printed environment variables so it talks to these instead of the "
+        "real services, then drive it with `manage.py loadtest`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8900, help="HTTP port for the fake APIs (default: 8900)")
+        parser.add_argument('--smtp-port', type=int, default=8925, help="SMTP port (default: 8925)")
+        parser.add_argument('--latency', action='append', default=[], metavar='SERVICE=SECONDS',
+                            help=f"Response delay for one service (repeatable); services and defaults: "
+                                 f"{', '.join(f'{name}={delay}' for name, delay in DEFAULT_LATENCY.items())}")
+
+    def handle(self, *args, **options):
+        latency = {}
+        for value in options['latency']:
+            service, _, seconds = value.partition('=')
+            if service not in DEFAULT_LATENCY:
+                raise CommandError(f"Unknown service '{service}'; choose from {', '.join(DEFAULT_LATENCY)}")
+            try:
+                latency[service] = float(seconds)
+            except ValueError:
+                raise CommandError(f"--latency {value}: seconds must be a number")
+
+        http_url = f"http://{options['host']}:{options['port']}"
+        self.stdout.write("Start the site with:")
+        for name, value in server_settings(http_url, options['smtp_port']).items():
+            self.stdout.write(f"  export {name}={value}")
+        self.stdout.write(f"Fake world on {http_url} (call counts at {http_url}/stats), "
+                          f"SMTP on port {options['smtp_port']}. Ctrl-C to stop.")
+        try:
+            asyncio.run(serve(options['host'], options['port'], options['smtp_port'], latency))
+        except KeyboardInterrupt:
+            pass
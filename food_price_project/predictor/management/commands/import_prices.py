@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import datetime
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from predictor.models import HistoricalPrice
+from predictor.inference import encoders
+
+# HistoricalPrice field: header names recognised in the source file (case-insensitive).
+# The defaults follow the WFP/HDX food price exports.
+COLUMN_ALIASES = {
+    'date': ['date'],
+    'region': ['admin1', 'region'],
+    'county': ['admin2', 'county'],
+    'market': ['market'],
+    'category': ['category', 'commodity category'],
+    'commodity': ['commodity'],
+    'unit': ['unit'],
+    'pricetype': ['pricetype'],
+    'priceflag': ['priceflag'],
+    'currency': ['currency'],
+    'price': ['price'],
+    'usd_price': ['usdprice', 'usd_price', 'price (usd)'],
+}
+REQUIRED_FIELDS = ['date', 'region', 'market', 'commodity', 'price']
+
+# Fields mapped onto the model's encoder vocabularies
+VOCABULARY_ENCODERS = {'region': 'Region', 'market': 'Market', 'commodity': 'Commodity'}
+
+CHECKPOINT_DIR = os.path.join(settings.MEDIA_ROOT, 'import_prices')
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a large external price CSV (WFP-style) into HistoricalPrice in chunks. "
+        "Region, market and commodity names are mapped onto the model's vocabulary, each "
+        "chunk is written in its own transaction, and progress is checkpointed so an "
+        "interrupted import can continue with --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import (may be compressed, e.g. .csv.gz)")
+        parser.add_argument('--source', help="Dataset label stored on every row (default: the file name)")
+        parser.add_argument('--column', action='append', default=[], metavar='FIELD=HEADER',
+                            help="Read FIELD from the column HEADER, e.g. --column commodity=Item")
+        parser.add_argument('--chunk-size', type=int, default=50000,
+                            help="Rows read and committed per transaction (default: 50000)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT (default: 5000)")
+        parser.add_argument('--keep-unknown', action='store_true',
+                            help="Import rows whose region/market/commodity is not in the model's vocabulary")
+        parser.add_argument('--checkpoint', help="Checkpoint file (default: under MEDIA_ROOT/import_prices)")
+        parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint")
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist")
+        source = options['source'] or os.path.basename(path)
+        columns = self.resolve_columns(path, options['column'])
+        checkpoint_path = options['checkpoint'] or os.path.join(
+            CHECKPOINT_DIR, f"{os.path.basename(path)}.checkpoint.json")
+
+        stat = os.stat(path)
+        fingerprint = {'file': path, 'size': stat.st_size, 'mtime': stat.st_mtime, 'source': source}
+        if options['resume']:
+            if not os.path.exists(checkpoint_path):
+                raise CommandError(f"No checkpoint found at {checkpoint_path}")
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if any(checkpoint.get(key) != value for key, value in fingerprint.items()):
+                raise CommandError("The checkpoint belongs to a different file, version or --source")
+            self.stdout.write(f"Resuming after {checkpoint['rows_read']} rows")
+        else:
+            checkpoint = {**fingerprint, 'rows_read': 0, 'rows_accepted': 0, 'rows_skipped': 0, 'rows_duplicate': 0,
+                          'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = checkpoint
+        self.save_checkpoint()
+
+        lookups = {
+            field: {name.casefold(): name for name in encoders[encoder_name].classes_}
+            for field, encoder_name in VOCABULARY_ENCODERS.items()
+        }
+        unknown = {field: pd.Series(dtype='int64') for field in VOCABULARY_ENCODERS}
+        started = time.monotonic()
+        rows_this_run = 0
+
+        reader = pd.read_csv(
+            path,
+            usecols=list(columns.values()),
+            dtype=str,
+            keep_default_na=False,
+            chunksize=max(1, options['chunk_size']),
+            # Skip the rows a previous run already committed (row 0 is the header)
+            skiprows=range(1, checkpoint['rows_read'] + 1) if checkpoint['rows_read'] else None,
+        )
+        for chunk in reader:
+            frame = chunk.rename(columns={header: field for field, header in columns.items()})
+            prices, chunk_unknown = self.normalize(frame, lookups, options['keep_unknown'])
+            for field, counts in chunk_unknown.items():
+                unknown[field] = unknown[field].add(counts, fill_value=0)
+
+            rows = [HistoricalPrice(source=source, **row) for row in prices.to_dict('records')]
+            inserted = self.insert(rows, source, max(1, options['batch_size']))
+
+            checkpoint['rows_read'] += len(chunk)
+            checkpoint['rows_accepted'] += inserted
+            checkpoint['rows_skipped'] += len(chunk) - len(rows)
+            checkpoint['rows_duplicate'] = checkpoint.get('rows_duplicate', 0) + len(rows) - inserted
+            self.save_checkpoint()
+
+            rows_this_run += len(chunk)
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"  {checkpoint['rows_read']} rows read, {checkpoint['rows_accepted']} accepted, "
+                              f"{rows_this_run / elapsed if elapsed else 0:,.0f} rows/sec")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {source}: {checkpoint['rows_accepted']} rows accepted, {checkpoint['rows_skipped']} skipped, "
+            f"{checkpoint['rows_duplicate']} already imported, "
+            f"{rows_this_run} rows in {elapsed:.1f}s ({rows_this_run / elapsed if elapsed else 0:,.0f} rows/sec)"
+        ))
+        for field, counts in unknown.items():
+            if len(counts):
+                top = counts.sort_values(ascending=False).head(10)
+                listed = ', '.join(f"{name} ({int(count)})" for name, count in top.items())
+                self.stdout.write(f"  {len(counts)} {field} names not in the model's vocabulary: {listed}")
+        os.remove(checkpoint_path)
+
+    def insert(self, rows, source, batch_size):
+        """
+        Insert one chunk in its own transaction and return how many rows were
+        new. Rows already imported (by an earlier, interrupted run, or earlier
+        in the file) are skipped by the unique constraint. bulk_create can't
+        say how many that was, so count the source's rows in the chunk's date
+        span around it: a range scan of the constraint's (source, date, ...)
+        index that grows with the chunk rather than with everything imported.
+        """
+        if not rows:
+            return 0
+        dates = [row.date for row in rows]
+        span = HistoricalPrice.objects.filter(source=source, date__range=(min(dates), max(dates)))
+        with transaction.atomic():
+            before = span.count()
+            HistoricalPrice.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+            return span.count() - before
+
+    def resolve_columns(self, path, overrides):
+        """Map each HistoricalPrice field to a header in the file"""
+        headers = list(pd.read_csv(path, nrows=0).columns)
+        by_name = {header.strip().lower(): header for header in headers}
+        columns = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in by_name:
+                    columns[field] = by_name[alias]
+                    break
+        for override in overrides:
+            field, _, header = override.partition('=')
+            if field not in COLUMN_ALIASES:
+                raise CommandError(f"Unknown field '{field}' in --column; fields are: {', '.join(COLUMN_ALIASES)}")
+            if header not in headers:
+                raise CommandError(f"Column '{header}' is not in the file")
+            columns[field] = header
+        missing = [field for field in REQUIRED_FIELDS if field not in columns]
+        if missing:
+            raise CommandError(f"Could not find columns for: {', '.join(missing)} (use --column FIELD=HEADER)")
+        return columns
+
+    def normalize(self, frame, lookups, keep_unknown):
+        """
+        Clean one chunk in vectorized steps. Returns the rows to insert as a
+        DataFrame with HistoricalPrice field names, and the unmatched vocabulary
+        names with their counts.
+        """
+        frame = frame.apply(lambda column: column.str.strip())
+        # HDX exports carry a row of HXL hashtags (#date, #adm1+name, ...) under the header
+        keep = ~frame['date'].str.startswith('#')
+
+        clean = pd.DataFrame(index=frame.index)
+        clean['date'] = pd.to_datetime(frame['date'].where(keep), errors='coerce').dt.date
+        clean['price'] = pd.to_numeric(frame['price'].str.replace(',', ''), errors='coerce')
+        keep &= clean['date'].notna() & np.isfinite(clean['price'])
+
+        unknown = {}
+        for field, lookup in lookups.items():
+            matched = frame[field].str.casefold().map(lookup)
+            missing = matched.isna() & keep
+            unknown[field] = frame.loc[missing, field].value_counts()
+            clean[field] = matched.fillna(frame[field]) if keep_unknown else matched
+            if not keep_unknown:
+                keep &= matched.notna()
+
+        for field in ('county', 'category', 'unit', 'pricetype', 'priceflag', 'currency'):
+            clean[field] = frame[field] if field in frame.columns else ''
+        if 'usd_price' in frame.columns:
+            usd_price = pd.to_numeric(frame['usd_price'].str.replace(',', ''), errors='coerce')
+            clean['usd_price'] = usd_price.astype(object).where(usd_price.notna(), None)
+        return clean[keep], unknown
+
+    def save_checkpoint(self):
+        self.checkpoint['updated_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
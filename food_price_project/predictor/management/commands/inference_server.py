@@ -0,0 +1,32 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from predictor.inference import local_model
+from predictor.inference_server import serve
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve model predictions on a Unix socket, batching requests that arrive close "
+        "together into one model call. Start the web workers with INFERENCE_SOCKET set "
+        "to the same path and they send predictions here instead of loading the model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.INFERENCE_SOCKET or '/tmp/food-price-inference.sock',
+                            help="Socket path (default: INFERENCE_SOCKET, else /tmp/food-price-inference.sock)")
+        parser.add_argument('--window-ms', type=float, default=settings.INFERENCE_BATCH_WINDOW_MS,
+                            help="How long a batch waits for more requests (default: INFERENCE_BATCH_WINDOW_MS)")
+        parser.add_argument('--max-rows', type=int, default=settings.INFERENCE_BATCH_MAX_ROWS,
+                            help="Most rows per model call (default: INFERENCE_BATCH_MAX_ROWS)")
+
+    def handle(self, *args, **options):
+        model = local_model()
+        self.stdout.write(f"Serving predictions on {options['socket']} (batch window {options['window_ms']} ms, "
+                          f"up to {options['max_rows']} rows). Ctrl-C to stop.")
+        try:
+            asyncio.run(serve(options['socket'], model, options['window_ms'] / 1000, options['max_rows']))
+        except KeyboardInterrupt:
+            pass
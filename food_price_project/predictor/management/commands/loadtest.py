@@ -0,0 +1,99 @@
+import json
+import asyncio
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.inference import sample_inputs
+from predictor.loadtest import DEFAULT_WEIGHTS, PERCENTILES, ensure_accounts, ramp, speech_clip
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running site: virtual users log in and loop over weighted scenarios "
+        "(predictions, batch API, cheapest market, community reports, speech upload and "
+        "analysis, chatbot) while concurrency steps up through --stages. Reports p50/p95/p99 "
+        "latency, throughput and errors per stage. Point the site at `manage.py fake_world` "
+        "first so email, SMS and chatbot calls stay local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Site to test (default: http://127.0.0.1:8000)")
+        parser.add_argument('--stages', default='1,2,4,8,16,32',
+                            help="Comma-separated concurrent users per stage (default: 1,2,4,8,16,32)")
+        parser.add_argument('--stage-seconds', type=float, default=30, help="Length of each stage (default: 30)")
+        parser.add_argument('--scenario', action='append', default=[], metavar='NAME=WEIGHT',
+                            help=f"Scenario weight (repeatable; 0 turns one off). Defaults: "
+                                 f"{', '.join(f'{name}={weight}' for name, weight in DEFAULT_WEIGHTS.items())}")
+        parser.add_argument('--batch-size', type=int, default=20, help="Inputs per batch API call (default: 20)")
+        parser.add_argument('--think-time', type=float, default=0.0,
+                            help="Mean pause between a user's requests in seconds (default: 0, closed loop)")
+        parser.add_argument('--timeout', type=float, default=60.0, help="Per-request timeout in seconds")
+        parser.add_argument('--no-setup', action='store_true',
+                            help="Do not create the load-test accounts (when testing a server with another database)")
+        parser.add_argument('--json', metavar='PATH', help="Also write the per-stage results to this file")
+
+    def handle(self, *args, **options):
+        weights = dict(DEFAULT_WEIGHTS)
+        for value in options['scenario']:
+            name, _, weight = value.partition('=')
+            if name not in DEFAULT_WEIGHTS:
+                raise CommandError(f"Unknown scenario '{name}'; choose from {', '.join(DEFAULT_WEIGHTS)}")
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"--scenario {value}: weight must be a number")
+        weights = {name: weight for name, weight in weights.items() if weight > 0}
+        if not weights:
+            raise CommandError("Every scenario is turned off")
+        try:
+            stages = [int(size) for size in options['stages'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError("--stages must be comma-separated integers")
+
+        if not options['no_setup']:
+            created = ensure_accounts(max(stages))
+            self.stdout.write(f"{created} load-test accounts created")
+        context = {
+            'inputs': sample_inputs(500, np.random.default_rng(0)),
+            'batch_size': options['batch_size'],
+            'clip': speech_clip() if 'speech' in weights else None,
+        }
+
+        self.stdout.write(f"Testing {options['url']} for {options['stage_seconds']:g}s per stage, "
+                          f"scenarios: {', '.join(f'{name}={weight:g}' for name, weight in weights.items())}")
+        try:
+            results = asyncio.run(ramp(
+                options['url'], stages, options['stage_seconds'], weights, context,
+                think_time=options['think_time'], timeout=options['timeout'], report=self.report,
+            ))
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write("\nThroughput curve")
+        header = (f"{'users':>6} {'req/s':>8} " + ' '.join(f"{f'p{p} ms':>9}" for p in PERCENTILES)
+                  + f" {'errors':>7} {'429s':>6}")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for result in results:
+            self.stdout.write(self.row(result['concurrency'], result['requests']['all']))
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({'url': options['url'], 'weights': weights, 'stages': results}, f, indent=2)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    def report(self, stage, summary):
+        self.stdout.write(f"\nStage {stage + 1}: {summary['concurrency']} users, {summary['duration']:.1f}s")
+        header = (f"{'request':>20} {'count':>6} {'req/s':>8} " + ' '.join(f"{f'p{p} ms':>9}" for p in PERCENTILES)
+                  + f" {'errors':>7} {'429s':>6}")
+        self.stdout.write(header)
+        for name, stats in summary['requests'].items():
+            self.stdout.write(f"{name:>20} {stats['requests']:>6} " + self.row(None, stats))
+
+    @staticmethod
+    def row(concurrency, stats):
+        percentiles = ' '.join(f"{stats[f'p{p}']:>9.1f}" if stats[f'p{p}'] is not None else f"{'-':>9}"
+                               for p in PERCENTILES)
+        prefix = f"{concurrency:>6} " if concurrency is not None else ''
+        return f"{prefix}{stats['rps']:>8.2f} {percentiles} {stats['errors']:>7} {stats['throttled']:>6}"
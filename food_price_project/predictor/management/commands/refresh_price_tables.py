@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from predictor.basket import get_price_table
+from predictor.inference import encoders
+from predictor.models import HistoricalPrice
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the cached basket price tables for every market in the imported "
+        "historical prices, so budget estimates never wait on the model. Run it "
+        "periodically (more often than BASKET_PRICE_TABLE_TIMEOUT) and after a model update; "
+        "this needs a cache shared with the web processes (CACHE_BACKEND)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--market', action='append', default=[], metavar='REGION/COUNTY/MARKET',
+                            help="Refresh only this location (repeatable)")
+
+    def handle(self, *args, **options):
+        if options['market']:
+            locations = [tuple(value.split('/', 2)) for value in options['market']]
+        else:
+            locations = (HistoricalPrice.objects
+                         .filter(region__in=encoders['Region'].classes_, county__in=encoders['County'].classes_,
+                                 market__in=encoders['Market'].classes_)
+                         .values_list('region', 'county', 'market').distinct().order_by('region', 'market'))
+        started = time.monotonic()
+        refreshed = 0
+        for location in locations:
+            try:
+                get_price_table(*location, refresh=True)
+            except (TypeError, ValueError) as e:
+                self.stderr.write(f"  {'/'.join(location)}: {e}")
+                continue
+            refreshed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {refreshed} price tables in {time.monotonic() - started:.2f}s"))
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0003_communityreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('region', models.CharField(max_length=100)),
+                ('county', models.CharField(blank=True, max_length=100)),
+                ('market', models.CharField(max_length=100)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('commodity', models.CharField(max_length=100)),
+                ('unit', models.CharField(blank=True, max_length=50)),
+                ('pricetype', models.CharField(blank=True, max_length=50)),
+                ('priceflag', models.CharField(blank=True, max_length=50)),
+                ('currency', models.CharField(blank=True, max_length=10)),
+                ('price', models.FloatField()),
+                ('usd_price', models.FloatField(blank=True, null=True)),
+                ('source', models.CharField(help_text='Dataset the row was imported from', max_length=255)),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['commodity', 'market', 'date'], name='historical_commodity_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'date', 'market', 'commodity', 'unit', 'pricetype'), name='historical_price_unique_row')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0004_historicalprice'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prediction',
+            index=models.Index(fields=['user', '-timestamp'], name='prediction_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prediction',
+            index=models.Index(fields=['timestamp'], name='prediction_timestamp_idx'),
+        ),
+    ]
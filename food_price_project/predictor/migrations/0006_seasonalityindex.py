@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0005_prediction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeasonalityIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('commodity', models.CharField(max_length=100)),
+                ('region', models.CharField(max_length=100)),
+                ('month', models.PositiveSmallIntegerField()),
+                ('index', models.FloatField()),
+                ('observations', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['region', 'commodity', 'month'],
+                'constraints': [models.UniqueConstraint(fields=('region', 'commodity', 'month'), name='seasonality_unique_cell')],
+            },
+        ),
+    ]
@@ -0,0 +1,214 @@
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Ways to run the fitted XGBoost estimator, chosen with MODEL_BACKEND when the
+# model is loaded. Each gives exactly the estimator's own predictions:
+#
+#   estimator  XGBRegressor.predict, with the scikit-learn wrapper's config
+#              context and argument handling on every call
+#   booster    Booster.inplace_predict directly; XGBoost's threaded C++
+#              predictor, best for large batches
+#   numpy      the trees flattened into NumPy arrays and walked for all rows
+#              and trees at once; no XGBoost call at all, several times faster
+#              for a handful of rows
+#   native     numpy up to NATIVE_MAX_ROWS rows, booster above (the default)
+#
+# `manage.py benchmark_inference` times them against each other.
+
+NATIVE_MAX_ROWS = 32
+
+# Objectives whose prediction is the raw margin, which is what TreeEnsemble computes
+IDENTITY_OBJECTIVES = {'reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror'}
+
+
+def _iteration_range(estimator):
+    # What XGBRegressor.predict uses: the best iteration after early stopping, otherwise every tree
+    try:
+        best = estimator.best_iteration
+    except AttributeError:
+        best = None
+    return (0, best + 1) if best is not None else (0, 0)
+
+
+class BoosterModel:
+    """The estimator's Booster called with inplace_predict, skipping the scikit-learn wrapper"""
+
+    def __init__(self, estimator):
+        self.booster = estimator.get_booster()
+        self.n_features_in_ = estimator.n_features_in_
+        self.missing = estimator.missing
+        self.iteration_range = _iteration_range(estimator)
+
+    def predict(self, X):
+        return self.booster.inplace_predict(X, iteration_range=self.iteration_range, missing=self.missing,
+                                            validate_features=False)
+
+
+class TreeEnsemble:
+    """
+    A gradient-boosted tree ensemble flattened into NumPy arrays. All trees
+    are walked level by level for every row at once, comparing in float32 and
+    summing leaves in tree order from the base score, as XGBoost does, so
+    predictions are bit-for-bit the same.
+    """
+
+    def __init__(self, roots, children, features, thresholds, default_left, values, base_score, depth, n_features):
+        self.roots = roots                # first node of each tree
+        self.children = children          # (nodes, 2): left and right child; leaves point at themselves
+        self.features = features          # split feature per node
+        self.thresholds = thresholds      # go left when value < threshold; +inf at leaves, so they stay put
+        self.default_left = default_left  # direction for missing (NaN) values; True at leaves
+        self.values = values              # leaf values, 0 elsewhere
+        self.base_score = base_score
+        self.depth = depth
+        self.n_features_in_ = n_features
+
+    @classmethod
+    def from_xgboost(cls, estimator):
+        """Flatten a fitted XGBoost estimator. Raises ValueError for models this can't represent exactly."""
+        booster = estimator.get_booster()
+        config = json.loads(booster.save_config())['learner']
+        objective = config['objective']['name']
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"objective {objective} transforms the margin")
+        if not np.isnan(estimator.missing):
+            raise ValueError(f"missing={estimator.missing} is not NaN")
+        learner = json.loads(booster.save_raw('json'))['learner']
+        params = learner['learner_model_param']
+        if int(params['num_target']) != 1 or int(params['num_class']) != 0:
+            raise ValueError("multi-output models are not supported")
+        gbm = learner['gradient_booster']
+        if gbm['name'] != 'gbtree':
+            raise ValueError(f"{gbm['name']} boosters are not supported")
+        first, last = _iteration_range(estimator)
+        indptr = gbm['model']['iteration_indptr']
+        trees = gbm['model']['trees'][indptr[first]:indptr[last] if last else None]
+
+        roots, children, features, thresholds, default_left, values = [], [], [], [], [], []
+        depth = offset = 0
+        for tree in trees:
+            if tree['categories_nodes']:
+                raise ValueError("categorical splits are not supported")
+            left = np.asarray(tree['left_children'], dtype=np.intp)
+            right = np.asarray(tree['right_children'], dtype=np.intp)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            leaf = left == -1
+            nodes = np.arange(len(left))
+            roots.append(offset)
+            children.append(np.stack([np.where(leaf, nodes, left), np.where(leaf, nodes, right)], axis=1) + offset)
+            features.append(np.where(leaf, 0, tree['split_indices']))
+            thresholds.append(np.where(leaf, np.float32(np.inf), conditions))
+            default_left.append(leaf | np.asarray(tree['default_left'], dtype=bool))
+            values.append(np.where(leaf, conditions, np.float32(0)))
+            # Children always come after their parent, so one pass finds every node's depth
+            node_depth = np.zeros(len(left), dtype=np.intp)
+            for node in nodes[~leaf]:
+                node_depth[left[node]] = node_depth[right[node]] = node_depth[node] + 1
+            depth = max(depth, int(node_depth.max()))
+            offset += len(left)
+
+        return cls(
+            roots=np.asarray(roots, dtype=np.intp),
+            children=np.concatenate(children).astype(np.intp),
+            features=np.concatenate(features).astype(np.intp),
+            thresholds=np.concatenate(thresholds).astype(np.float32),
+            default_left=np.concatenate(default_left),
+            values=np.concatenate(values).astype(np.float32),
+            base_score=np.float32(float(params['base_score'].strip('[]'))),
+            depth=depth,
+            n_features=int(params['num_feature']),
+        )
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = np.arange(len(X))[:, None]
+        node = np.tile(self.roots, (len(X), 1))
+        missing = np.isnan(X).any()
+        for _ in range(self.depth):
+            value = X[rows, self.features[node]]
+            go_right = ~(value < self.thresholds[node])
+            if missing:
+                nan = np.isnan(value)
+                go_right[nan] = ~self.default_left[node[nan]]
+            node = self.children[node, go_right.view(np.int8)]
+        # Sequential float32 sum, starting from the base score, in tree order
+        leaves = np.empty((len(X), len(self.roots) + 1), dtype=np.float32)
+        leaves[:, 0] = self.base_score
+        leaves[:, 1:] = self.values[node]
+        return np.add.accumulate(leaves, axis=1)[:, -1]
+
+    def probe_inputs(self, count=512, seed=0):
+        """Rows made of split thresholds and the floats just below them, with some NaNs: every boundary case"""
+        rng = np.random.default_rng(seed)
+        X = np.zeros((count, self.n_features_in_), dtype=np.float32)
+        internal = np.isfinite(self.thresholds)
+        for feature in range(self.n_features_in_):
+            cuts = self.thresholds[internal & (self.features == feature)]
+            if len(cuts):
+                candidates = np.concatenate([cuts, np.nextafter(cuts, np.float32(-np.inf))])
+                X[:, feature] = rng.choice(candidates, count)
+        X[rng.random(X.shape) < 0.05] = np.nan
+        return X
+
+
+class NativeModel:
+    """TreeEnsemble for small batches, where XGBoost's per-call overhead dominates; the Booster for large ones"""
+
+    def __init__(self, ensemble, booster_model, max_rows=NATIVE_MAX_ROWS):
+        self.ensemble = ensemble
+        self.booster_model = booster_model
+        self.max_rows = max_rows
+        self.n_features_in_ = ensemble.n_features_in_
+
+    def predict(self, X):
+        if len(X) <= self.max_rows:
+            return self.ensemble.predict(X)
+        return self.booster_model.predict(X)
+
+
+def _checked_ensemble(estimator):
+    """A TreeEnsemble of the estimator, or None (logged) if it can't reproduce the estimator's predictions"""
+    try:
+        ensemble = TreeEnsemble.from_xgboost(estimator)
+    except (AttributeError, KeyError, ValueError) as e:
+        logger.warning(f"Can't flatten the model into NumPy arrays ({e})")
+        return None
+    X = ensemble.probe_inputs()
+    if not np.array_equal(ensemble.predict(X), estimator.predict(X)):
+        logger.error("The flattened model's predictions differ from the estimator's")
+        return None
+    return ensemble
+
+
+MODEL_BACKENDS = ('estimator', 'booster', 'numpy', 'native')
+
+
+def build_model(estimator, backend):
+    """
+    The estimator wrapped for the named backend: an object with predict(X) and
+    n_features_in_. A backend the model can't support exactly falls back to
+    the next simpler one (numpy/native -> booster -> estimator), with a warning.
+    """
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown MODEL_BACKEND '{backend}'; choose from {', '.join(MODEL_BACKENDS)}")
+    if backend == 'estimator':
+        return estimator
+    if not hasattr(estimator, 'get_booster'):
+        logger.warning(f"MODEL_BACKEND '{backend}' needs an XGBoost model; using the estimator")
+        return estimator
+    booster_model = BoosterModel(estimator)
+    if backend in ('numpy', 'native'):
+        ensemble = _checked_ensemble(estimator)
+        if ensemble is None:
+            logger.warning(f"MODEL_BACKEND '{backend}' unavailable; using the booster")
+        elif backend == 'numpy':
+            return ensemble
+        else:
+            return NativeModel(ensemble, booster_model)
+    return booster_model
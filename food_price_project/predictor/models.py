@@ -1,8 +1,35 @@
 from django.db import models
 from django.conf import settings
 
+from .conditional import bump_data_version
+
 # Create your models here.
 
+class PredictionQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete in bulk (no post_delete receiver, so Django can skip loading the
+        rows) and invalidate the owners' prediction ETags.
+        """
+        user_ids = set(self.values_list('user_id', flat=True).distinct())
+        deleted = super().delete()
+        for user_id in user_ids:
+            bump_data_version('predictions', user_id)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        user_ids = set(self.values_list('user_id', flat=True).distinct())
+        updated = super().update(**kwargs)
+        for user_id in user_ids:
+            bump_data_version('predictions', user_id)
+        return updated
+
+    update.alters_data = True
+
+
 class Prediction(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -13,8 +40,20 @@ class Prediction(models.Model):
     prediction = models.FloatField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    objects = PredictionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Per-user history and the archive job's date range scans
+            models.Index(fields=['user', '-timestamp'], name='prediction_user_time_idx'),
+            models.Index(fields=['timestamp'], name='prediction_timestamp_idx'),
+        ]
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        bump_data_version('predictions', self.user_id)
+        return deleted
 
     def __str__(self):
         return f"Prediction for {self.user.username} at {self.timestamp}"
@@ -36,3 +75,59 @@ class CommunityReport(models.Model):
 
     def __str__(self):
         return f"{self.food_item} at {self.market} ({self.region}) by {self.user.username} on {self.timestamp}"
+
+class HistoricalPrice(models.Model):
+    """Market prices imported from external datasets (WFP-style CSVs) with `import_prices`"""
+    date = models.DateField()
+    region = models.CharField(max_length=100)
+    county = models.CharField(max_length=100, blank=True)
+    market = models.CharField(max_length=100)
+    category = models.CharField(max_length=100, blank=True)
+    commodity = models.CharField(max_length=100)
+    unit = models.CharField(max_length=50, blank=True)
+    pricetype = models.CharField(max_length=50, blank=True)
+    priceflag = models.CharField(max_length=50, blank=True)
+    currency = models.CharField(max_length=10, blank=True)
+    price = models.FloatField()
+    usd_price = models.FloatField(null=True, blank=True)
+    source = models.CharField(max_length=255, help_text="Dataset the row was imported from")
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['commodity', 'market', 'date'], name='historical_commodity_idx'),
+        ]
+        constraints = [
+            # Lets an interrupted or repeated import skip rows it already loaded
+            models.UniqueConstraint(
+                fields=['source', 'date', 'market', 'commodity', 'unit', 'pricetype'],
+                name='historical_price_unique_row',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.commodity} at {self.market} on {self.date}: {self.price} {self.currency}"
+
+class SeasonalityIndex(models.Model):
+    """
+    How a commodity's price in one calendar month compares with its yearly
+    average in a region (1.2 = 20% above average). Rebuilt nightly by
+    `compute_seasonality`.
+    """
+    commodity = models.CharField(max_length=100)
+    region = models.CharField(max_length=100)
+    month = models.PositiveSmallIntegerField()
+    index = models.FloatField()
+    observations = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['region', 'commodity', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['region', 'commodity', 'month'], name='seasonality_unique_cell'),
+        ]
+
+    def __str__(self):
+        return f"{self.commodity} in {self.region}, month {self.month}: {self.index:.2f}"
+
@@ -0,0 +1,126 @@
+import logging
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, resolve
+
+logger = logging.getLogger(__name__)
+
+# Per-view query budgets. @query_budget(n) declares the most SQL queries one
+# request to a view may run, counted over the whole request (session and user
+# lookups included). The test suite checks each budgeted view at two data
+# sizes with QueryBudgetMixin, so an N+1 fails the build the day it creeps
+# in; with DEBUG on, QueryBudgetMiddleware logs a warning for any request
+# that runs over its view's budget.
+
+BUDGET_ATTR = 'query_budget'
+
+
+def query_budget(limit):
+    """
+    Declare that a request to this view runs at most limit queries. Put it
+    under @login_required and friends; on DRF viewsets apply it to an action
+    with method_decorator(query_budget(n), name='list').
+    """
+    def decorator(view):
+        setattr(view, BUDGET_ATTR, limit)
+        return view
+    return decorator
+
+
+def view_budget(func, method='GET'):
+    """The query budget of a resolved view function, or None; DRF viewsets are looked up per action"""
+    limit = getattr(func, BUDGET_ATTR, None)
+    if limit is None and getattr(func, 'actions', None):
+        action = func.actions.get(method.lower())
+        limit = getattr(getattr(func.cls, action, None), BUDGET_ATTR, None)
+    return limit
+
+
+def path_budget(path, method='GET'):
+    """The query budget of the view serving path (a query string is ignored), or None"""
+    return view_budget(resolve(urlsplit(path).path).func, method)
+
+
+def budgeted_views(patterns=None, namespace=''):
+    """Every named URL pattern whose view has a budget, as {'namespace:name': budget}"""
+    budgets = {}
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            inner = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            budgets.update(budgeted_views(pattern.url_patterns, inner))
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            methods = getattr(pattern.callback, 'actions', None) or {'get': None}
+            limits = [view_budget(pattern.callback, method) for method in methods]
+            limits = [limit for limit in limits if limit is not None]
+            if limits:
+                budgets[f"{namespace}{pattern.name}"] = max(limits)
+    return budgets
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries run on a connection"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    """With DEBUG on, warn about requests that run more queries than their view's budget"""
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        match = request.resolver_match
+        limit = view_budget(match.func, request.method) if match else None
+        if limit is not None and counter.count > limit:
+            logger.warning(f"{request.method} {request.path} ran {counter.count} queries, "
+                           f"over its budget of {limit} ({match.view_name})")
+        return response
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin checking a view against its budget. seed(n) must add n
+    more rows of the data the view lists; the request is measured after
+    seeding each of QUERY_BUDGET_SIZES rows, and fails when the query count
+    grows with the data or exceeds the view's budget.
+    """
+    QUERY_BUDGET_SIZES = (2, 20)
+
+    def assertQueryBudget(self, path, seed, method='get', **request_kwargs):
+        limit = path_budget(path, method)
+        self.assertIsNotNone(limit, f"{path} has no query budget")
+        counts = []
+        seeded = 0
+        for size in self.QUERY_BUDGET_SIZES:
+            seed(size - seeded)
+            seeded = size
+            # One untimed request first, so one-off work such as filling a cache is not counted
+            getattr(self.client, method)(path, **request_kwargs)
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(path, **request_kwargs)
+            self.assertLess(response.status_code, 400, f"{method.upper()} {path} answered {response.status_code}")
+            counts.append(len(queries))
+            self.assertLessEqual(
+                len(queries), limit,
+                f"{method.upper()} {path} ran {len(queries)} queries with {size} rows, over its budget of {limit}:\n"
+                + '\n'.join(query['sql'] for query in queries.captured_queries))
+        self.assertEqual(
+            counts[0], counts[-1],
+            f"{method.upper()} {path}: the query count grows with the data "
+            f"({' -> '.join(map(str, counts))} queries for {' -> '.join(map(str, self.QUERY_BUDGET_SIZES))} rows)")
+        return counts[-1]
@@ -0,0 +1,117 @@
+import calendar
+import datetime
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from .models import CommunityReport, HistoricalPrice, SeasonalityIndex
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+MIN_MONTHS = 4
+
+# Months from planting to harvest, by commodity name prefix. Commodities not
+# listed (meat, milk, flour, fuel, ...) are not planted, so they only get selling advice.
+GROWING_MONTHS = [
+    ('Maize', 4), ('Sorghum', 4), ('Millet', 4), ('Rice', 4), ('Potatoes', 4),
+    ('Beans', 3), ('Cowpeas', 3), ('Onions', 4),
+    ('Kale', 2), ('Spinach', 2), ('Cowpea leaves', 2), ('Cabbage', 3), ('Tomatoes', 3),
+]
+
+
+def growing_months(commodity):
+    for prefix, months in GROWING_MONTHS:
+        if commodity.startswith(prefix):
+            return months
+    return None
+
+
+def _frame(rows):
+    frame = pd.DataFrame.from_records(rows, columns=['commodity', 'region', 'when', 'price'])
+    frame['when'] = pd.to_datetime(frame['when'], utc=True)
+    return frame
+
+
+def load_observations():
+    """
+    Every observed market price (community reports and imported prices) as one
+    frame. Predictions are left out: they are the model's output, not prices
+    anyone paid, and would feed its own seasonality back into the index.
+    """
+    return pd.concat([
+        _frame(CommunityReport.objects.values_list('food_item', 'region', 'timestamp', 'price').iterator()),
+        _frame(HistoricalPrice.objects.values_list('commodity', 'region', 'date', 'price').iterator()),
+    ], ignore_index=True)
+
+
+def seasonality_indices(observations, min_observations=None):
+    """
+    Month-of-year price indices per (commodity, region). Each price is compared
+    with the mean log price of its commodity and region in the same year, which
+    takes out inflation and year-to-year level changes; a month's index is the
+    geometric mean of those ratios, normalized so the months average to 1.
+    Cells with fewer than min_observations prices, and commodities seen in
+    fewer than MIN_MONTHS months of the year, are dropped.
+    """
+    if min_observations is None:
+        min_observations = settings.SEASONALITY_MIN_OBSERVATIONS
+    frame = observations.dropna(subset=['commodity', 'region', 'when', 'price'])
+    frame = frame[frame['price'] > 0]
+    frame = frame.assign(year=frame['when'].dt.year, month=frame['when'].dt.month,
+                         log_price=np.log(frame['price'].astype(float)))
+
+    yearly_mean = frame.groupby(['commodity', 'region', 'year'])['log_price'].transform('mean')
+    frame = frame.assign(deviation=frame['log_price'] - yearly_mean)
+    cells = (frame.groupby(['commodity', 'region', 'month'])['deviation']
+             .agg(['mean', 'size']).reset_index())
+    cells = cells[cells['size'] >= min_observations]
+    # A profile needs several months before its best and worst months mean anything
+    cells = cells[cells.groupby(['commodity', 'region'])['month'].transform('size') >= MIN_MONTHS].copy()
+    # Re-center so the months we have average out to an index of 1
+    cells['mean'] -= cells.groupby(['commodity', 'region'])['mean'].transform('mean')
+    cells['index'] = np.exp(cells['mean']).round(4)
+    return cells.rename(columns={'size': 'observations'})[['commodity', 'region', 'month', 'index', 'observations']]
+
+
+def rebuild_seasonality(min_observations=None):
+    """Recompute the whole SeasonalityIndex table in one transaction. Returns the number of rows written."""
+    cells = seasonality_indices(load_observations(), min_observations)
+    computed_at = datetime.datetime.now(datetime.timezone.utc)
+    rows = [
+        SeasonalityIndex(commodity=commodity, region=region, month=int(month), index=float(index),
+                         observations=int(observations), computed_at=computed_at)
+        for commodity, region, month, index, observations in cells.itertuples(index=False, name=None)
+    ]
+    with transaction.atomic():
+        SeasonalityIndex.objects.all().delete()
+        SeasonalityIndex.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def recommendations(region, month):
+    """
+    Best months to sell and plant each commodity in a region, and how this
+    month's price compares, from a single query of the seasonality table.
+    """
+    by_commodity = {}
+    for cell in SeasonalityIndex.objects.filter(region=region).values_list('commodity', 'month', 'index'):
+        by_commodity.setdefault(cell[0], {})[cell[1]] = cell[2]
+
+    results = []
+    for commodity, months in sorted(by_commodity.items()):
+        sell_month = max(months, key=months.get)
+        cheapest_month = min(months, key=months.get)
+        grow = growing_months(commodity)
+        results.append({
+            'commodity': commodity,
+            'sell_month': MONTH_NAMES[sell_month - 1],
+            'sell_premium': round((months[sell_month] - 1) * 100),
+            'buy_month': MONTH_NAMES[cheapest_month - 1],
+            # Plant so the harvest lands in the dearest month
+            'plant_month': MONTH_NAMES[(sell_month - 1 - grow) % 12] if grow else None,
+            'this_month': round((months[month] - 1) * 100) if month in months else None,
+        })
+    # Commodities selling furthest above average this month first
+    results.sort(key=lambda row: (row['this_month'] is None, -(row['this_month'] or 0)))
+    return results
@@ -1,6 +1,16 @@
+import json
+from functools import lru_cache
+from operator import attrgetter
+
 from rest_framework import serializers
-from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
 from .models import Prediction
+from .renderers import orjson
+
+User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,4 +30,100 @@ class PredictionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Prediction
         fields = ('id', 'user', 'input_data', 'prediction', 'timestamp')
-        read_only_fields = ('user', 'timestamp') 
\ No newline at end of file
+        read_only_fields = ('user', 'timestamp') 
+
+def _datetime_converter():
+    """Render datetimes as DRF's DateTimeField does: ISO 8601 in the current time zone, with UTC as Z"""
+    tz = timezone.get_current_timezone()
+
+    def convert(value):
+        if timezone.is_aware(value):
+            value = value.astimezone(tz)
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _json_converter():
+    return orjson.loads if orjson is not None else json.loads
+
+
+# The read-only representation of PredictionSerializer's fields. Each is
+# (model attribute, converter, query): converter is None when the value is
+# used as is, else a factory called once per batch that returns the function
+# applied to each value. query, when set, is (values_list() expression,
+# converter) to fetch the value differently from the attribute.
+PREDICTION_READ_FIELDS = {
+    'id': ('id', None, None),
+    'user': ('user_id', None, None),
+    # Fetched as the stored JSON text: orjson parses it several times faster than JSONField's json.loads
+    'input_data': ('input_data', None, (Cast('input_data', TextField()), _json_converter)),
+    'prediction': ('prediction', None, None),
+    'timestamp': ('timestamp', _datetime_converter, None),
+}
+
+
+class ReadPlan:
+    """
+    A precompiled read path for the chosen fields: the values_list() lookups to
+    fetch and the conversions to apply, so a page of rows is serialized with a
+    zip per row instead of a tree of serializer fields per object.
+    """
+
+    def __init__(self, fields, spec):
+        self.fields = tuple(fields)
+        attributes, self.lookups = [], []
+        self._row_converters, self._instance_converters = [], []
+        for index, name in enumerate(self.fields):
+            attribute, convert, query = spec[name]
+            attributes.append(attribute)
+            self.lookups.append(query[0] if query else attribute)
+            if convert:
+                self._instance_converters.append((index, convert))
+            if query and query[1]:
+                self._row_converters.append((index, query[1]))
+            elif convert:
+                self._row_converters.append((index, convert))
+        self.lookups = tuple(self.lookups)
+        getter = attrgetter(*attributes)
+        self._attributes = getter if len(attributes) > 1 else (lambda obj: (getter(obj),))
+
+    @staticmethod
+    def _serialize(fields, rows, converters):
+        if not converters:
+            return [dict(zip(fields, row)) for row in rows]
+        converters = [(index, make()) for index, make in converters]
+        data = []
+        for row in rows:
+            row = list(row)
+            for index, convert in converters:
+                if row[index] is not None:
+                    row[index] = convert(row[index])
+            data.append(dict(zip(fields, row)))
+        return data
+
+    def from_tuples(self, rows):
+        """Serialize values_list() tuples fetched with self.lookups"""
+        return self._serialize(self.fields, rows, self._row_converters)
+
+    def from_instances(self, objects):
+        """Serialize model instances, e.g. rows that were not read with values_list()"""
+        return self._serialize(self.fields, map(self._attributes, objects), self._instance_converters)
+
+
+@lru_cache(maxsize=64)
+def _prediction_plan(fields):
+    return ReadPlan(fields, PREDICTION_READ_FIELDS)
+
+
+def prediction_read_plan(fields=None):
+    """
+    The read plan for a sparse fieldset such as "prediction,timestamp" (None or
+    empty for every field, in PredictionSerializer's order). Raises ValueError
+    naming an unknown field.
+    """
+    names = [name.strip() for name in (fields or '').split(',') if name.strip()]
+    for name in names:
+        if name not in PREDICTION_READ_FIELDS:
+            raise ValueError(f"Unknown field '{name}'; choose from {', '.join(PREDICTION_READ_FIELDS)}")
+    return _prediction_plan(tuple(dict.fromkeys(names)) or PredictionSerializer.Meta.fields)
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .conditional import bump_data_version
+from .models import Prediction
+
+
+# No post_delete receiver: it would stop Django deleting predictions in bulk without
+# loading them first (archive_predictions). Prediction.delete() and PredictionQuerySet's
+# delete() and update() bump the version instead, which covers the admin and bulk deletes.
+@receiver(post_save, sender=Prediction)
+def prediction_saved(sender, instance, **kwargs):
+    """Invalidate the user's predictions ETags"""
+    bump_data_version('predictions', instance.user_id)
@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import xgboost as xgb
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# predictor.inference loads the model when it is first imported, and the
+# trained model is not in the repository. The test runner trains a small
+# stand-in on synthetic prices before any test module is imported, so the
+# suite runs anywhere and never depends on a deployed model's predictions.
+
+SYNTHETIC_ROWS = 2000
+
+
+def write_synthetic_model(directory, rows=SYNTHETIC_ROWS, seed=0):
+    """Train an XGBRegressor on random inputs for the saved features and encoders. Returns its path."""
+    model_dir = os.path.join(settings.BASE_DIR, 'predictor', 'models')
+    encoders = joblib.load(os.path.join(model_dir, 'encoders_dict.pkl'))
+    features = list(joblib.load(os.path.join(model_dir, 'top_10_features2.pkl')))
+    rng = np.random.default_rng(seed)
+
+    X = np.empty((rows, len(features)))
+    for column, feature in enumerate(features):
+        if feature in encoders:
+            X[:, column] = rng.integers(0, len(encoders[feature].classes_), rows)
+        else:
+            X[:, column] = rng.uniform(0.5, 10, rows)
+    # Log prices that vary with every feature, like the real target
+    weights = rng.uniform(-0.05, 0.05, len(features))
+    y = 4.0 + X @ weights + rng.normal(0, 0.05, rows)
+
+    model = xgb.XGBRegressor(n_estimators=50, max_depth=4, random_state=seed, n_jobs=1)
+    model.fit(X, y)
+    path = os.path.join(directory, 'synthetic_model.pkl')
+    joblib.dump(model, path)
+    return path
+
+
+class SyntheticModelTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.model_directory = tempfile.TemporaryDirectory()
+        self.model_settings = override_settings(PREDICTION_MODEL_PATH=write_synthetic_model(self.model_directory.name))
+        self.model_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.model_settings.disable()
+        self.model_directory.cleanup()
+        super().teardown_test_environment(**kwargs)
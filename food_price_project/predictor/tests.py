@@ -1,3 +1,1012 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import decimal
+import json
+import io
+import os
+import runpy
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from aiohttp.test_utils import TestClient, TestServer
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.mail import EmailMessage, get_connection
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from speech_analysis.models import AudioRecording, SpeechAnalysis, UserAssessment, ProgressSession
+from .models import Prediction, CommunityReport, HistoricalPrice, SeasonalityIndex
+from .archive import archive_predictions, archived_predictions, hot_cutoff, predictions_for_user
+from . import basket, explain, warmup
+from .basket import (DEFAULT_BASKET, build_price_table, commodity_category, default_basket, get_price_table,
+                     price_basket)
+from .explain import explain_predictions
+from .fake_world import DEFAULT_LATENCY, FakeWorld, server_settings
+from .inference import MODEL_VERSION, encode_inputs, encoders, local_estimator, predict_prices, sample_inputs
+from .ingest import ingest_community_reports, validate_reports
+from .loadtest import ACCOUNT_PASSWORD, DEFAULT_WEIGHTS, Recorder, account, ensure_accounts, speech_clip
+from .inference_server import InferenceError, RemoteModel, serve
+from .model_backends import MODEL_BACKENDS, TreeEnsemble, build_model
+from .renderers import FastJSONRenderer
+from .serializers import PredictionSerializer, prediction_read_plan
+from .query_budget import QueryBudgetMiddleware, QueryBudgetMixin, budgeted_views, path_budget, query_budget
+from .seasonality import load_observations, recommendations, seasonality_indices
+from .throttling import count_request, throttle
+
+INPUT = {'Region': 'Nairobi', 'County': 'Nairobi', 'Market': 'Kangemi (Nairobi)', 'Commodity': 'Maize'}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Every view with a query budget runs a constant number of queries, within that budget"""
+
+    # Views checked below; adding @query_budget to a view means adding a test here
+    COVERED = {
+        'download_predictions', 'cheapest_market', 'community_reporting', 'budget_estimator',
+        'planting_selling_suggestions', 'prediction-list', 'prediction-detail',
+        'speech_analysis:dashboard', 'speech_analysis:progress_sessions', 'speech_analysis:metric_history',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='budget', password='budget-password')
+        cls.others = [get_user_model().objects.create_user(username=f'reporter-{i}') for i in range(3)]
+
+    def setUp(self):
+        # The archive-backed list view must not read or write a shared directory
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive_settings = override_settings(PREDICTION_ARCHIVE_DIR=directory.name)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+        self.client.force_login(self.user)
+
+    def seed_predictions(self, count):
+        Prediction.objects.bulk_create([Prediction(user=self.user, input_data=INPUT, prediction=50.0 + i)
+                                        for i in range(count)])
+
+    def seed_reports(self, count):
+        CommunityReport.objects.bulk_create([
+            CommunityReport(user=self.others[i % len(self.others)], food_item='Maize', region='Nairobi',
+                            market=f'Market {i}', price=40.0 + i)
+            for i in range(count)
+        ])
+
+    def seed_seasonality(self, count):
+        start = SeasonalityIndex.objects.count()
+        SeasonalityIndex.objects.bulk_create([
+            SeasonalityIndex(commodity=f'Commodity {(start + i) // 12}', region='Nairobi', month=(start + i) % 12 + 1,
+                             index=1.0 + (i % 5) / 10, observations=5, computed_at=timezone.now())
+            for i in range(count)
+        ])
+
+    def seed_sessions(self, count):
+        for i in range(count):
+            recording = AudioRecording.objects.create(user=self.user, filename=f'r{i}.opus', original_filename='r.webm')
+            analysis = SpeechAnalysis.objects.create(recording=recording, speech_rate=120.0 + i, pause_count=i,
+                                                     volume_variation=0.1, pitch_variation=20.0, energy_level=0.5)
+            assessment = UserAssessment.objects.create(user=self.user, recording=recording, confidence=7,
+                                                       clarity=6, pace=8, reflection='')
+            ProgressSession.objects.create(user=self.user, recording=recording, assessment=assessment,
+                                           analysis=analysis)
+
+    def test_every_budgeted_view_is_covered(self):
+        self.assertEqual(set(budgeted_views()), self.COVERED)
+
+    def test_download_predictions(self):
+        self.assertQueryBudget(reverse('download_predictions'), self.seed_predictions)
+
+    def test_cheapest_market(self):
+        self.assertQueryBudget(reverse('cheapest_market'), self.seed_reports, method='post',
+                               data={'Commodity': 'Maize', 'Region': 'Nairobi'})
+
+    def test_community_reporting(self):
+        self.assertQueryBudget(reverse('community_reporting'), self.seed_reports)
+
+    def test_budget_estimator(self):
+        self.assertQueryBudget(reverse('budget_estimator'), self.seed_predictions)
+
+    def test_planting_selling_suggestions(self):
+        self.assertQueryBudget(reverse('planting_selling_suggestions'), self.seed_seasonality, method='post',
+                               data={'Region': 'Nairobi', 'month': 'March'})
+
+    def test_prediction_list(self):
+        self.assertQueryBudget(reverse('prediction-list') + '?page_size=100', self.seed_predictions)
+
+    def test_prediction_list_with_archive(self):
+        start = (timezone.now() - datetime.timedelta(days=30)).date().isoformat()
+        self.assertQueryBudget(reverse('prediction-list') + f'?archived=1&start={start}', self.seed_predictions)
+
+    def test_prediction_detail(self):
+        self.seed_predictions(1)
+        path = reverse('prediction-detail', args=[Prediction.objects.get(user=self.user).pk])
+        self.assertQueryBudget(path, self.seed_predictions)
+
+    def test_speech_dashboard(self):
+        self.assertQueryBudget(reverse('speech_analysis:dashboard'), self.seed_sessions)
+
+    def test_progress_sessions(self):
+        self.assertQueryBudget(reverse('speech_analysis:progress_sessions'), self.seed_sessions)
+
+    def test_metric_history(self):
+        self.assertQueryBudget(reverse('speech_analysis:metric_history'), self.seed_sessions)
+        self.assertQueryBudget(reverse('speech_analysis:metric_history') + '?bucket=week&window=3', self.seed_sessions)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_growing_query_count_fails(self):
+        with self.assertRaisesMessage(AssertionError, 'the query count grows with the data'):
+            self.assertQueryBudget('/reporters/', self.seed_reports)
+
+    @override_settings(ROOT_URLCONF=__name__, DEBUG=True)
+    def test_debug_warns_over_budget(self):
+        self.seed_reports(120)
+        with self.assertLogs('predictor.query_budget', 'WARNING') as logs:
+            self.client.get('/reporters/')
+        self.assertIn('over its budget of 100', logs.output[0])
+
+    @override_settings(ROOT_URLCONF=__name__, DEBUG=True)
+    def test_debug_is_quiet_within_budget(self):
+        self.seed_reports(5)
+        with self.assertNoLogs('predictor.query_budget', 'WARNING'):
+            self.client.get('/reporters/')
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_constant_count_over_budget_fails(self):
+        with self.assertRaisesMessage(AssertionError, 'ran 4 queries with 2 rows, over its budget of 3'):
+            self.assertQueryBudget('/report-summary/', self.seed_reports)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_view_without_budget_fails(self):
+        with self.assertRaisesMessage(AssertionError, '/unbudgeted/ has no query budget'):
+            self.assertQueryBudget('/unbudgeted/', self.seed_reports)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_budgeted_views(self):
+        self.assertEqual(budgeted_views(), {'reporters': 100, 'report_summary': 3})
+
+    def test_viewset_budgets_are_per_action(self):
+        self.assertEqual(path_budget(reverse('prediction-list') + '?fields=id'), 5)
+        self.assertIsNone(path_budget(reverse('prediction-list'), 'POST'))
+        self.assertEqual(path_budget(reverse('prediction-detail', args=[1])), 3)
+        self.assertIsNone(path_budget(reverse('prediction-explanation', args=[1])))
+
+    def test_middleware_only_runs_in_debug(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryBudgetMiddleware(lambda request: HttpResponse())
+
+
+class IngestTests(TestCase):
+    def validate(self, prices):
+        frame = pd.DataFrame({'food_item': 'maize ', 'region': 'Nairobi', 'market': 'Dandora', 'price': prices})
+        return validate_reports(frame, encoders)
+
+    def test_prices_with_currency_and_thousands_separators(self):
+        clean, errors = self.validate(['Ksh. 120', 'KES130', '140/=', '1,200', '1,250.50 kes', 99.5])
+        self.assertEqual(errors, {})
+        self.assertEqual(list(clean['price']), [120.0, 130.0, 140.0, 1200.0, 1250.5, 99.5])
+        self.assertEqual(set(clean['food_item']), {'Maize'})
+
+    def test_ambiguous_and_invalid_prices_are_rejected(self):
+        clean, errors = self.validate(['1.200,50', '120,50', '120 - 150', 'abc', '', '-5', '0'])
+        self.assertTrue(clean.empty)
+        self.assertIn("ambiguous price '1.200,50'", errors[0][0])
+        self.assertIn("ambiguous price '120,50'", errors[1][0])
+        self.assertEqual(errors[2], ["more than one number in price '120 - 150'"])
+        self.assertEqual(errors[3], ["invalid price 'abc'"])
+        self.assertEqual(errors[4], ["missing price"])
+        self.assertEqual(errors[5], ["invalid price '-5'"])
+        self.assertEqual(errors[6], ["invalid price '0'"])
+
+    def test_quantity_and_duplicates(self):
+        frame = pd.DataFrame({'food_item': 'Maize', 'region': 'Nairobi', 'market': ['Dandora', 'Dandora', 'Nowhere'],
+                              'price': ['500', '500', '10'], 'quantity': ['5', '', '1']})
+        clean, errors = validate_reports(frame, encoders)
+        self.assertEqual(list(clean['price']), [100.0, 500.0])
+        self.assertEqual(errors, {2: ["unknown market 'Nowhere'"]})
+
+    def test_ingest_inserts_valid_rows_and_reports_rejects(self):
+        user = get_user_model().objects.create_user(username='ingest')
+        csv = "commodity,region,market,price\nMaize,Nairobi,Dandora,Ksh 45\nMaize,Nairobi,Dandora,\"4,5\"\n"
+        created, rejects = ingest_community_reports(user, csv, encoders)
+        self.assertEqual(created, 1)
+        self.assertEqual(CommunityReport.objects.get().price, 45.0)
+        self.assertEqual(rejects[0]['row'], 2)
+
+class ImportPricesTests(TestCase):
+    def test_reimport_counts_only_new_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'prices.csv')
+            with open(path, 'w') as f:
+                f.write("date,admin1,market,commodity,price\n#date,#adm1,#loc,#item,#value\n"
+                        "2024-01-15,Nairobi,Dandora,maize,\"1,200\"\n2024-02-15,Nairobi,Dandora,Maize,1300\n"
+                        "2024-02-15,Nairobi,Nowhere,Maize,1300\n")
+            checkpoint = os.path.join(directory, 'checkpoint.json')
+            output = io.StringIO()
+            call_command('import_prices', path, checkpoint=checkpoint, stdout=output)
+            self.assertIn('2 rows accepted, 2 skipped, 0 already imported', output.getvalue())
+            output = io.StringIO()
+            call_command('import_prices', path, checkpoint=checkpoint, stdout=output)
+            self.assertIn('0 rows accepted, 2 skipped, 2 already imported', output.getvalue())
+        self.assertEqual(sorted(HistoricalPrice.objects.values_list('price', flat=True)), [1200.0, 1300.0])
+
+    def test_duplicates_across_chunks_are_counted_from_the_chunk_dates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'prices.csv')
+            with open(path, 'w') as f:
+                f.write("date,admin1,market,commodity,price\n2024-01-15,Nairobi,Dandora,Maize,100\n"
+                        "2024-02-15,Nairobi,Dandora,Maize,110\n2024-01-15,Nairobi,Dandora,Maize,100\n")
+            output = io.StringIO()
+            with CaptureQueriesContext(connection) as queries:
+                call_command('import_prices', path, '--chunk-size', '1',
+                             checkpoint=os.path.join(directory, 'checkpoint.json'), stdout=output)
+        self.assertIn('2 rows accepted, 0 skipped, 1 already imported', output.getvalue())
+        counts = [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql']]
+        self.assertEqual(len(counts), 6)
+        # Each count only covers the chunk's dates, not everything imported from the source
+        for sql in counts:
+            self.assertIn('"date" BETWEEN', sql)
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='archivist')
+        other = get_user_model().objects.create_user(username='someone-else')
+        now = timezone.now()
+        # Ten recent predictions and thirty spread over the six months before the hot cutoff
+        ages = [datetime.timedelta(days=i) for i in range(10)] + \
+            [datetime.timedelta(days=100 + 6 * i, hours=i) for i in range(30)]
+        for i, age in enumerate(ages):
+            for user in (cls.user, other):
+                prediction = Prediction.objects.create(user=user, input_data={**INPUT, 'n': i}, prediction=float(i))
+                Prediction.objects.filter(pk=prediction.pk).update(timestamp=now - age)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive_dir = directory.name
+        settings = override_settings(PREDICTION_ARCHIVE_DIR=self.archive_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.expected = list(Prediction.objects.filter(user=self.user).order_by('-timestamp', '-id')
+                             .values_list('id', flat=True))
+        self.assertEqual(sum(archive_predictions(hot_cutoff()).values()), 60)
+        self.client.force_login(self.user)
+
+    def test_pages_merge_database_and_archive(self):
+        seen = []
+        url = reverse('prediction-list') + '?archived=1&page_size=7&fields=id'
+        while url:
+            body = self.client.get(url).json()
+            self.assertEqual(body['count'], 40)
+            seen += [row['id'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(seen, self.expected)
+
+    def test_page_reads_only_the_months_it_needs(self):
+        history = predictions_for_user(self.user, include_archive=True)
+        oldest_year = os.path.join(self.archive_dir, min(os.listdir(self.archive_dir)))
+        oldest_month = os.path.join(oldest_year, min(os.listdir(oldest_year)))
+        for name in os.listdir(oldest_month):
+            with open(os.path.join(oldest_month, name), 'wb') as f:
+                f.write(b'not parquet')
+        # The first pages never open the (now unreadable) oldest month
+        self.assertEqual([prediction.id for prediction in history[:15]], self.expected[:15])
+        with self.assertRaises(Exception):
+            list(history)
+
+    def test_rows_in_both_places_are_counted_once(self):
+        # An interrupted archive run: the file was written, the rows not yet deleted
+        for archived in archived_predictions(self.user, limit=3):
+            timestamp = archived.timestamp  # auto_now_add overwrites it on save
+            Prediction.objects.bulk_create([archived])
+            Prediction.objects.filter(pk=archived.pk).update(timestamp=timestamp)
+        history = predictions_for_user(self.user, include_archive=True)
+        self.assertEqual(history.count(), 40)
+        self.assertEqual([prediction.id for prediction in history], self.expected)
+        self.assertEqual([prediction.id for prediction in history[:5]], self.expected[:5])
+
+    def test_download_includes_the_archive(self):
+        response = self.client.get(reverse('download_predictions'))
+        self.assertEqual(len(response.content.decode().strip().splitlines()), 41)
+
+
+class SeasonalityTests(TestCase):
+    # Maize is dearest in March and cheapest in September; prices double between the two years
+    FACTORS = {month: 1 + 0.3 * np.cos((month - 3) / 12 * 2 * np.pi) for month in range(1, 13)}
+
+    def observations(self, commodity='Maize', months=range(1, 13), per_month=3):
+        rows = [
+            (commodity, 'Nairobi', datetime.datetime(year, month, 1 + market, tzinfo=datetime.timezone.utc),
+             level * self.FACTORS[month])
+            for year, level in ((2022, 40.0), (2023, 80.0))
+            for month in months
+            for market in range(per_month)
+        ]
+        return pd.DataFrame.from_records(rows, columns=['commodity', 'region', 'when', 'price'])
+
+    def test_indices_follow_the_seasonal_pattern(self):
+        cells = seasonality_indices(self.observations(), min_observations=3)
+        indices = dict(zip(cells['month'], cells['index']))
+        geometric_mean = np.exp(np.mean(np.log(list(self.FACTORS.values()))))
+        for month, factor in self.FACTORS.items():
+            self.assertAlmostEqual(indices[month], factor / geometric_mean, places=3)
+        self.assertEqual(set(cells['observations']), {6})
+
+    def test_thin_cells_and_profiles_are_dropped(self):
+        frame = pd.concat([
+            self.observations(),
+            self.observations(commodity='Beans', per_month=1),          # too few prices per month
+            self.observations(commodity='Kale', months=range(1, 4)),   # too few months of the year
+        ], ignore_index=True)
+        cells = seasonality_indices(frame, min_observations=3)
+        self.assertEqual(set(cells['commodity']), {'Maize'})
+
+    def test_predictions_are_not_observations(self):
+        user = get_user_model().objects.create_user(username='seasonal')
+        Prediction.objects.create(user=user, input_data=INPUT, prediction=55.0)
+        CommunityReport.objects.create(user=user, food_item='Maize', region='Nairobi', market='Kangemi', price=50.0)
+        HistoricalPrice.objects.create(date=datetime.date(2023, 3, 1), region='Nairobi', market='Kangemi',
+                                       commodity='Maize', price=45.0, source='test.csv')
+        self.assertEqual(sorted(load_observations()['price']), [45.0, 50.0])
+
+    def test_recommendations(self):
+        computed_at = timezone.now()
+        SeasonalityIndex.objects.bulk_create([
+            SeasonalityIndex(commodity=commodity, region='Nairobi', month=month, index=index,
+                             observations=5, computed_at=computed_at)
+            for commodity, indices in (('Maize', {1: 1.1, 3: 1.25, 6: 0.95, 9: 0.7}),
+                                       ('Beef', {1: 0.9, 3: 1.05, 5: 1.2, 9: 0.85}))
+            for month, index in indices.items()
+        ] + [SeasonalityIndex(commodity='Maize', region='Mombasa', month=3, index=2.0, observations=5,
+                              computed_at=computed_at)])
+        maize, beef = recommendations('Nairobi', 3)
+        self.assertEqual(maize, {'commodity': 'Maize', 'sell_month': 'March', 'sell_premium': 25,
+                                 'buy_month': 'September', 'plant_month': 'November', 'this_month': 25})
+        self.assertEqual((beef['sell_month'], beef['plant_month'], beef['this_month']), ('May', None, 5))
+        # A commodity without an index for the month sorts last
+        self.assertEqual([row['commodity'] for row in recommendations('Nairobi', 5)], ['Beef', 'Maize'])
+
+
+class ExplanationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.inputs = sample_inputs(6, np.random.default_rng(7))
+        self.X = encode_inputs(self.inputs)
+
+    def test_contributions_add_up_to_the_prediction(self):
+        prices = predict_prices(self.X)
+        for explanation, price in zip(explain_predictions(self.X), prices):
+            effects = [contribution['effect'] for contribution in explanation['contributions']]
+            self.assertAlmostEqual(explanation['price'], price, delta=0.02)
+            self.assertAlmostEqual(np.exp(np.log(explanation['base_price']) + sum(effects)), price, delta=price * 1e-3)
+            # Largest effect first, one entry per feature
+            self.assertEqual(sorted(effects, key=abs, reverse=True), effects)
+            self.assertEqual(len(effects), self.X.shape[1])
+
+    def test_cached_per_row_and_deduplicated(self):
+        with mock.patch('predictor.explain._contributions', wraps=explain._contributions) as contributions:
+            first = explain_predictions(np.vstack([self.X, self.X[:2]]))
+            self.assertEqual(len(contributions.call_args.args[0]), 6)  # the repeated rows are explained once
+            self.assertEqual(first[6:], first[:2])
+            # Seen rows come from the cache; only the new one is explained
+            new = encode_inputs(sample_inputs(1, np.random.default_rng(8)))
+            again = explain_predictions(np.vstack([self.X, new]))
+            self.assertEqual(contributions.call_count, 2)
+            self.assertEqual(len(contributions.call_args.args[0]), 1)
+        self.assertEqual(again[:6], first[:6])
+
+    def test_batch_endpoint(self):
+        self.client.force_login(get_user_model().objects.create_user(username='explorer'))
+        url = reverse('api_explanations')
+        body = self.client.post(url, {'inputs': self.inputs}, content_type='application/json').json()
+        self.assertEqual(body['model_version'], MODEL_VERSION)
+        self.assertEqual([row['prediction'] for row in body['results']], predict_prices(self.X))
+        self.assertEqual(len(self.client.post(url, self.inputs[0], content_type='application/json').json()['results']), 1)
+
+        self.assertEqual(self.client.post(url, [1, 2], content_type='application/json').status_code, 400)
+        bad = {**self.inputs[0], 'Market': 'Atlantis'}
+        self.assertEqual(self.client.post(url, [bad], content_type='application/json').status_code, 400)
+        with override_settings(EXPLANATION_BATCH_MAX_ROWS=5):
+            response = self.client.post(url, self.inputs, content_type='application/json')
+        self.assertEqual(response.status_code, 413)
+
+
+class BasketTests(TestCase):
+    LOCATION = ('Nairobi', 'Nairobi', 'Kangemi')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_table_matches_single_predictions(self):
+        table = build_price_table(*self.LOCATION)
+        self.assertEqual(set(table['prices']), set(encoders['Commodity'].classes_))
+        for commodity in ('Maize flour', 'Beans', 'Sugar'):
+            row = {**settings.BASKET_FEATURE_DEFAULTS, 'Commodity': commodity,
+                   'Commodity Category': commodity_category(commodity),
+                   'Region': 'Nairobi', 'County': 'Nairobi', 'Market': 'Kangemi'}
+            self.assertEqual(table['prices'][commodity], predict_prices(encode_inputs([row]))[0])
+
+    def test_table_is_cached_until_refreshed(self):
+        with mock.patch('predictor.basket.build_price_table', wraps=build_price_table) as build:
+            first = get_price_table(*self.LOCATION)
+            self.assertEqual(get_price_table(*self.LOCATION), first)
+            self.assertEqual(build.call_count, 1)
+            get_price_table(*self.LOCATION, refresh=True)
+            self.assertEqual(build.call_count, 2)
+
+    def test_price_basket(self):
+        prices = get_price_table(*self.LOCATION)['prices']
+        basket = price_basket([{'commodity': 'Rice', 'quantity': 2}, {'commodity': 'Rice', 'quantity': '0.5'}],
+                              *self.LOCATION)
+        self.assertEqual([item['cost'] for item in basket['items']],
+                         [round(prices['Rice'] * 2, 2), round(prices['Rice'] * 0.5, 2)])
+        self.assertEqual(basket['total'], round(sum(item['cost'] for item in basket['items']), 2))
+        for items, error in (([{'commodity': 'Caviar'}], "unknown commodity 'Caviar'"),
+                             ([{'commodity': 'Rice', 'quantity': 'lots'}], 'quantity must be a number'),
+                             ([{'commodity': 'Rice', 'quantity': 0}], 'quantity must be positive')):
+            with self.assertRaisesMessage(ValueError, error):
+                price_basket(items, *self.LOCATION)
+
+    def test_default_basket_scales_with_household(self):
+        single, family = default_basket(1), default_basket(4)
+        self.assertEqual([item['commodity'] for item in single], list(DEFAULT_BASKET))
+        self.assertEqual([item['quantity'] for item in family], [round(q * 4, 2) for q in DEFAULT_BASKET.values()])
+
+    def test_endpoint(self):
+        self.client.force_login(get_user_model().objects.create_user(username='shopper'))
+        url = reverse('api_basket')
+        location = dict(zip(('region', 'county', 'market'), self.LOCATION))
+        body = self.client.post(url, {**location, 'household_size': 3}, content_type='application/json').json()
+        self.assertEqual(len(body['items']), len(DEFAULT_BASKET))
+        self.assertEqual(self.client.post(url, {**location, 'market': 'Atlantis'},
+                                          content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, {**location, 'items': 'rice'},
+                                          content_type='application/json').status_code, 400)
+
+    def test_refresh_command(self):
+        HistoricalPrice.objects.create(date=datetime.date(2024, 1, 15), region='Nairobi', county='Nairobi',
+                                       market='Kangemi', commodity='Maize', price=50.0, source='a.csv')
+        HistoricalPrice.objects.create(date=datetime.date(2024, 1, 15), region='Nowhere', county='Nowhere',
+                                       market='Nowhere', commodity='Maize', price=50.0, source='a.csv')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('refresh_price_tables', stdout=out, stderr=err)
+        self.assertIn('Refreshed 1 price tables', out.getvalue())
+        self.assertIsNotNone(cache.get(basket._table_key(*self.LOCATION)))
+        call_command('refresh_price_tables', '--market', 'Nairobi/Nairobi/Atlantis', stdout=out, stderr=err)
+        self.assertIn("Nairobi/Nairobi/Atlantis: Unknown Market 'Atlantis'", err.getvalue())
+
+
+class LoadTestTests(TestCase):
+    """The fake upstream services and the load generator's bookkeeping"""
+
+    def setUp(self):
+        self.world = FakeWorld({service: 0 for service in DEFAULT_LATENCY})
+
+    async def fake_api_calls(self):
+        async with TestClient(TestServer(self.world.app())) as client:
+            search = await (await client.get('/serpapi/search.json', params={'num': '2'})).json()
+            chat = await (await client.post('/openai/v1/chat/completions', json={'model': 'gpt-4o-mini'})).json()
+            sms = await client.post('/twilio/2010-04-01/Accounts/ACfake/Messages.json',
+                                    data={'To': '+254700000001', 'From': '+15005550006', 'Body': 'Hi'})
+            stats = await (await client.get('/stats')).json()
+            return search, chat, sms.status, await sms.json(), stats
+
+    def test_fake_apis_answer_in_the_services_shape(self):
+        search, chat, sms_status, sms, stats = asyncio.run(self.fake_api_calls())
+        self.assertEqual([result['position'] for result in search['organic_results']], [1, 2])
+        self.assertEqual(chat['model'], 'gpt-4o-mini')
+        self.assertEqual(chat['choices'][0]['message']['role'], 'assistant')
+        self.assertEqual(sms_status, 201)
+        self.assertEqual((sms['account_sid'], sms['to'], sms['body']), ('ACfake', '+254700000001', 'Hi'))
+        self.assertEqual(stats['calls'], {'serpapi': 1, 'openai': 1, 'twilio': 1})
+
+    async def send_mail_to_fake_smtp(self, messages):
+        server = await asyncio.start_server(self.world.handle_smtp, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        environment = server_settings('http://127.0.0.1:8900', port)
+
+        def send():
+            connection = get_connection('django.core.mail.backends.smtp.EmailBackend',
+                                        host=environment['EMAIL_HOST'], port=int(environment['EMAIL_PORT']),
+                                        use_tls=environment['EMAIL_USE_TLS'] == 'True',
+                                        username=environment['EMAIL_HOST_USER'],
+                                        password=environment['EMAIL_HOST_PASSWORD'])
+            return connection.send_messages(messages)
+
+        async with server:
+            return await asyncio.get_running_loop().run_in_executor(None, send)
+
+    def test_fake_smtp_accepts_django_mail(self):
+        messages = [EmailMessage(f'Price alert {i}', 'Maize is cheaper today.\n.\nReally.',
+                                 'loadtest@example.com', ['user@example.com']) for i in range(2)]
+        self.assertEqual(asyncio.run(self.send_mail_to_fake_smtp(messages)), 2)
+        self.assertEqual(self.world.calls['smtp'], 2)
+
+    def test_ensure_accounts_only_creates_missing_users(self):
+        self.assertEqual(ensure_accounts(3), 3)
+        self.assertEqual(ensure_accounts(5), 2)
+        self.assertEqual(ensure_accounts(5), 0)
+        details = account(4)
+        user = get_user_model().objects.get(username=details['username'])
+        self.assertTrue(user.check_password(ACCOUNT_PASSWORD))
+        self.assertEqual(user.phone_number, '+254700000004')
+
+    def test_recorder_summary(self):
+        recorder = Recorder()
+        for latency in (0.01, 0.02, 0.03, 0.04):
+            recorder.add(0, 'predict', latency, 200)
+        recorder.add(0, 'chatbot', 0.5, 429)
+        recorder.add(0, 'chatbot', 0.6, None)
+        recorder.add(0, 'chatbot', 0.7, 500)
+        recorder.add(1, 'predict', 1.0, 200)
+
+        summary = recorder.summary(0, 2.0)
+        self.assertEqual(list(summary), ['chatbot', 'predict', 'all'])
+        self.assertEqual(summary['predict'], {'requests': 4, 'rps': 2.0, 'errors': 0, 'throttled': 0,
+                                              'p50': 25.0, 'p95': 38.5, 'p99': 39.7})
+        self.assertEqual((summary['chatbot']['errors'], summary['chatbot']['throttled']), (2, 1))
+        self.assertEqual(summary['all']['requests'], 7)
+        self.assertEqual(recorder.summary(2, 1.0)['all'], {'requests': 0, 'rps': 0.0, 'errors': 0, 'throttled': 0,
+                                                           'p50': None, 'p95': None, 'p99': None})
+
+    def test_speech_clip_is_a_ten_second_flac(self):
+        info = sf.info(io.BytesIO(speech_clip()))
+        self.assertEqual(info.format, 'FLAC')
+        self.assertAlmostEqual(info.duration, 10, places=1)
+
+    def test_commands_reject_unknown_names(self):
+        with self.assertRaisesMessage(CommandError, "Unknown scenario 'browse'"):
+            call_command('loadtest', '--scenario', 'browse=1')
+        with self.assertRaisesMessage(CommandError, 'Every scenario is turned off'):
+            call_command('loadtest', *[f'--scenario={name}=0' for name in DEFAULT_WEIGHTS])
+        with self.assertRaisesMessage(CommandError, "Unknown service 'stripe'"):
+            call_command('fake_world', '--latency', 'stripe=1')
+        with self.assertRaisesMessage(CommandError, 'seconds must be a number'):
+            call_command('fake_world', '--latency', 'openai=slow')
+
+
+class WarmupTests(TestCase):
+    """Warm-up steps and the /ready probe that waits for them"""
+
+    def setUp(self):
+        saved_state, saved_thread = warmup.readiness(), warmup._thread
+        warmup._thread = None
+        warmup._state.update(status='cold', steps={}, error=None)
+
+        def restore():
+            warmup._thread = saved_thread
+            warmup._state.update(saved_state)
+        self.addCleanup(restore)
+
+    def test_warm_up_runs_every_step(self):
+        state = warmup.warm_up()
+        self.assertEqual(state['status'], 'ready', state['error'])
+        self.assertEqual(list(state['steps']), [name for name, _ in warmup.WARMUP_STEPS])
+        self.assertIsNone(state['error'])
+
+    def test_failed_step_stops_the_warm_up(self):
+        ran = []
+
+        def fail():
+            raise ValueError('model file is missing')
+        steps = [('urls', lambda: ran.append('urls')), ('model', fail), ('catalog', lambda: ran.append('catalog'))]
+        with mock.patch.object(warmup, 'WARMUP_STEPS', steps), self.assertLogs('predictor.warmup', 'ERROR'):
+            state = warmup.warm_up()
+        self.assertEqual(ran, ['urls'])
+        self.assertEqual(state['status'], 'failed')
+        self.assertEqual(state['error'], 'model: model file is missing')
+        self.assertEqual(list(state['steps']), ['urls'])
+
+    def test_ready_answers_503_until_warm(self):
+        release = threading.Event()
+        calls = []
+
+        def slow_step():
+            calls.append(1)
+            release.wait(5)
+        with mock.patch.object(warmup, 'WARMUP_STEPS', [('slow', slow_step)]):
+            response = self.client.get(reverse('ready'))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['status'], 'warming')
+            # Probes while warming do not start a second warm-up
+            self.assertEqual(self.client.get(reverse('ready')).status_code, 503)
+            release.set()
+            warmup._thread.join(5)
+            response = self.client.get(reverse('ready'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ready')
+        self.assertEqual(list(response.json()['steps']), ['slow'])
+        self.assertEqual(len(calls), 1)
+
+    def test_preload_leaves_workers_warm(self):
+        with mock.patch.object(warmup, 'WARMUP_STEPS', [('urls', warmup.warm_urls)]), \
+                mock.patch.object(warmup, 'connections') as connections, \
+                mock.patch.object(warmup, 'close_caches') as close_caches, \
+                mock.patch.object(warmup, 'gc') as gc:
+            state = warmup.preload()
+        self.assertEqual(state['status'], 'ready')
+        connections.close_all.assert_called_once_with()
+        close_caches.assert_called_once_with()
+        gc.freeze.assert_called_once_with()
+        # A worker forked from this master starts no warm-up thread of its own
+        warmup.start_warmup()
+        self.assertIsNone(warmup._thread)
+        self.assertEqual(self.client.get(reverse('ready')).status_code, 200)
+
+    def test_worker_retries_a_failed_preload(self):
+        step = mock.Mock(side_effect=[RuntimeError('out of memory'), None])
+        with mock.patch.object(warmup, 'WARMUP_STEPS', [('model', step)]), mock.patch.object(warmup, 'gc'), \
+                self.assertLogs('predictor.warmup', 'ERROR'):
+            self.assertEqual(warmup.preload()['status'], 'failed')
+            # The first probe starts the retry
+            self.client.get(reverse('ready'))
+            warmup._thread.join(5)
+        self.assertEqual(step.call_count, 2)
+        self.assertEqual(self.client.get(reverse('ready')).status_code, 200)
+
+    def gunicorn_config(self, preload_app):
+        with mock.patch.dict(os.environ, {'PRELOAD_APP': str(preload_app)}):
+            os.environ.pop('WARMUP_ON_START', None)
+            config = runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+            return config, os.environ.get('WARMUP_ON_START')
+
+    def test_gunicorn_preloads_in_the_master(self):
+        config, warmup_on_start = self.gunicorn_config(True)
+        self.assertTrue(config['preload_app'])
+        # Workers must not start their own warm-up thread on import
+        self.assertEqual(warmup_on_start, 'False')
+        server = mock.Mock()
+        with mock.patch.object(warmup, 'preload', return_value={'status': 'ready', 'steps': {'urls': 1.0},
+                                                                'error': None}) as preload:
+            config['when_ready'](server)
+        preload.assert_called_once_with()
+        self.assertIn('Preloaded before forking workers: ready', server.log.info.call_args[0][0])
+
+    def test_gunicorn_without_preload_warms_each_worker(self):
+        config, warmup_on_start = self.gunicorn_config(False)
+        self.assertFalse(config['preload_app'])
+        self.assertIsNone(warmup_on_start)
+        with mock.patch.object(warmup, 'preload') as preload:
+            config['when_ready'](mock.Mock())
+        preload.assert_not_called()
+
+
+class ReadPlanTests(TestCase):
+    """Prediction reads through values_list() and a read plan match PredictionSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='reader', password='reader-password')
+        Prediction.objects.bulk_create([
+            Prediction(user=cls.user, input_data={**INPUT, 'Note': 'caf\u00e9 \u2028'}, prediction=50.25 + i)
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_matches_the_serializer(self):
+        queryset = Prediction.objects.filter(user=self.user)
+        expected = PredictionSerializer(queryset, many=True).data
+        plan = prediction_read_plan()
+        self.assertEqual(plan.fields, PredictionSerializer.Meta.fields)
+        self.assertEqual(plan.from_tuples(queryset.values_list(*plan.lookups)), expected)
+        self.assertEqual(plan.from_instances(queryset), expected)
+
+    def test_sparse_fieldsets(self):
+        plan = prediction_read_plan(' timestamp,prediction,timestamp ')
+        self.assertEqual(plan.fields, ('timestamp', 'prediction'))
+        self.assertIs(prediction_read_plan('timestamp,prediction'), plan)
+        prediction = Prediction.objects.filter(user=self.user).first()
+        self.assertEqual(plan.from_instances([prediction]),
+                         [{'timestamp': PredictionSerializer(prediction).data['timestamp'],
+                           'prediction': prediction.prediction}])
+        with self.assertRaisesMessage(ValueError, "Unknown field 'price'; choose from id, user,"):
+            prediction_read_plan('prediction,price')
+
+    def test_api_fields_option(self):
+        response = self.client.get(reverse('prediction-list') + '?fields=prediction,id')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([list(row) for row in response.json()['results']], [['prediction', 'id']] * 3)
+
+        prediction = Prediction.objects.filter(user=self.user).first()
+        response = self.client.get(reverse('prediction-detail', args=[prediction.pk]) + '?fields=input_data')
+        self.assertEqual(response.json(), {'input_data': prediction.input_data})
+
+        response = self.client.get(reverse('prediction-list') + '?fields=price')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown field 'price'", response.json()['error'])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer renders byte for byte what DRF's JSONRenderer does"""
+
+    DATA = {
+        'when': datetime.datetime(2024, 3, 1, 12, 30, tzinfo=datetime.timezone.utc),
+        'day': datetime.date(2024, 3, 1),
+        'price': decimal.Decimal('12.50'),
+        'label': gettext_lazy('Maize'),
+        'text': 'caf\u00e9 \u2028 \u2029 </script>',
+        'rows': [{'id': 1, 'value': 1.5, 'missing': None}],
+    }
+
+    def assertSameRendering(self, data, context=None, media_type=None):
+        context = context or {}
+        expected = JSONRenderer().render(data, media_type, context)
+        self.assertEqual(FastJSONRenderer().render(data, media_type, context), expected)
+        return expected
+
+    def test_same_output(self):
+        rendered = self.assertSameRendering(self.DATA)
+        self.assertIn(b'\\u2028', rendered)
+        self.assertEqual(json.loads(rendered)['when'], '2024-03-01T12:30:00Z')
+
+    def test_falls_back(self):
+        # orjson rejects non-string keys; indented output and a missing orjson use the standard encoder
+        self.assertSameRendering({1: 'one'})
+        self.assertSameRendering(self.DATA, {'indent': 2})
+        self.assertSameRendering(self.DATA, media_type='application/json; indent=4')
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        with mock.patch('predictor.renderers.orjson', None):
+            self.assertSameRendering(self.DATA)
+
+
+@override_settings(THROTTLE_RATES={'test': '3/min', 'prediction_api': '1/min'})
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 6000.0  # the start of a one-minute window
+        patcher = mock.patch('predictor.throttling.time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_up_to_the_limit(self):
+        self.assertEqual([count_request('test', 'a') for _ in range(3)], [None, None, None])
+        self.assertAlmostEqual(count_request('test', 'a'), 80.0)  # next window, once a third of this one slides out
+        self.assertIsNone(count_request('test', 'b'))
+
+    def test_refused_requests_are_not_counted(self):
+        for _ in range(3):
+            count_request('test', 'a')
+        for _ in range(10):
+            self.assertIsNotNone(count_request('test', 'a'))
+        self.now += 80
+        self.assertIsNone(count_request('test', 'a'))
+        self.assertIsNotNone(count_request('test', 'a'))
+
+    def test_capacity_refills_as_the_window_slides(self):
+        for _ in range(3):
+            count_request('test', 'a')
+        self.now += 60  # the three requests now weigh 3 * 1.0
+        self.assertIsNotNone(count_request('test', 'a'))
+        self.now += 30  # 3 * 0.5: one more fits
+        self.assertIsNone(count_request('test', 'a'))
+        self.assertAlmostEqual(count_request('test', 'a'), 10.0)
+        self.now += 60  # the first window is gone; the one allowed request above now weighs 0.5
+        self.assertEqual([count_request('test', 'a') is None for _ in range(4)], [True, True, False, False])
+
+    def test_concurrent_requests_stay_within_the_limit(self):
+        with override_settings(THROTTLE_RATES={'test': '50/min'}):
+            with ThreadPoolExecutor(16) as pool:
+                results = list(pool.map(lambda _: count_request('test', 'a'), range(200)))
+        self.assertEqual(sum(result is None for result in results), 50)
+
+    def test_unknown_or_empty_scope_is_not_limited(self):
+        self.assertIsNone(count_request('other', 'a'))
+
+    def test_view_answers_429_with_retry_after(self):
+        view = throttle('test')(lambda request: HttpResponse('ok'))
+        factory = RequestFactory()
+        for _ in range(3):
+            self.assertEqual(view(factory.get('/')).status_code, 200)
+        response = view(factory.get('/', HTTP_ACCEPT='application/json'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '80')
+        self.assertIn(b'Try again in 80 seconds', response.content)
+
+    def test_api_answers_429_with_retry_after(self):
+        self.client.force_login(get_user_model().objects.create_user(username='throttled'))
+        basket = {'region': 'Nairobi', 'county': 'Nairobi', 'market': 'Dandora', 'items': []}
+        self.client.post(reverse('api_basket'), basket, content_type='application/json')
+        response = self.client.post(reverse('api_basket'), basket, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '120')
+
+@override_settings(CONDITIONAL_GET=True)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='poller')
+        self.client.force_login(self.user)
+        self.prediction = Prediction.objects.create(user=self.user, input_data=INPUT, prediction=50.0)
+        self.url = reverse('prediction-list')
+
+    def assertRevalidates(self, change):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified_until_a_prediction_is_created(self):
+        self.assertRevalidates(lambda: Prediction.objects.create(user=self.user, input_data=INPUT, prediction=1.0))
+
+    def test_deletes_invalidate(self):
+        self.assertRevalidates(lambda: self.prediction.delete())
+        Prediction.objects.create(user=self.user, input_data=INPUT, prediction=1.0)
+        self.assertRevalidates(lambda: Prediction.objects.filter(user=self.user).delete())
+
+    def test_bulk_updates_invalidate(self):
+        self.assertRevalidates(lambda: Prediction.objects.filter(user=self.user).update(prediction=2.0))
+
+    def test_api_delete_invalidates(self):
+        self.assertRevalidates(lambda: self.client.delete(reverse('prediction-detail', args=[self.prediction.pk])))
+
+    def test_other_users_changes_do_not_invalidate(self):
+        other = get_user_model().objects.create_user(username='other')
+        etag = self.client.get(self.url)['ETag']
+        Prediction.objects.create(user=other, input_data=INPUT, prediction=1.0)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_etag_depends_on_the_query(self):
+        self.assertNotEqual(self.client.get(self.url)['ETag'], self.client.get(self.url + '?fields=prediction')['ETag'])
+
+    def test_speech_sessions(self):
+        url = reverse('speech_analysis:progress_sessions')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        recording = AudioRecording.objects.create(user=self.user, filename='r.opus', original_filename='r.webm')
+        UserAssessment.objects.create(user=self.user, recording=recording, confidence=7, clarity=6, pace=8)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(CONDITIONAL_GET=False)
+    def test_off_without_a_shared_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class RowSumModel:
+    """Predicts each row's sum and records the size of every batch it is given"""
+    n_features_in_ = 3
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, X):
+        self.batch_sizes.append(len(X))
+        time.sleep(0.005)
+        return X.sum(axis=1).astype(np.float32)
+
+
+class InferenceServerTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, 'inference.sock')
+        self.model = RowSumModel()
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.create_task(serve(self.socket_path, self.model, 0.005, 64))
+        self.thread = threading.Thread(target=self.run_server, daemon=True)
+        self.thread.start()
+        while not os.path.exists(self.socket_path):
+            time.sleep(0.01)
+        self.fallback = RowSumModel()
+        self.remote = RemoteModel(self.socket_path, 5, lambda: self.fallback)
+
+    def run_server(self):
+        try:
+            self.loop.run_until_complete(self.server)
+        except asyncio.CancelledError:
+            pass
+        self.loop.close()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.server.cancel)
+        self.thread.join()
+        self.directory.cleanup()
+
+    def test_concurrent_rows_are_batched(self):
+        X = np.arange(200 * 3, dtype=np.float64).reshape(200, 3)
+        with ThreadPoolExecutor(16) as pool:
+            results = list(pool.map(lambda row: self.remote.predict(row)[0], X))
+        np.testing.assert_array_equal(results, X.sum(axis=1).astype(np.float32))
+        self.assertLess(len(self.model.batch_sizes), 200)
+        self.assertLessEqual(max(self.model.batch_sizes), 64)
+        self.assertEqual(self.fallback.batch_sizes, [])
+
+    def test_wrong_width_is_rejected(self):
+        with self.assertRaisesMessage(InferenceError, 'expected 3 feature columns, got 2'):
+            self.remote.predict(np.zeros((1, 2)))
+        # The connection stays usable
+        np.testing.assert_array_equal(self.remote.predict(np.ones((2, 3))), [3, 3])
+
+    def test_falls_back_when_server_is_down(self):
+        remote = RemoteModel(os.path.join(self.directory.name, 'missing.sock'), 5, lambda: self.fallback)
+        with self.assertLogs('predictor.inference_server', 'WARNING'):
+            np.testing.assert_array_equal(remote.predict(np.ones((1, 3))), [3])
+        self.assertEqual(self.fallback.batch_sizes, [1])
+
+
+class ModelBackendTests(SimpleTestCase):
+    """Every backend predicts exactly what the estimator does"""
+
+    def setUp(self):
+        self.estimator = local_estimator()
+
+    def assertSamePredictions(self, X):
+        expected = self.estimator.predict(X)
+        for backend in MODEL_BACKENDS:
+            with self.subTest(backend=backend, rows=len(X)):
+                predictions = build_model(self.estimator, backend).predict(X)
+                self.assertEqual(predictions.dtype, expected.dtype)
+                np.testing.assert_array_equal(predictions, expected)
+
+    def test_sampled_inputs(self):
+        rng = np.random.default_rng(1)
+        for size in (1, 5, 200):
+            self.assertSamePredictions(encode_inputs(sample_inputs(size, rng)))
+
+    def test_split_boundaries_and_missing_values(self):
+        X = TreeEnsemble.from_xgboost(self.estimator).probe_inputs(count=300, seed=2)
+        self.assertTrue(np.isnan(X).any())
+        self.assertSamePredictions(X.astype(np.float64))
+        self.assertSamePredictions(X[:10].astype(np.float64))
+
+    def test_native_backend_is_not_the_estimator(self):
+        self.assertNotIsInstance(build_model(self.estimator, 'native'), type(self.estimator))
+
+    def test_unknown_backend(self):
+        with self.assertRaisesMessage(ValueError, "Unknown MODEL_BACKEND 'fast'"):
+            build_model(self.estimator, 'fast')
+
+    def test_unsupported_model_falls_back(self):
+        class Plain:
+            def predict(self, X):
+                return X.sum(axis=1)
+        plain = Plain()
+        with self.assertLogs('predictor.model_backends', 'WARNING'):
+            self.assertIs(build_model(plain, 'native'), plain)
+
+
+@query_budget(100)
+def reporters(request):
+    # Touches each report's user without select_related: one query per row
+    return HttpResponse(', '.join(report.user.username for report in CommunityReport.objects.all()))
+
+
+@query_budget(3)
+def report_summary(request):
+    # Four queries however many reports there are, one more than its budget
+    reports = CommunityReport.objects.all()
+    return HttpResponse(f"{reports.count()} reports, {reports.filter(price__gt=100).count()} over 100, "
+                        f"{reports.values('market').distinct().count()} markets, "
+                        f"{reports.values('user').distinct().count()} reporters")
+
+
+def unbudgeted(request):
+    return HttpResponse()
+
+
+urlpatterns = [
+    path('reporters/', reporters, name='reporters'),
+    path('report-summary/', report_summary, name='report_summary'),
+    path('unbudgeted/', unbudgeted),
+]
@@ -0,0 +1,128 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+# Sliding-window rate limits per client and scope, kept in the Django cache so
+# every worker sharing that cache shares the limits. For a rate of "N/period",
+# each client has a request counter per period-long window; a request is let
+# through while the current window's count plus the previous window's count,
+# weighted by how much of it still overlaps the last period, stays within N.
+# So up to N requests can arrive at once, and capacity comes back gradually as
+# the previous window slides out. Counters only change through cache.add() and
+# cache.incr()/decr(), which are atomic on Redis, memcached and the per-process
+# LocMem cache, so concurrent requests in any number of workers can't race past
+# the limit. Scopes and rates come from settings.THROTTLE_RATES.
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(rate):
+    """'30/min' -> (30 requests, per 60 seconds); None disables the scope"""
+    if not rate:
+        return None
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period]
+
+
+def client_id(request):
+    """The authenticated user when there is one, otherwise the client IP"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    address = request.META.get('REMOTE_ADDR', '')
+    if settings.THROTTLE_TRUST_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            address = forwarded.split(',')[0].strip()
+    return f"ip:{address}"
+
+
+def _increment(key, timeout):
+    """Atomically add one to a counter, creating it if needed; returns the new count"""
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key)
+
+
+def count_request(scope, ident):
+    """
+    Count a request against the client's limit for this scope. Returns None
+    when it may go ahead, otherwise the seconds until one would be let through.
+    """
+    limits = parse_rate(settings.THROTTLE_RATES.get(scope))
+    if limits is None:
+        return None
+    limit, period = limits
+    position = time.time() / period
+    window = int(position)
+    elapsed = position - window  # fraction of the current window gone by
+    key = f"throttle:{scope}:{ident}"
+    # Each counter is read during its own window and the next one
+    current = _increment(f"{key}:{window}", timeout=2 * period + 1)
+    previous = cache.get(f"{key}:{window - 1}", 0)
+    # The tolerance lets a client retrying exactly after the wait returned below through
+    if previous * (1 - elapsed) + current <= limit + 1e-9:
+        return None
+
+    # Refused requests don't count, or a client retrying in a loop would never get back under the limit
+    try:
+        current = cache.decr(f"{key}:{window}")
+    except ValueError:
+        current = 0
+    if current + 1 <= limit:
+        # Later in this window, once enough of the previous one has slid out
+        wait = (1 - (limit - current - 1) / previous - elapsed) * period
+    else:
+        # In the next window, where this one is the previous
+        wait = (1 - elapsed + 1 - (limit - 1) / max(current, 1)) * period
+    # Rounded so float noise doesn't add a second once rounded up
+    return round(wait, 6)
+
+
+def throttle(scope, methods=None):
+    """
+    Rate-limit a function view. Requests over the limit get a 429 before the
+    view runs. methods limits throttling to those HTTP methods.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                wait = count_request(scope, client_id(request))
+                if wait is not None:
+                    wait = max(1, math.ceil(wait))
+                    message = f'Too many requests. Try again in {wait} seconds.'
+                    if request.content_type == 'application/json' or 'json' in request.headers.get('Accept', ''):
+                        response = JsonResponse({'error': message}, status=429)
+                    else:
+                        response = HttpResponse(message, status=429, content_type='text/plain')
+                    response['Retry-After'] = str(wait)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateThrottle(BaseThrottle):
+    """DRF throttle over the same counters, for the scope named by `scope`"""
+    scope = None
+
+    def allow_request(self, request, view):
+        self.wait_seconds = count_request(self.scope, client_id(request))
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class PredictionAPIThrottle(RateThrottle):
+    scope = 'prediction_api'
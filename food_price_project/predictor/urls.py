@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
-from .api import UserRegistrationView, UserLoginView, PredictionViewSet, contact_api
+from .api import UserRegistrationView, UserLoginView, PredictionViewSet, contact_api, bulk_community_reports, explain_batch, basket_price
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,6 +42,9 @@ urlpatterns = [
     path('api/register/', UserRegistrationView.as_view(), name='api_register'),
     path('api/login/', UserLoginView.as_view(), name='api_login'),
     path('api/contact/', contact_api, name='api_contact'),
+    path('api/community-reports/bulk/', bulk_community_reports, name='api_community_reports_bulk'),
+    path('api/explanations/', explain_batch, name='api_explanations'),
+    path('api/basket/', basket_price, name='api_basket'),
     path('api/chatbot/', views.chatbot_api, name='chatbot_api'),
 ]
 
@@ -62,6 +62,8 @@ def send_sms(to_number, message):
         # Initialize Twilio client
         logger.info("Initializing Twilio client...")
         client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        if settings.TWILIO_API_BASE_URL:
+            client.api.base_url = settings.TWILIO_API_BASE_URL
         
         # Format phone number
         formatted_number = format_phone_number(to_number)
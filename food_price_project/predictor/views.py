@@ -7,9 +7,13 @@ from django.contrib.auth.decorators import login_required
 from django.core.mail import send_mail
 from .models import Prediction, CommunityReport
 from .utils import send_sms, format_phone_number
-import joblib
-import numpy as np
-import os
+from .archive import parse_date_range, predictions_for_user
+from .inference import encoders, top_10_features, encode_inputs, predict_prices
+from .basket import default_basket, price_basket
+from .seasonality import MONTH_NAMES, recommendations
+from .throttling import throttle
+from .warmup import start_warmup, readiness
+from .query_budget import query_budget
 import csv
 import io
 import datetime
@@ -26,28 +30,14 @@ import openai
 
 logger = logging.getLogger(__name__)
 
-# Path to models inside the predictor app
-MODEL_DIR = os.path.join(settings.BASE_DIR, 'predictor', 'models')
-
-# Full paths to the .pkl files
-model_path = os.path.join(MODEL_DIR, 'final_model3_top10.pkl')
-encoder_path = os.path.join(MODEL_DIR, 'encoders_dict.pkl')
-features_path = os.path.join(MODEL_DIR, 'top_10_features2.pkl')
-
-# Load the model and files
-model = joblib.load(model_path)
-encoders = joblib.load(encoder_path)
-top_10_features = list(joblib.load(features_path))
-
 def get_dropdown_options():
     # Always include all top_10_features, even if not in encoders (use empty list if missing)
     return {feature: list(encoders[feature].classes_) if feature in encoders else [] for feature in top_10_features}
 
 def get_web_search_answer(question):
-    # Placeholder: Use SerpAPI or another web search API
-    # You must replace 'YOUR_SERPAPI_KEY' with your actual API key
-    api_key = 'YOUR_SERPAPI_KEY'
-    search_url = 'https://serpapi.com/search.json'
+    # SerpAPI web search; set SERPAPI_API_KEY in the environment
+    api_key = settings.SERPAPI_API_KEY
+    search_url = settings.SERPAPI_URL
     params = {
         'q': question,
         'api_key': api_key,
@@ -68,8 +58,8 @@ def get_web_search_answer(question):
         return f'Error fetching answer: {str(e)}'
 
 def get_web_search_snippets(question, num_results=3):
-    api_key = 'YOUR_SERPAPI_KEY'
-    search_url = 'https://serpapi.com/search.json'
+    api_key = settings.SERPAPI_API_KEY
+    search_url = settings.SERPAPI_URL
     params = {
         'q': question,
         'api_key': api_key,
@@ -90,7 +80,7 @@ def get_web_search_snippets(question, num_results=3):
         return []
 
 def get_chatgpt_answer(question, web_snippets):
-    client = openai.OpenAI(api_key='OPENAI_API_KEY')
+    client = openai.OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
     context = '\n'.join(web_snippets)
     prompt = (
         "You are a helpful assistant for food price and market questions in Kenya. "
@@ -114,6 +104,13 @@ def get_chatgpt_answer(question, web_snippets):
             return "I'm currently experiencing high demand. Please try again later or contact support for assistance with your OpenAI account billing."
         return f"Error from ChatGPT: {str(e)}"
 
+def ready(request):
+    """Readiness probe: 200 once this worker has warmed up, 503 while warming or if warm-up failed"""
+    # Starts warm-up if the server did not (WARMUP_ON_START off, or a server that skips wsgi.py)
+    start_warmup()
+    state = readiness()
+    return JsonResponse(state, status=200 if state['status'] == 'ready' else 503)
+
 @login_required
 def home(request):
     """Landing page view"""
@@ -257,6 +254,7 @@ def contact_view(request):
 
 @csrf_exempt
 @require_POST
+@throttle('chatbot')
 def chatbot_api(request):
     try:
         data = json.loads(request.body.decode('utf-8'))
@@ -270,28 +268,16 @@ def chatbot_api(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
+@throttle('prediction', methods=('POST',))
 def make_prediction(request):
     if request.method == 'POST':
         try:
             # Get form data
-            form_data = {}
-            features = []
-            
-            for feature in top_10_features:
-                value = request.POST.get(feature)
-                form_data[feature] = value
-                features.append(value)
-
-            # Encode categorical features using saved encoders
-            for feature_name, encoder in encoders.items():
-                if feature_name in top_10_features:
-                    index = top_10_features.index(feature_name)
-                    features[index] = encoder.transform([features[index]])[0]
-
-            # Make prediction
-            features = np.array(features).reshape(1, -1)
-            log_price = model.predict(features)[0]
-            actual_price = round(float(np.exp(log_price)), 2)
+            form_data = {feature: request.POST.get(feature) for feature in top_10_features}
+
+            # Encode categorical features using saved encoders and make prediction (cached per input)
+            features = encode_inputs([form_data])
+            actual_price = predict_prices(features)[0]
 
             # Save prediction to database
             prediction = Prediction.objects.create(
@@ -347,6 +333,7 @@ def make_prediction(request):
 
             return render(request, 'predictor/result.html', {
                 'prediction': actual_price,
+                'prediction_id': prediction.id,
                 'form_data': form_data,
                 'sms_sent': bool(request.user.phone_number),
                 'email_sent': True
@@ -365,21 +352,27 @@ def make_prediction(request):
     })
 
 @login_required
+@query_budget(4)  # session, user, rows that may also be archived, and the rows
 def download_predictions(request):
-    # Get predictions for the current user
-    predictions = Prediction.objects.filter(user=request.user)
+    # Get predictions for the current user, including archived ones; ?start=&end= narrow the range
+    try:
+        start, end = parse_date_range(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    predictions = list(predictions_for_user(request.user, start, end, include_archive=True))
 
     # Prepare CSV
     buffer = io.StringIO()
     writer = csv.writer(buffer)
     
     # Write header
-    headers = list(predictions.first().input_data.keys()) + ['prediction', 'timestamp']
+    input_keys = list(predictions[0].input_data.keys()) if predictions else []
+    headers = input_keys + ['prediction', 'timestamp']
     writer.writerow(headers)
 
     # Write data
     for prediction in predictions:
-        row = list(prediction.input_data.values()) + [prediction.prediction, prediction.timestamp]
+        row = [prediction.input_data.get(key) for key in input_keys] + [prediction.prediction, prediction.timestamp]
         writer.writerow(row)
 
     buffer.seek(0)
@@ -437,6 +430,7 @@ def test_twilio(request):
         return HttpResponse(f"Unexpected error: {str(e)}", status=500)
 
 @login_required
+@query_budget(3)
 def cheapest_market(request):
     dropdown_options = get_dropdown_options()
     cheapest_market = None
@@ -446,9 +440,8 @@ def cheapest_market(request):
         commodity = request.POST.get('Commodity')
         region = request.POST.get('Region')
         # Query CommunityReport for real user-submitted prices
-        reports = CommunityReport.objects.filter(food_item=commodity, region=region)
-        if reports.exists():
-            best_report = reports.order_by('price').first()
+        best_report = CommunityReport.objects.filter(food_item=commodity, region=region).order_by('price').first()
+        if best_report:
             cheapest_market = {
                 'market': best_report.market,
                 'region': best_report.region,
@@ -493,6 +486,7 @@ def alerts(request):
     })
 
 @login_required
+@query_budget(3)
 def community_reporting(request):
     dropdown_options = get_dropdown_options()
     submitted = False
@@ -510,7 +504,7 @@ def community_reporting(request):
                 price=float(price)
             )
             submitted = True
-    reports = CommunityReport.objects.all()[:50]  # Show recent 50
+    reports = CommunityReport.objects.select_related('user')[:50]  # Show recent 50, with their reporters
     return render(request, 'predictor/community_reporting.html', {
         'submitted': submitted,
         'reports': reports,
@@ -519,31 +513,42 @@ def community_reporting(request):
     })
 
 @login_required
+@query_budget(3)
 def budget_estimator(request):
     dropdown_options = get_dropdown_options()
     budget = None
+    error = None
+    # Start from the location of the user's latest prediction
+    location = {'Region': '', 'County': '', 'Market': ''}
+    latest = Prediction.objects.filter(user=request.user).only('input_data').first()
+    if latest:
+        location.update({key: latest.input_data.get(key) or '' for key in location})
     if request.method == 'POST':
         try:
             income = float(request.POST.get('income'))
             household_size = int(request.POST.get('household_size'))
-            # Demo rule: 40% of income for food
-            total_budget = 0.4 * income
-            maize = 0.5 * total_budget
-            rice = 0.3 * total_budget
-            beans = 0.2 * total_budget
-            percent_of_income = int((total_budget / income) * 100)
+            location = {key: request.POST.get(key, '') for key in location}
+            # Price a typical monthly basket for the household at the chosen market
+            basket = price_basket(default_basket(household_size), location['Region'],
+                                  location['County'], location['Market'])
+            total_budget = basket['total']
+            percent_of_income = int((total_budget / income) * 100) if income else None
             budget = {
                 'total': total_budget,
-                'maize': maize,
-                'rice': rice,
-                'beans': beans,
+                'items': basket['items'],
                 'percent_of_income': percent_of_income,
-                'household_size': household_size
+                'household_size': household_size,
+                'market': location['Market'],
             }
-        except Exception:
+        except ValueError as e:
+            error = str(e)
+        except Exception as e:
+            logger.error(f"Error estimating budget: {str(e)}")
             budget = None
     return render(request, 'predictor/budget_estimator.html', {
         'budget': budget,
+        'error': error,
+        'location': location,
         'top_10_features': top_10_features,
         'dropdown_options': dropdown_options
     })
@@ -569,9 +574,14 @@ def nutrition_tips(request):
     })
 
 @login_required
+@query_budget(3)
 def planting_selling_suggestions(request):
     dropdown_options = get_dropdown_options()
     suggestion = None
+    seasonal = None
+    region = None
+    month = None
+    # General advice for regions without enough price history yet
     planting_seasons = {
         'March': 'Ideal for planting maize in most regions due to long rains.',
         'April': 'Continue planting maize and beans; ensure soil moisture is adequate.',
@@ -583,12 +593,19 @@ def planting_selling_suggestions(request):
     if request.method == 'POST':
         region = request.POST.get('Region')
         month = request.POST.get('month')
-        if month in planting_seasons:
-            suggestion = f"{planting_seasons[month]} (Region: {region})"
-        else:
-            suggestion = f"No specific planting/selling advice for {month}. Consult your local extension officer for more info. (Region: {region})"
+        if month in MONTH_NAMES:
+            seasonal = recommendations(region, MONTH_NAMES.index(month) + 1)
+        if not seasonal:
+            if month in planting_seasons:
+                suggestion = f"{planting_seasons[month]} (Region: {region})"
+            else:
+                suggestion = f"No specific planting/selling advice for {month}. Consult your local extension officer for more info. (Region: {region})"
     return render(request, 'predictor/planting_selling_suggestions.html', {
         'suggestion': suggestion,
+        'seasonal': seasonal,
+        'region': region,
+        'month': month,
+        'months': MONTH_NAMES,
         'top_10_features': top_10_features,
         'dropdown_options': dropdown_options
     })
@@ -0,0 +1,132 @@
+import gc
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.core.cache import close_caches
+from django.db import connection, connections
+
+logger = logging.getLogger(__name__)
+
+# Work every process would otherwise do on its first requests: importing the
+# views (which unpickles the model), the first model.predict and TreeSHAP
+# calls, librosa's numba JIT compilation in the first speech analysis, and
+# loading the speaking-task catalog. start_warmup() runs it on a background
+# thread when a worker boots, or preload() runs it once in the master before
+# workers are forked; /ready answers 503 until it has finished, so a load
+# balancer only routes to warm workers.
+
+WARMUP_BATCH_SIZES = (1, 64)
+WARMUP_AUDIO_SECONDS = 3
+
+_lock = threading.Lock()
+_thread = None
+_state = {'status': 'cold', 'steps': {}, 'error': None}
+
+
+def warm_urls():
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+
+
+def warm_model():
+    from .inference import model, encode_inputs, sample_inputs
+    rng = np.random.default_rng(0)
+    for size in WARMUP_BATCH_SIZES:
+        # model.predict directly: synthetic rows are not worth a place in the prediction cache
+        model.predict(encode_inputs(sample_inputs(size, rng)))
+
+
+def warm_explainer():
+    from .explain import get_explainer
+    from .inference import RemoteModel, model, encode_inputs, sample_inputs
+    if isinstance(model, RemoteModel):
+        # Building the explainer loads the model into this worker, which the inference server is there to avoid
+        return
+    get_explainer().shap_values(encode_inputs(sample_inputs(1, np.random.default_rng(0))), check_additivity=False)
+
+
+def warm_speech():
+    import soundfile as sf
+    from speech_analysis.corpus import CORPUS_SAMPLE_RATE, speech_like
+    from speech_analysis.utils import ANALYSIS_PROFILES, analyze_audio
+
+    y, _ = speech_like(WARMUP_AUDIO_SECONDS)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'warmup.wav')
+        sf.write(path, y, CORPUS_SAMPLE_RATE, subtype='PCM_16')
+        for profile in ANALYSIS_PROFILES:
+            if analyze_audio(path, profile) is None:
+                raise RuntimeError(f"speech analysis ({profile} profile) failed on synthetic audio")
+
+
+def warm_catalog():
+    from speech_analysis.catalog import get_catalog
+    get_catalog()
+
+
+WARMUP_STEPS = [
+    ('urls', warm_urls),
+    ('model', warm_model),
+    ('explainer', warm_explainer),
+    ('speech', warm_speech),
+    ('catalog', warm_catalog),
+]
+
+
+def warm_up():
+    """Run every warm-up step in order, recording how long each took. Returns the final state."""
+    _state.update(status='warming', steps={}, error=None)
+    started = time.perf_counter()
+    try:
+        for name, step in WARMUP_STEPS:
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                logger.exception(f"Warm-up step '{name}' failed")
+                _state.update(status='failed', error=f"{name}: {e}")
+                return readiness()
+            _state['steps'][name] = round((time.perf_counter() - step_started) * 1000, 1)
+    finally:
+        # The catalog step opened a database connection for this thread
+        connection.close()
+    _state['status'] = 'ready'
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s: {_state['steps']}")
+    return readiness()
+
+
+def start_warmup():
+    """Start warm-up on a background thread, once per process (not at all in a worker forked warm)"""
+    global _thread
+    with _lock:
+        if _thread is None and _state['status'] != 'ready':
+            _state['status'] = 'warming'
+            _thread = threading.Thread(target=warm_up, name='warmup', daemon=True)
+            _thread.start()
+
+
+def preload():
+    """
+    Warm up in a server's master process just before it forks the workers
+    (see gunicorn.conf.py). Workers start ready and share the model, imported
+    libraries and JIT-compiled code with the master copy-on-write instead of
+    each building their own. A worker forked after a failed warm-up retries
+    on its first /ready probe.
+    """
+    state = warm_up()
+    # Each worker must open its own database and cache connections
+    connections.close_all()
+    close_caches()
+    # Keep the preloaded objects out of the collector, whose bookkeeping writes would unshare their pages
+    gc.collect()
+    gc.freeze()
+    return state
+
+
+def readiness():
+    """A copy of the warm-up state: status (cold, warming, ready or failed), step timings in ms and any error"""
+    return {'status': _state['status'], 'steps': dict(_state['steps']), 'error': _state['error']}
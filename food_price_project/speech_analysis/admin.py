@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SpeakingTask, AudioRecording, SpeechAnalysis, UserAssessment, ProgressSession, ImpromptuTopic
+from .models import SpeakingTask, AudioRecording, SpeechAnalysis, UserAssessment, ProgressSession, ImpromptuTopic, UploadSession
 
 @admin.register(ImpromptuTopic)
 class ImpromptuTopicAdmin(admin.ModelAdmin):
@@ -34,4 +34,10 @@ class UserAssessmentAdmin(admin.ModelAdmin):
 class ProgressSessionAdmin(admin.ModelAdmin):
     list_display = ['user', 'session_date', 'recording']
     list_filter = ['session_date']
-    search_fields = ['user__username']
\ No newline at end of file
+    search_fields = ['user__username']
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'upload_id', 'received_bytes', 'total_size', 'detected_format', 'updated_at']
+    list_filter = ['detected_format', 'updated_at']
+    search_fields = ['user__username', 'original_filename']
\ No newline at end of file
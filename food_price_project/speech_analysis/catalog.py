@@ -0,0 +1,139 @@
+import time
+import random
+
+from django.core.cache import cache
+
+from .models import SpeakingTask, ImpromptuTopic
+
+# Seeded into the database by the seed_speech_catalog command (migration 0006 seeds
+# its own frozen copy of this list).
+# Default speaking tasks
+SPEAKING_TASKS = [
+    {
+        "id": "short-presentation", 
+        "title": "Short Presentation",
+        "description": "Practice delivering a focused presentation on a topic of your choice",
+        "instructions": "Prepare and deliver a 3-5 minute presentation on any topic you're passionate about. Structure your talk with a clear introduction, main points, and conclusion. Focus on engaging your audience and speaking with confidence.",
+        "time_limit": 5
+    },
+    {
+        "id": "elevator-pitch", 
+        "title": "Elevator Pitch",
+        "description": "Perfect your 60-second personal pitch",
+        "instructions": "Create a compelling 60-second pitch about yourself, your skills, or your business idea. Imagine you're in an elevator with someone important - make every second count!",
+        "time_limit": 1
+    },
+    {
+        "id": "storytelling", 
+        "title": "Storytelling Challenge",
+        "description": "Tell an engaging story that captivates your audience",
+        "instructions": "Share a personal story, anecdote, or fictional tale. Focus on using vivid details, emotional connection, and a clear narrative arc to keep your audience engaged.",
+        "time_limit": 4
+    },
+    {
+        "id": "impromptu-speech", 
+        "title": "Impromptu Speech",
+        "description": "Speak spontaneously on a random topic",
+        "instructions": "You'll be given a random topic and have 30 seconds to think before delivering a 2-3 minute impromptu speech. Practice thinking on your feet and organizing your thoughts quickly.",
+        "time_limit": 3
+    },
+    {
+        "id": "product-demo", 
+        "title": "Product Demo",
+        "description": "Demonstrate and sell a product or service",
+        "instructions": "Choose a product (real or imaginary) and give a compelling demonstration. Explain its features, benefits, and why your audience should buy it. Focus on persuasion and clarity.",
+        "time_limit": 4
+    },
+]
+
+# Impromptu speech topics
+IMPROMPTU_TOPICS = [
+    "If you could have dinner with anyone from history, who would it be and why?",
+    "What skill do you wish you could master instantly?",
+    "Describe your ideal vacation destination",
+    "What's the most important lesson you've learned in life?",
+    "If you could solve one world problem, what would it be?",
+    "What technology from the future would you most want to use?",
+    "Describe a moment that changed your perspective",
+    "What advice would you give to your younger self?",
+    "If you could start a new tradition, what would it be?",
+    "What's the best compliment you've ever received?",
+    "Describe your dream job",
+    "What book or movie has influenced you the most?",
+    "If you could live in any time period, when would it be?",
+    "What's your definition of success?",
+    "Describe a challenge that made you stronger",
+]
+
+def seed_catalog(task_model, topic_model):
+    """
+    Create the default speaking tasks and impromptu topics that do not exist yet.
+    This is the runtime path, used by `manage.py seed_speech_catalog` with the
+    current models. Migration 0006 seeds new databases from its own frozen copy
+    of the data and does not call this.
+    """
+    existing_tasks = set(task_model.objects.values_list('task_id', flat=True))
+    task_model.objects.bulk_create([
+        task_model(
+            task_id=task_data["id"],
+            title=task_data["title"],
+            description=task_data["description"],
+            instructions=task_data["instructions"],
+            time_limit=task_data["time_limit"],
+        )
+        for task_data in SPEAKING_TASKS if task_data["id"] not in existing_tasks
+    ])
+
+    existing_topics = set(topic_model.objects.values_list('topic', flat=True))
+    topic_model.objects.bulk_create([
+        topic_model(topic=topic, category="general", is_active=True)
+        for topic in IMPROMPTU_TOPICS if topic not in existing_topics
+    ])
+
+
+# The catalog is cached per process and rebuilt when the shared version counter
+# changes. The counter lives in Django's cache, so with a shared backend
+# (Redis/Memcached) an admin edit invalidates every worker at once; with the
+# default per-process cache other workers pick it up within CATALOG_MAX_AGE.
+CATALOG_VERSION_KEY = 'speech_analysis:catalog_version'
+CATALOG_MAX_AGE = 300  # seconds
+
+class Catalog:
+    def __init__(self, version, tasks, topics):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.tasks = tasks
+        self.tasks_by_id = {task.task_id: task for task in tasks}
+        self.topics = topics  # tuple of active topic strings
+
+    def random_topic(self):
+        """O(1) pick from the cached active topics, or None if there are none"""
+        return random.choice(self.topics) if self.topics else None
+
+_catalog = None
+
+def _current_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, 1, timeout=None)
+
+def get_catalog():
+    """Return the cached task/topic catalog, reloading it if it has been invalidated"""
+    global _catalog
+    version = _current_version()
+    catalog = _catalog
+    if catalog is None or catalog.version != version or time.monotonic() - catalog.loaded_at > CATALOG_MAX_AGE:
+        catalog = Catalog(
+            version,
+            list(SpeakingTask.objects.order_by('id')),
+            tuple(ImpromptuTopic.objects.filter(is_active=True).values_list('topic', flat=True)),
+        )
+        _catalog = catalog
+    return catalog
+
+def invalidate_catalog():
+    """Bump the catalog version so every process reloads it on its next request"""
+    global _catalog
+    _catalog = None
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 1, timeout=None)
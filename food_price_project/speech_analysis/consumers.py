@@ -0,0 +1,95 @@
+import json
+import uuid
+
+from channels.generic.websocket import WebsocketConsumer
+from django.conf import settings
+from django.core.cache import cache
+
+from .realtime import LiveSpeechAnalyzer, LIVE_SAMPLE_RATE
+from .utils import generate_feedback_from_analysis, convert_numpy_types
+
+# Finished live summaries wait here until the recording upload claims them
+LIVE_SUMMARY_KEY = 'speech_analysis:live_summary:{}'
+LIVE_SUMMARY_TIMEOUT = 60 * 60
+
+
+class LiveFeedbackConsumer(WebsocketConsumer):
+    """
+    Live speech feedback while recording.
+
+    Protocol:
+      client -> {"type": "start", "sample_rate": 16000}
+      server -> {"type": "ready", "session": "<id>"}
+      client -> binary frames of 16-bit little-endian mono PCM
+      server -> {"type": "feedback", ...indicators} after each frame
+      client -> {"type": "stop"}
+      server -> {"type": "summary", "session": "<id>", "analysis": ..., "feedback": [...], "chart_data": ...}
+    """
+
+    def connect(self):
+        if not self.scope["user"].is_authenticated:
+            self.close(code=4401)
+            return
+        self.analyzer = None
+        self.session_id = None
+        self.accept()
+
+    def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            self.receive_audio(bytes_data)
+            return
+
+        try:
+            message = json.loads(text_data)
+        except ValueError:
+            self.send_error("Invalid message")
+            return
+
+        if message.get("type") == "start":
+            try:
+                sample_rate = int(message.get("sample_rate", LIVE_SAMPLE_RATE))
+            except (TypeError, ValueError):
+                sample_rate = None
+            if sample_rate != LIVE_SAMPLE_RATE:
+                self.send_error(f"Audio must be sent at {LIVE_SAMPLE_RATE} Hz")
+                return
+            self.analyzer = LiveSpeechAnalyzer()
+            self.session_id = uuid.uuid4().hex
+            self.send(text_data=json.dumps({"type": "ready", "session": self.session_id}))
+        elif message.get("type") == "stop":
+            self.finish()
+        else:
+            self.send_error("Unknown message type")
+
+    def receive_audio(self, data):
+        if self.analyzer is None:
+            self.send_error("Send a start message first")
+            return
+        if self.analyzer.duration > settings.SPEECH_MAX_RECORDING_SECONDS:
+            self.send_error("Recording is too long")
+            self.close()
+            return
+        indicators = self.analyzer.add_pcm16(data)
+        if indicators:
+            self.send(text_data=json.dumps({"type": "feedback", **convert_numpy_types(indicators)}))
+
+    def finish(self):
+        if self.analyzer is None:
+            self.send_error("Nothing was recorded")
+            return
+        analysis = convert_numpy_types(self.analyzer.summary())
+        feedback = generate_feedback_from_analysis(analysis)
+        cache.set(LIVE_SUMMARY_KEY.format(self.session_id),
+                  {"user_id": self.scope["user"].id, "analysis": analysis},
+                  LIVE_SUMMARY_TIMEOUT)
+        self.send(text_data=json.dumps({
+            "type": "summary",
+            "session": self.session_id,
+            "analysis": analysis,
+            "chart_data": feedback["chart_data"],
+            "feedback": feedback["suggestions"],
+        }))
+        self.analyzer = None
+
+    def send_error(self, error):
+        self.send(text_data=json.dumps({"type": "error", "error": error}))
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import soundfile as sf
+
+# Synthetic audio with known properties, used by the regression tests and the
+# pipeline benchmark. Everything is generated from a seed, so a clip is
+# identical on every machine and never has to be checked in.
+
+CORPUS_SAMPLE_RATE = 16000
+
+# name: (kind, duration in seconds, extra arguments)
+CORPUS_CLIPS = {
+    'silence_10s': ('silence', 10, {}),
+    'tone_10s': ('tone', 10, {'frequency': 220.0}),
+    'speech_10s': ('speech', 10, {'seed': 1}),
+    'speech_fast_10s': ('speech', 10, {'seed': 2, 'pause_every': 5.0, 'syllable_range': (0.08, 0.14)}),
+    'speech_60s': ('speech', 60, {'seed': 3}),
+    'speech_5min': ('speech', 5 * 60, {'seed': 4}),
+    'speech_30min': ('speech', 30 * 60, {'seed': 5}),
+    'tone_30min': ('tone', 30 * 60, {'frequency': 220.0}),
+}
+
+
+def silence(duration, sr=CORPUS_SAMPLE_RATE):
+    return np.zeros(int(duration * sr), dtype=np.float32)
+
+
+def tone(duration, frequency=220.0, amplitude=0.5, sr=CORPUS_SAMPLE_RATE):
+    t = np.arange(int(duration * sr)) / sr
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def speech_like(duration, seed=0, pause_every=3.0, pause_length=0.6, syllable_range=(0.12, 0.25),
+                sr=CORPUS_SAMPLE_RATE):
+    """
+    Voiced "syllables" (harmonic bursts with a 100-200 Hz gliding pitch and a
+    smooth envelope) separated by very short gaps, with a silent pause of
+    pause_length after every pause_every seconds of speech.
+    Returns (samples, pause_count): the number of pauses actually placed.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration * sr)
+    y = np.zeros(n, dtype=np.float32)
+    t = 0.0
+    next_pause = pause_every
+    pause_count = 0
+    while t < duration:
+        if t >= next_pause:
+            pause_count += 1
+            t += pause_length
+            next_pause = t + pause_every
+            continue
+        length = int(rng.uniform(*syllable_range) * sr)
+        start = int(t * sr)
+        end = min(n, start + length)
+        time = np.arange(length) / sr
+        f0 = rng.uniform(100, 200) * (1 + 0.1 * np.sin(2 * np.pi * 3 * time))
+        phase = 2 * np.pi * np.cumsum(f0) / sr
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = np.hanning(length) * rng.uniform(0.5, 0.9)
+        y[start:end] = (voiced * envelope * 0.3)[:end - start]
+        t += length / sr + rng.uniform(0.01, 0.03)
+    return y, pause_count
+
+
+def generate_clip(name, sr=CORPUS_SAMPLE_RATE):
+    """Return (samples, info) for a clip in CORPUS_CLIPS; info includes known properties"""
+    kind, duration, kwargs = CORPUS_CLIPS[name]
+    info = {'name': name, 'kind': kind, 'duration': float(duration), 'sample_rate': sr}
+    if kind == 'silence':
+        y = silence(duration, sr=sr)
+        info['pause_count'] = 0
+    elif kind == 'tone':
+        y = tone(duration, sr=sr, **kwargs)
+        info['pause_count'] = 0
+        info['frequency'] = kwargs.get('frequency', 220.0)
+    else:
+        y, info['pause_count'] = speech_like(duration, sr=sr, **kwargs)
+    return y, info
+
+
+def write_clip(name, directory, format='FLAC'):
+    """Write a corpus clip to directory (FLAC by default, so reading it back includes real decoding)"""
+    y, info = generate_clip(name)
+    extension = '.wav' if format == 'WAV' else f".{format.lower()}"
+    path = os.path.join(directory, f"{name}{extension}")
+    sf.write(path, y, info['sample_rate'], format=format, subtype='PCM_16')
+    info['path'] = path
+    return info
+
+
+def clips_up_to(max_duration):
+    """Names of corpus clips no longer than max_duration seconds, shortest first"""
+    names = [name for name, (_, duration, _) in CORPUS_CLIPS.items() if duration <= max_duration]
+    return sorted(names, key=lambda name: CORPUS_CLIPS[name][1])
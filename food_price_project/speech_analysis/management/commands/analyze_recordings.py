@@ -0,0 +1,227 @@
+import os
+import json
+import argparse
+import time
+import datetime
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from predictor.conditional import bump_data_version
+from speech_analysis.models import AudioRecording, SpeechAnalysis
+from speech_analysis.realtime import LIVE_ANALYSIS_PROFILE
+from speech_analysis.storage import recording_local_path, store_artifacts
+from speech_analysis.utils import analyze_audio, export_wav, ANALYSIS_PROFILES, DEFAULT_ANALYSIS_PROFILE
+
+DEFAULT_CHECKPOINT = os.path.join(settings.MEDIA_ROOT, 'analyze_recordings_checkpoint.json')
+ANALYSIS_FIELDS = ['speech_rate', 'pause_count', 'volume_variation', 'pitch_variation', 'energy_level']
+
+
+def init_worker():
+    """Runs once in each pool process"""
+    import django
+    django.setup()
+    # Workers never touch the database, and must not share the parent's connection
+    connections.close_all()
+    # One BLAS/OpenMP thread per process, otherwise N processes fight over N*N threads
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+
+def analyze_job(job):
+    """
+    Decode and analyze one recording and store its playback artifacts.
+    Returns (recording_id, result, artifacts_key, error).
+    """
+    recording_id, storage_key, file_path, content_hash, profile = job
+    recording = AudioRecording(id=recording_id, storage_key=storage_key, file_path=file_path,
+                               content_hash=content_hash)
+    try:
+        with recording_local_path(recording) as input_path, tempfile.TemporaryDirectory() as tmp_dir:
+            wav_path = os.path.join(tmp_dir, "audio.wav")
+            export_wav(input_path, wav_path)
+            artifacts_path = os.path.join(tmp_dir, "artifacts.npz")
+            result = analyze_audio(wav_path, profile, artifacts_path)
+            if not result:
+                return recording_id, None, '', "Analysis failed"
+            artifacts_key = store_artifacts(recording, artifacts_path, profile)
+    except Exception as e:
+        return recording_id, None, '', str(e)
+    return recording_id, result, artifacts_key, None
+
+
+def recording_ids(value):
+    """--ids: comma-separated recording ids"""
+    try:
+        return [int(i) for i in value.split(',') if i.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"must be comma-separated recording ids, not '{value}'")
+
+
+class Command(BaseCommand):
+    help = (
+        "(Re)analyze AudioRecordings in bulk across all CPU cores. Results are written "
+        "in batches and progress is checkpointed, so an interrupted run can be resumed "
+        "with --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only recordings of this username")
+        parser.add_argument('--task', help="Only recordings for this speaking task_id")
+        parser.add_argument('--since', help="Only recordings uploaded on or after this date (YYYY-MM-DD)")
+        parser.add_argument('--until', help="Only recordings uploaded before this date (YYYY-MM-DD)")
+        parser.add_argument('--ids', type=recording_ids, help="Comma-separated recording ids")
+        parser.add_argument('--reanalyze', action='store_true',
+                            help="Also analyze recordings that already have a SpeechAnalysis")
+        parser.add_argument('--profile', choices=list(ANALYSIS_PROFILES), default=DEFAULT_ANALYSIS_PROFILE,
+                            help=f"Analysis profile (default: {DEFAULT_ANALYSIS_PROFILE})")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (default: all cores)")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Results written to the database per transaction (default: 100)")
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="Checkpoint file path")
+        parser.add_argument('--resume', action='store_true',
+                            help="Continue the run recorded in the checkpoint file, with its original filters")
+
+    def handle(self, *args, **options):
+        checkpoint_path = options['checkpoint']
+        if options['resume']:
+            if not os.path.exists(checkpoint_path):
+                raise CommandError(f"No checkpoint found at {checkpoint_path}")
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            filters = checkpoint['filters']
+            self.stdout.write(f"Resuming run started at {checkpoint['started_at']}")
+        else:
+            filters = {key: options[key] for key in ('user', 'task', 'since', 'until', 'ids', 'reanalyze', 'profile')}
+            checkpoint = {'started_at': timezone.now().isoformat(), 'filters': filters, 'failed': {}}
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = checkpoint
+        self.save_checkpoint()
+
+        # Anything analyzed since this run started is already done, which is what makes resuming work
+        started_at = parse_datetime(checkpoint['started_at'])
+        recordings = self.select_recordings(filters).exclude(speechanalysis__analyzed_at__gte=started_at)
+        profile = filters.get('profile', DEFAULT_ANALYSIS_PROFILE)
+        rows = recordings.order_by('id').values_list('id', 'storage_key', 'file_path', 'content_hash')
+        jobs = [row + (profile,) for row in rows]
+        if not jobs:
+            self.stdout.write(self.style.SUCCESS("Nothing to analyze"))
+            os.remove(checkpoint_path)
+            return
+
+        workers = max(1, min(options['workers'], len(jobs)))
+        batch_size = max(1, options['batch_size'])
+        self.stdout.write(f"Analyzing {len(jobs)} recordings with {workers} workers ({profile} profile)")
+
+        connections.close_all()  # don't hand an open connection to forked workers
+        self.started = time.monotonic()
+        self.done = 0
+        self.total = len(jobs)
+        pending_results = []
+        failed = checkpoint['failed']
+        job_iter = iter(jobs)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            # Keep a bounded number of jobs in flight so memory does not scale with the backlog
+            in_flight = set()
+            for job in job_iter:
+                in_flight.add(executor.submit(analyze_job, job))
+                if len(in_flight) >= workers * 4:
+                    break
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    recording_id, result, artifacts_key, error = future.result()
+                    self.done += 1
+                    if error:
+                        failed[str(recording_id)] = error
+                    else:
+                        failed.pop(str(recording_id), None)
+                        pending_results.append((recording_id, result, artifacts_key))
+                    next_job = next(job_iter, None)
+                    if next_job is not None:
+                        in_flight.add(executor.submit(analyze_job, next_job))
+                if len(pending_results) >= batch_size:
+                    self.write_results(pending_results)
+                    pending_results = []
+            if pending_results:
+                self.write_results(pending_results)
+
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Analyzed {self.done - len(failed)} of {self.total} recordings in {elapsed:.1f}s "
+            f"({rate:.1f} recordings/min), {len(failed)} failed"
+        ))
+        for recording_id, error in failed.items():
+            self.stderr.write(f"  recording {recording_id}: {error}")
+        if failed:
+            self.save_checkpoint()
+            self.stdout.write(f"Checkpoint kept at {checkpoint_path}; run with --resume to retry failures")
+        else:
+            os.remove(checkpoint_path)
+
+    def select_recordings(self, filters):
+        recordings = AudioRecording.objects.all()
+        if filters['user']:
+            recordings = recordings.filter(user__username=filters['user'])
+        if filters['task']:
+            recordings = recordings.filter(task__task_id=filters['task'])
+        for key, lookup in (('since', 'uploaded_at__date__gte'), ('until', 'uploaded_at__date__lt')):
+            if filters[key]:
+                day = parse_date(filters[key])
+                if day is None:
+                    raise CommandError(f"--{key} must be a date in YYYY-MM-DD format")
+                recordings = recordings.filter(**{lookup: day})
+        if filters['ids']:
+            recordings = recordings.filter(id__in=filters['ids'])
+        if not filters['reanalyze']:
+            # Summaries saved from live feedback still need a real analysis
+            recordings = recordings.filter(Q(speechanalysis__isnull=True)
+                                           | Q(speechanalysis__detailed_analysis__profile=LIVE_ANALYSIS_PROFILE))
+        return recordings
+
+    def write_results(self, results):
+        """Create or update SpeechAnalysis rows for a batch of results in one transaction"""
+        now = timezone.now()
+        by_recording = {recording_id: (result, artifacts_key) for recording_id, result, artifacts_key in results}
+        with transaction.atomic():
+            existing = list(SpeechAnalysis.objects.filter(recording_id__in=by_recording))
+            for analysis in existing:
+                result, artifacts_key = by_recording.pop(analysis.recording_id)
+                for field in ANALYSIS_FIELDS:
+                    setattr(analysis, field, result[field])
+                analysis.detailed_analysis = result
+                analysis.artifacts_key = artifacts_key
+                analysis.analyzed_at = now
+            SpeechAnalysis.objects.bulk_update(
+                existing, ANALYSIS_FIELDS + ['detailed_analysis', 'artifacts_key', 'analyzed_at'])
+            SpeechAnalysis.objects.bulk_create([
+                SpeechAnalysis(recording_id=recording_id, detailed_analysis=result, artifacts_key=artifacts_key,
+                               **{field: result[field] for field in ANALYSIS_FIELDS})
+                for recording_id, (result, artifacts_key) in by_recording.items()
+            ])
+        # bulk_create and bulk_update skip post_save, so invalidate the owners' metric ETags explicitly
+        owners = AudioRecording.objects.filter(id__in=[row[0] for row in results]).values_list('user_id', flat=True)
+        for user_id in set(owners):
+            bump_data_version('speech', user_id)
+        self.save_checkpoint()
+
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed * 60 if elapsed else 0
+        self.stdout.write(f"  {self.done}/{self.total} done, {rate:.1f} recordings/min")
+
+    def save_checkpoint(self):
+        self.checkpoint['updated_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,96 @@
+import os
+import time
+import tempfile
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from speech_analysis.models import AudioRecording
+from speech_analysis.storage import recording_local_path
+from speech_analysis.utils import analyze_audio, export_wav, ANALYSIS_PROFILES
+
+METRICS = ['speech_rate', 'pause_count', 'volume_variation', 'pitch_variation', 'energy_level']
+REFERENCE_PROFILE = 'accurate'
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every analysis profile on the same audio and report how far each "
+        "profile's metrics drift from the accurate profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help="Audio files to analyze (default: recent recordings)")
+        parser.add_argument('--limit', type=int, default=10,
+                            help="Number of most recent recordings to use when no files are given (default: 10)")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Runs per file and profile; the fastest run is reported (default: 3)")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            wav_paths = self.prepare_audio(options['files'], options['limit'], tmp_dir)
+            if not wav_paths:
+                raise CommandError("No audio to benchmark")
+            self.stdout.write(f"Benchmarking {len(ANALYSIS_PROFILES)} profiles on {len(wav_paths)} files")
+
+            timings = {profile: [] for profile in ANALYSIS_PROFILES}
+            results = {profile: [] for profile in ANALYSIS_PROFILES}
+            audio_seconds = 0.0
+            for wav_path in wav_paths:
+                for profile in ANALYSIS_PROFILES:
+                    best = None
+                    for _ in range(max(1, options['repeat'])):
+                        started = time.perf_counter()
+                        result = analyze_audio(wav_path, profile)
+                        elapsed = time.perf_counter() - started
+                        best = elapsed if best is None else min(best, elapsed)
+                    if result is None:
+                        raise CommandError(f"Analysis failed for {wav_path}")
+                    timings[profile].append(best)
+                    results[profile].append(result)
+                audio_seconds += results[REFERENCE_PROFILE][-1]['duration']
+
+        reference_time = sum(timings[REFERENCE_PROFILE])
+        self.stdout.write(f"\n{len(wav_paths)} files, {audio_seconds:.1f}s of audio\n")
+        header = f"{'profile':<10} {'total s':>8} {'x realtime':>11} {'speedup':>8}  " + \
+                 "  ".join(f"{metric:>16}" for metric in METRICS)
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for profile in ANALYSIS_PROFILES:
+            total = sum(timings[profile])
+            errors = []
+            for metric in METRICS:
+                # Mean relative deviation from the reference profile, in percent
+                deviations = [
+                    abs(result[metric] - reference[metric]) / abs(reference[metric]) * 100
+                    if reference[metric] else abs(result[metric]) * 100
+                    for result, reference in zip(results[profile], results[REFERENCE_PROFILE])
+                ]
+                errors.append(f"{np.mean(deviations):>15.2f}%")
+            self.stdout.write(
+                f"{profile:<10} {total:>8.3f} {audio_seconds / total if total else 0:>10.0f}x "
+                f"{reference_time / total if total else 0:>7.1f}x  " + "  ".join(errors)
+            )
+
+    def prepare_audio(self, files, limit, tmp_dir):
+        """Decode every input to a 16 kHz WAV up front so decoding is not part of the timings"""
+        wav_paths = []
+        if files:
+            for path in files:
+                if not os.path.exists(path):
+                    raise CommandError(f"{path} does not exist")
+                wav_path = os.path.join(tmp_dir, f"{len(wav_paths)}.wav")
+                export_wav(path, wav_path)
+                wav_paths.append(wav_path)
+            return wav_paths
+
+        for recording in AudioRecording.objects.order_by('-uploaded_at')[:limit]:
+            wav_path = os.path.join(tmp_dir, f"{recording.id}.wav")
+            try:
+                with recording_local_path(recording) as path:
+                    export_wav(path, wav_path)
+            except Exception as e:
+                self.stderr.write(f"Skipping recording {recording.id}: {e}")
+                continue
+            wav_paths.append(wav_path)
+        return wav_paths
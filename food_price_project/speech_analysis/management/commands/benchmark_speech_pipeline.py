@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import tempfile
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from speech_analysis.corpus import CORPUS_CLIPS, clips_up_to, write_clip
+from speech_analysis.utils import (
+    ANALYSIS_PROFILES, DEFAULT_ANALYSIS_PROFILE, export_wav, load_for_analysis, compute_rms,
+    compute_pitch, summarize_features, generate_feedback_from_analysis,
+)
+
+STAGES = ['decode', 'rms', 'yin', 'summary', 'feedback']
+
+
+def run_stages(path, tmp_dir, params, observe):
+    """
+    Run the analysis pipeline on one file the way analyze_recording does,
+    calling observe(stage, fn) to execute each stage.
+    """
+    wav_path = os.path.join(tmp_dir, "decoded.wav")
+
+    def decode():
+        export_wav(path, wav_path)
+        return load_for_analysis(wav_path, params)
+
+    y = observe('decode', decode)
+    rms = observe('rms', lambda: compute_rms(y, params))
+    pitches = observe('yin', lambda: compute_pitch(y, params))
+    result = observe('summary', lambda: summarize_features(rms, pitches, len(y) / params['sample_rate']))
+    observe('feedback', lambda: generate_feedback_from_analysis(result))
+    os.remove(wav_path)
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the speech analysis pipeline stage by stage (decode, RMS, YIN, "
+        "summary, feedback) on the synthetic corpus, reporting time and peak memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clips', help=f"Comma-separated clip names (available: {', '.join(CORPUS_CLIPS)})")
+        parser.add_argument('--max-duration', type=float, default=300,
+                            help="Use every clip up to this many seconds when --clips is not given "
+                                 "(default: 300; 1800 includes the 30 minute clips)")
+        parser.add_argument('--profile', choices=list(ANALYSIS_PROFILES), default=DEFAULT_ANALYSIS_PROFILE)
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Timed runs per clip; the fastest is reported (default: 3)")
+        parser.add_argument('--output', help="Also write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options['clips']:
+            names = [name.strip() for name in options['clips'].split(',') if name.strip()]
+            unknown = [name for name in names if name not in CORPUS_CLIPS]
+            if unknown:
+                raise CommandError(f"Unknown clips: {', '.join(unknown)}")
+        else:
+            names = clips_up_to(options['max_duration'])
+        params = ANALYSIS_PROFILES[options['profile']]
+
+        rows = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # librosa compiles some of its kernels on first use; keep that out of the numbers
+            warmup = write_clip('speech_10s', tmp_dir)
+            run_stages(warmup['path'], tmp_dir, params, lambda stage, fn: fn())
+            os.remove(warmup['path'])
+
+            for name in names:
+                info = write_clip(name, tmp_dir)
+                timings = self.time_stages(info['path'], tmp_dir, params, max(1, options['repeat']))
+                peaks = self.measure_memory(info['path'], tmp_dir, params)
+                os.remove(info['path'])
+                rows.append({'clip': name, 'duration': info['duration'], 'profile': options['profile'],
+                             'seconds': timings, 'peak_mb': peaks})
+
+        header = f"{'clip':<16} {'audio s':>8}  " + "  ".join(f"{stage:>9}" for stage in STAGES) + \
+                 f"  {'total':>8} {'x realtime':>10} {'peak MB':>8}"
+        self.stdout.write(f"Profile: {options['profile']}  (times in ms, peak MB is the largest stage)")
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in rows:
+            total = sum(row['seconds'].values())
+            self.stdout.write(
+                f"{row['clip']:<16} {row['duration']:>8.0f}  "
+                + "  ".join(f"{row['seconds'][stage] * 1000:>9.1f}" for stage in STAGES)
+                + f"  {total * 1000:>8.1f} {row['duration'] / total if total else 0:>9.0f}x"
+                + f" {max(row['peak_mb'].values()):>8.1f}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(rows, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def time_stages(self, path, tmp_dir, params, repeat):
+        """Best wall time per stage over `repeat` runs"""
+        best = {}
+
+        def observe(stage, fn):
+            started = time.perf_counter()
+            value = fn()
+            elapsed = time.perf_counter() - started
+            best[stage] = min(best.get(stage, elapsed), elapsed)
+            return value
+
+        for _ in range(repeat):
+            run_stages(path, tmp_dir, params, observe)
+        return best
+
+    def measure_memory(self, path, tmp_dir, params):
+        """
+        Peak Python/numpy allocation per stage, in MB. Done in its own run because
+        tracemalloc slows everything down.
+        """
+        peaks = {}
+
+        def observe(stage, fn):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            value = fn()
+            peaks[stage] = (tracemalloc.get_traced_memory()[1] - baseline) / (1024 * 1024)
+            return value
+
+        tracemalloc.start()
+        try:
+            run_stages(path, tmp_dir, params, observe)
+        finally:
+            tracemalloc.stop()
+        return peaks
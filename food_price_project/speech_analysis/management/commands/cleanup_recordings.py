@@ -0,0 +1,133 @@
+import os
+import hashlib
+import datetime
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from speech_analysis.models import AudioRecording, SpeechAnalysis, UploadSession
+from speech_analysis.probe import probe_audio_metadata
+from speech_analysis.storage import get_recording_storage, store_recording_file
+from speech_analysis.views import UPLOAD_FOLDER, forget_upload
+
+
+class Command(BaseCommand):
+    help = (
+        "Garbage-collect recording files: abandoned chunked uploads, leftover "
+        "intermediates (e.g. converted .wav files) and stored objects no recording "
+        "points at. Optionally moves pre-storage recordings into recording storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Leave anything modified more recently than this alone (default: 24)")
+        parser.add_argument('--migrate-legacy', action='store_true',
+                            help="Transcode recordings that still use file_path into content-addressed storage")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be removed without removing it")
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.freed_bytes = 0
+        cutoff = timezone.now() - datetime.timedelta(hours=options['grace_hours'])
+
+        if options['migrate_legacy']:
+            self.migrate_legacy()
+        sessions = self.cleanup_upload_sessions(cutoff)
+        intermediates = self.cleanup_upload_folder(cutoff)
+        orphans = self.cleanup_storage(cutoff)
+
+        prefix = "[dry run] " if self.dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Removed {sessions} abandoned uploads, {intermediates} intermediate files and "
+            f"{orphans} orphaned stored objects ({self.freed_bytes / (1024 * 1024):.1f} MB)"
+        ))
+
+    def remove_file(self, path):
+        self.freed_bytes += os.path.getsize(path)
+        if not self.dry_run:
+            os.remove(path)
+
+    def cleanup_upload_sessions(self, cutoff):
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for session in stale:
+            if os.path.exists(session.part_path):
+                self.remove_file(session.part_path)
+            if not self.dry_run:
+                # Workers drop their own cached hashes as their caches fill; this covers the current process
+                forget_upload(session.upload_id)
+                session.delete()
+            count += 1
+        return count
+
+    def cleanup_upload_folder(self, cutoff):
+        """Remove files in the upload folder that no recording or live upload refers to"""
+        referenced = set(AudioRecording.objects.exclude(file_path='').values_list('file_path', flat=True))
+        referenced.update(UploadSession.objects.filter(updated_at__gte=cutoff).values_list('part_path', flat=True))
+        count = 0
+        for entry in os.scandir(UPLOAD_FOLDER):
+            if not entry.is_file() or entry.path in referenced:
+                continue
+            modified = datetime.datetime.fromtimestamp(entry.stat().st_mtime, tz=datetime.timezone.utc)
+            if modified < cutoff:
+                self.remove_file(entry.path)
+                count += 1
+        return count
+
+    def cleanup_storage(self, cutoff):
+        """Remove stored objects that no AudioRecording or SpeechAnalysis points at any more"""
+        storage = get_recording_storage()
+        referenced = set(AudioRecording.objects.exclude(storage_key='').values_list('storage_key', flat=True))
+        referenced.update(SpeechAnalysis.objects.exclude(artifacts_key='').values_list('artifacts_key', flat=True))
+        count = 0
+        for key, modified in storage.iter_objects():
+            if key in referenced or modified >= cutoff:
+                continue
+            # An upload or analysis may have just deduplicated onto this object
+            if AudioRecording.objects.filter(storage_key=key).exists():
+                continue
+            if SpeechAnalysis.objects.filter(artifacts_key=key).exists():
+                continue
+            self.freed_bytes += storage.size(key) or 0
+            if not self.dry_run:
+                storage.delete(key)
+            count += 1
+        return count
+
+    def migrate_legacy(self):
+        legacy = AudioRecording.objects.filter(storage_key='').exclude(file_path='')
+        migrated = 0
+        for recording in legacy.iterator():
+            path = recording.file_path
+            if not os.path.exists(path):
+                self.stderr.write(f"Missing file for recording {recording.id}: {path}")
+                continue
+            metadata = probe_audio_metadata(path)
+            if not metadata:
+                self.stderr.write(f"Skipping recording {recording.id}: unrecognised audio format")
+                continue
+            if self.dry_run:
+                migrated += 1
+                continue
+
+            hasher = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(64 * 1024), b''):
+                    hasher.update(block)
+            # store_recording_file consumes its input, so hand it a copy
+            work_path = f"{path}.migrating"
+            shutil.copyfile(path, work_path)
+            key, codec, size = store_recording_file(work_path, hasher.hexdigest(), metadata)
+
+            AudioRecording.objects.filter(pk=recording.pk).update(
+                storage_key=key,
+                file_path='',
+                file_size=size,
+                codec=codec,
+                content_hash=hasher.hexdigest(),
+                duration=recording.duration or metadata['duration'],
+            )
+            self.remove_file(path)
+            migrated += 1
+        self.stdout.write(f"Moved {migrated} legacy recordings into recording storage")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from speech_analysis.catalog import seed_catalog, invalidate_catalog
+from speech_analysis.models import SpeakingTask, ImpromptuTopic
+
+
+class Command(BaseCommand):
+    help = "Add any default speaking tasks and impromptu topics missing from the database"
+
+    def handle(self, *args, **options):
+        tasks_before = SpeakingTask.objects.count()
+        topics_before = ImpromptuTopic.objects.count()
+        seed_catalog(SpeakingTask, ImpromptuTopic)
+        # bulk_create skips post_save, so invalidate explicitly
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {SpeakingTask.objects.count() - tasks_before} tasks and "
+            f"{ImpromptuTopic.objects.count() - topics_before} topics"
+        ))
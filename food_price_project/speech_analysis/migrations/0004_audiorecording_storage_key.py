@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speech_analysis', '0003_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiorecording',
+            name='storage_key',
+            field=models.CharField(blank=True, db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='audiorecording',
+            name='file_path',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
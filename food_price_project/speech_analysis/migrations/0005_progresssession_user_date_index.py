@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speech_analysis', '0004_audiorecording_storage_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='progresssession',
+            index=models.Index(fields=['user', 'session_date'], name='progress_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# A frozen copy of the catalog as it was when this migration was written, so the
+# migration keeps doing the same thing however speech_analysis.catalog changes.
+SPEAKING_TASKS = [
+    {
+        "id": "short-presentation",
+        "title": "Short Presentation",
+        "description": "Practice delivering a focused presentation on a topic of your choice",
+        "instructions": "Prepare and deliver a 3-5 minute presentation on any topic you're passionate about. Structure your talk with a clear introduction, main points, and conclusion. Focus on engaging your audience and speaking with confidence.",
+        "time_limit": 5
+    },
+    {
+        "id": "elevator-pitch",
+        "title": "Elevator Pitch",
+        "description": "Perfect your 60-second personal pitch",
+        "instructions": "Create a compelling 60-second pitch about yourself, your skills, or your business idea. Imagine you're in an elevator with someone important - make every second count!",
+        "time_limit": 1
+    },
+    {
+        "id": "storytelling",
+        "title": "Storytelling Challenge",
+        "description": "Tell an engaging story that captivates your audience",
+        "instructions": "Share a personal story, anecdote, or fictional tale. Focus on using vivid details, emotional connection, and a clear narrative arc to keep your audience engaged.",
+        "time_limit": 4
+    },
+    {
+        "id": "impromptu-speech",
+        "title": "Impromptu Speech",
+        "description": "Speak spontaneously on a random topic",
+        "instructions": "You'll be given a random topic and have 30 seconds to think before delivering a 2-3 minute impromptu speech. Practice thinking on your feet and organizing your thoughts quickly.",
+        "time_limit": 3
+    },
+    {
+        "id": "product-demo",
+        "title": "Product Demo",
+        "description": "Demonstrate and sell a product or service",
+        "instructions": "Choose a product (real or imaginary) and give a compelling demonstration. Explain its features, benefits, and why your audience should buy it. Focus on persuasion and clarity.",
+        "time_limit": 4
+    },
+]
+
+IMPROMPTU_TOPICS = [
+    "If you could have dinner with anyone from history, who would it be and why?",
+    "What skill do you wish you could master instantly?",
+    "Describe your ideal vacation destination",
+    "What's the most important lesson you've learned in life?",
+    "If you could solve one world problem, what would it be?",
+    "What technology from the future would you most want to use?",
+    "Describe a moment that changed your perspective",
+    "What advice would you give to your younger self?",
+    "If you could start a new tradition, what would it be?",
+    "What's the best compliment you've ever received?",
+    "Describe your dream job",
+    "What book or movie has influenced you the most?",
+    "If you could live in any time period, when would it be?",
+    "What's your definition of success?",
+    "Describe a challenge that made you stronger",
+]
+
+
+def seed(apps, schema_editor):
+    SpeakingTask = apps.get_model('speech_analysis', 'SpeakingTask')
+    ImpromptuTopic = apps.get_model('speech_analysis', 'ImpromptuTopic')
+
+    existing_tasks = set(SpeakingTask.objects.values_list('task_id', flat=True))
+    SpeakingTask.objects.bulk_create([
+        SpeakingTask(
+            task_id=task_data["id"],
+            title=task_data["title"],
+            description=task_data["description"],
+            instructions=task_data["instructions"],
+            time_limit=task_data["time_limit"],
+        )
+        for task_data in SPEAKING_TASKS if task_data["id"] not in existing_tasks
+    ])
+
+    existing_topics = set(ImpromptuTopic.objects.values_list('topic', flat=True))
+    ImpromptuTopic.objects.bulk_create([
+        ImpromptuTopic(topic=topic, category="general", is_active=True)
+        for topic in IMPROMPTU_TOPICS if topic not in existing_topics
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speech_analysis', '0005_progresssession_user_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speech_analysis', '0006_seed_speaking_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='speechanalysis',
+            name='artifacts_key',
+            field=models.CharField(blank=True, db_index=True, max_length=255),
+        ),
+    ]
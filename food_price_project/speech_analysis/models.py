@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 import json
+import uuid
 
 User = get_user_model()
 
@@ -30,16 +31,38 @@ class AudioRecording(models.Model):
     task = models.ForeignKey(SpeakingTask, on_delete=models.CASCADE, null=True, blank=True)
     filename = models.CharField(max_length=255)
     original_filename = models.CharField(max_length=255)
-    file_path = models.CharField(max_length=500)
+    file_path = models.CharField(max_length=500, blank=True)  # Only set for recordings stored before storage_key existed
+    storage_key = models.CharField(max_length=255, blank=True, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     file_size = models.IntegerField(null=True, blank=True)
     duration = models.FloatField(null=True, blank=True)
     virtual_scene = models.CharField(max_length=100, default='small-audience')
     topic = models.CharField(max_length=500, blank=True)  # For impromptu speeches
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # SHA-256 of the uploaded file
+    codec = models.CharField(max_length=50, blank=True)
     
     def __str__(self):
         return f"{self.user.username} - {self.filename}"
 
+class UploadSession(models.Model):
+    """A resumable chunked upload that has not been turned into an AudioRecording yet"""
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    task = models.ForeignKey(SpeakingTask, on_delete=models.SET_NULL, null=True, blank=True)
+    original_filename = models.CharField(max_length=255)
+    part_path = models.CharField(max_length=500)
+    total_size = models.BigIntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    detected_format = models.CharField(max_length=20, blank=True)
+    client_duration = models.FloatField(null=True, blank=True)
+    virtual_scene = models.CharField(max_length=100, default='small-audience')
+    topic = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} - upload {self.upload_id} ({self.received_bytes}/{self.total_size})"
+
 class SpeechAnalysis(models.Model):
     recording = models.OneToOneField(AudioRecording, on_delete=models.CASCADE)
     speech_rate = models.FloatField(null=True, blank=True)
@@ -50,6 +73,8 @@ class SpeechAnalysis(models.Model):
     
     # Store detailed analysis as JSON
     detailed_analysis = models.JSONField(default=dict, blank=True)
+    # Storage key of the waveform/contour artifacts served to the playback UI
+    artifacts_key = models.CharField(max_length=255, blank=True, db_index=True)
     
     analyzed_at = models.DateTimeField(auto_now_add=True)
     
@@ -92,6 +117,9 @@ class ProgressSession(models.Model):
     
     class Meta:
         ordering = ['-session_date']
+        indexes = [
+            models.Index(fields=['user', 'session_date'], name='progress_user_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - Session {self.session_date.date()}"
\ No newline at end of file
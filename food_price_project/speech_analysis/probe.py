@@ -0,0 +1,309 @@
+import os
+import struct
+
+# Read audio container headers (WebM/Matroska, Ogg, WAV, FLAC) to find the real
+# duration and codec of a recording without decoding any audio.
+
+FORMAT_EXTENSIONS = {
+    'webm': '.webm',
+    'matroska': '.mka',
+    'ogg': '.ogg',
+    'wav': '.wav',
+    'flac': '.flac',
+    'mp4': '.m4a',
+    'mp3': '.mp3',
+}
+
+MATROSKA_CODECS = {
+    'A_OPUS': 'opus',
+    'A_VORBIS': 'vorbis',
+    'A_AAC': 'aac',
+    'A_FLAC': 'flac',
+    'A_MPEG/L3': 'mp3',
+}
+
+# EBML element ids we care about
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+MKV_SEGMENT = 0x18538067
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_CODEC_ID = 0x86
+MKV_AUDIO = 0xE1
+MKV_SAMPLING_FREQUENCY = 0xB5
+MKV_CHANNELS = 0x9F
+MKV_CLUSTER = 0x1F43B675
+MKV_CLUSTER_TIMECODE = 0xE7
+MKV_SIMPLE_BLOCK = 0xA3
+MKV_BLOCK_GROUP = 0xA0
+MKV_BLOCK = 0xA1
+
+# Master elements whose children are walked in place instead of being skipped
+MKV_CONTAINERS = {EBML_HEADER, MKV_SEGMENT, MKV_INFO, MKV_TRACKS, MKV_TRACK_ENTRY,
+                  MKV_AUDIO, MKV_CLUSTER, MKV_BLOCK_GROUP}
+
+
+def sniff_format(header):
+    """Guess the container format from the first bytes of a file"""
+    if header.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'webm' if b'webm' in header[:64] else 'matroska'
+    if header.startswith(b'OggS'):
+        return 'ogg'
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header.startswith(b'fLaC'):
+        return 'flac'
+    if header[4:8] == b'ftyp':
+        return 'mp4'
+    if header.startswith(b'ID3') or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return None
+
+
+def _empty_metadata(container):
+    return {
+        'format': container,
+        'codec': None,
+        'duration': None,
+        'sample_rate': None,
+        'channels': None,
+        'extension': FORMAT_EXTENSIONS.get(container, ''),
+    }
+
+
+def _read_vint(f, keep_marker=False):
+    """Read an EBML variable length integer; returns (value, is_unknown_size)"""
+    first = f.read(1)
+    if not first:
+        raise EOFError
+    first = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("Invalid EBML variable length integer")
+    rest = f.read(length - 1)
+    if len(rest) < length - 1:
+        raise EOFError
+    value = first if keep_marker else first & (mask - 1)
+    for byte in rest:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, unknown
+
+
+def _read_uint(f, size):
+    data = f.read(size)
+    return int.from_bytes(data, 'big') if data else 0
+
+
+def _read_float(f, size):
+    data = f.read(size)
+    if size == 4:
+        return struct.unpack('>f', data)[0]
+    if size == 8:
+        return struct.unpack('>d', data)[0]
+    return None
+
+
+def _probe_matroska(f, file_size, scan_blocks):
+    meta = _empty_metadata('matroska')
+    timecode_scale = 1000000  # nanoseconds per tick, Matroska default
+    header_duration = None
+    cluster_timecode = 0
+    last_block_time = None
+
+    while True:
+        try:
+            element_id, _ = _read_vint(f, keep_marker=True)
+            size, unknown = _read_vint(f)
+        except (EOFError, ValueError):
+            break
+        start = f.tell()
+        if unknown or element_id in MKV_CONTAINERS:
+            if element_id == MKV_CLUSTER and not scan_blocks:
+                break
+            if element_id == MKV_CLUSTER and header_duration is not None:
+                # The header already told us the duration, no need to walk blocks
+                break
+            continue
+        if start + size > file_size:
+            break
+
+        if element_id == EBML_DOCTYPE:
+            doctype = f.read(size).rstrip(b'\x00').decode('ascii', 'ignore')
+            meta['format'] = 'webm' if doctype == 'webm' else 'matroska'
+        elif element_id == MKV_TIMECODE_SCALE:
+            timecode_scale = _read_uint(f, size) or timecode_scale
+        elif element_id == MKV_DURATION:
+            header_duration = _read_float(f, size)
+        elif element_id == MKV_CODEC_ID and meta['codec'] is None:
+            codec_id = f.read(size).rstrip(b'\x00').decode('ascii', 'ignore')
+            if codec_id.startswith('A_'):
+                meta['codec'] = MATROSKA_CODECS.get(codec_id, codec_id[2:].lower())
+        elif element_id == MKV_SAMPLING_FREQUENCY and meta['sample_rate'] is None:
+            meta['sample_rate'] = int(_read_float(f, size) or 0) or None
+        elif element_id == MKV_CHANNELS and meta['channels'] is None:
+            meta['channels'] = _read_uint(f, size)
+        elif element_id == MKV_CLUSTER_TIMECODE:
+            cluster_timecode = _read_uint(f, size)
+        elif element_id in (MKV_SIMPLE_BLOCK, MKV_BLOCK):
+            # Block header: track number (vint) followed by a signed 16-bit relative timecode
+            _read_vint(f)
+            relative = struct.unpack('>h', f.read(2))[0]
+            block_time = cluster_timecode + relative
+            if last_block_time is None or block_time > last_block_time:
+                last_block_time = block_time
+        f.seek(start + size)
+
+    if header_duration:
+        meta['duration'] = header_duration * timecode_scale / 1e9
+    elif last_block_time is not None:
+        meta['duration'] = last_block_time * timecode_scale / 1e9
+    meta['extension'] = FORMAT_EXTENSIONS[meta['format']]
+    return meta
+
+
+def _probe_ogg(f, file_size):
+    meta = _empty_metadata('ogg')
+    header = f.read(27)
+    if len(header) < 27:
+        return meta
+    segment_count = header[26]
+    segments = f.read(segment_count)
+    packet = f.read(min(sum(segments), 64))
+
+    granule_rate = None
+    pre_skip = 0
+    if packet.startswith(b'OpusHead'):
+        meta['codec'] = 'opus'
+        meta['channels'] = packet[9]
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+        meta['sample_rate'] = struct.unpack('<I', packet[12:16])[0] or 48000
+        granule_rate = 48000  # Opus granule positions always count 48 kHz samples
+    elif packet.startswith(b'\x01vorbis'):
+        meta['codec'] = 'vorbis'
+        meta['channels'] = packet[11]
+        meta['sample_rate'] = struct.unpack('<I', packet[12:16])[0]
+        granule_rate = meta['sample_rate']
+    elif packet.startswith(b'\x7fFLAC'):
+        meta['codec'] = 'flac'
+        streaminfo = _parse_flac_streaminfo(packet[17:51])
+        meta['sample_rate'] = streaminfo['sample_rate']
+        meta['channels'] = streaminfo['channels']
+        granule_rate = streaminfo['sample_rate']
+
+    if granule_rate:
+        # The final page's granule position is the total sample count
+        tail_size = min(file_size, 65536)
+        f.seek(file_size - tail_size)
+        tail = f.read(tail_size)
+        index = tail.rfind(b'OggS')
+        while index != -1:
+            if index + 14 <= len(tail):
+                granule = struct.unpack('<q', tail[index + 6:index + 14])[0]
+                if granule >= 0:
+                    meta['duration'] = max(granule - pre_skip, 0) / granule_rate
+                    break
+            index = tail.rfind(b'OggS', 0, index)
+    return meta
+
+
+def _probe_wav(f, file_size):
+    meta = _empty_metadata('wav')
+    f.seek(12)
+    byte_rate = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            break
+        chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+        start = f.tell()
+        if chunk_id == b'fmt ':
+            fmt = f.read(16)
+            audio_format, channels, sample_rate, byte_rate = struct.unpack('<HHII', fmt[:12])
+            meta['codec'] = 'pcm' if audio_format in (1, 0xFFFE) else 'float' if audio_format == 3 else str(audio_format)
+            meta['channels'] = channels
+            meta['sample_rate'] = sample_rate
+        elif chunk_id == b'data':
+            # Streamed WAVs may carry a placeholder size; trust the file instead
+            data_size = min(chunk_size, file_size - start)
+            if byte_rate:
+                meta['duration'] = data_size / byte_rate
+            break
+        f.seek(start + chunk_size + (chunk_size & 1))
+    return meta
+
+
+def _parse_flac_streaminfo(block):
+    sample_rate = (block[10] << 12) | (block[11] << 4) | (block[12] >> 4)
+    channels = ((block[12] >> 1) & 0x07) + 1
+    total_samples = ((block[13] & 0x0F) << 32) | int.from_bytes(block[14:18], 'big')
+    return {'sample_rate': sample_rate, 'channels': channels, 'total_samples': total_samples}
+
+
+def _probe_flac(f):
+    meta = _empty_metadata('flac')
+    meta['codec'] = 'flac'
+    f.seek(4)
+    block_header = f.read(4)
+    if len(block_header) == 4 and block_header[0] & 0x7F == 0:
+        streaminfo = _parse_flac_streaminfo(f.read(34))
+        meta['sample_rate'] = streaminfo['sample_rate']
+        meta['channels'] = streaminfo['channels']
+        if streaminfo['sample_rate'] and streaminfo['total_samples']:
+            meta['duration'] = streaminfo['total_samples'] / streaminfo['sample_rate']
+    return meta
+
+
+def _probe_ffprobe(filepath, container):
+    """Fall back to ffprobe (header-only) for containers we do not parse ourselves"""
+    meta = _empty_metadata(container)
+    try:
+        from pydub.utils import mediainfo_json
+        info = mediainfo_json(filepath)
+    except Exception:
+        return meta
+    for stream in info.get('streams', []):
+        if stream.get('codec_type') == 'audio':
+            meta['codec'] = stream.get('codec_name')
+            meta['sample_rate'] = int(stream['sample_rate']) if stream.get('sample_rate') else None
+            meta['channels'] = stream.get('channels')
+            break
+    duration = info.get('format', {}).get('duration')
+    if duration:
+        meta['duration'] = float(duration)
+    return meta
+
+
+def probe_audio_metadata(filepath, scan_blocks=True):
+    """
+    Read format, codec, duration, sample rate and channel count from the container
+    header of an audio file. Nothing is decoded, so this is cheap even for long
+    recordings. WebM files from MediaRecorder carry no duration in their header, so
+    unless scan_blocks is False the block timestamps are walked to find it.
+    Returns None when the file is not a recognised audio container.
+    """
+    try:
+        file_size = os.path.getsize(filepath)
+        with open(filepath, 'rb') as f:
+            container = sniff_format(f.read(64))
+            f.seek(0)
+            if container in ('webm', 'matroska'):
+                return _probe_matroska(f, file_size, scan_blocks)
+            if container == 'ogg':
+                return _probe_ogg(f, file_size)
+            if container == 'wav':
+                return _probe_wav(f, file_size)
+            if container == 'flac':
+                return _probe_flac(f)
+        if container:
+            return _probe_ffprobe(filepath, container)
+    except (OSError, struct.error, IndexError) as e:
+        print(f"Audio probe error: {e}")
+    return None
@@ -0,0 +1,159 @@
+from collections import deque
+
+import numpy as np
+import librosa
+
+from .utils import summarize_features
+
+# Same framing librosa uses by default in analyze_audio, so live results line up
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+LIVE_SAMPLE_RATE = 16000
+
+# Profile recorded on analyses saved from live feedback. It is not one of
+# ANALYSIS_PROFILES: a live summary is shown until a real analysis replaces it.
+LIVE_ANALYSIS_PROFILE = 'live'
+
+# How many recent frames the "right now" indicators look at (~1 s at 16 kHz)
+RECENT_FRAMES = 32
+
+# Log-spaced RMS histogram behind the live speech rate: frames louder than the
+# running mean are counted from it in a fixed number of steps however long the
+# recording is. Neighbouring edges are 2% apart, which bounds the error of the
+# count to the frames in the one bin that holds the mean.
+RMS_HISTOGRAM_EDGES = np.geomspace(1e-6, 1.0, 700)
+
+
+class LiveSpeechAnalyzer:
+    """
+    Incremental version of analyze_audio for audio that arrives while the user
+    is still speaking. Each call to add_pcm16() only processes the frames that
+    became complete with the new samples, and returns live indicators from
+    running sums and a fixed-size RMS histogram, so the work per message does
+    not grow with the length of the recording. The per-frame RMS and pitch
+    tracks are kept, so summary() produces the same metrics as analyze_audio
+    the moment recording stops.
+    """
+
+    def __init__(self, sample_rate=LIVE_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.pending = np.zeros(0, dtype=np.float32)  # samples not yet consumed by a full hop
+        self.total_samples = 0
+        self.rms_blocks = []
+        self.pitch_blocks = []
+        # Running aggregates behind indicators()
+        self.frame_count = 0
+        self.rms_sum = 0.0
+        # Underflow bin first, then one per edge (the last catches RMS of 1.0 and above)
+        self.rms_histogram = np.zeros(len(RMS_HISTOGRAM_EDGES) + 1, dtype=np.int64)
+        self.recent_rms = deque(maxlen=RECENT_FRAMES)
+        self.voiced_count = 0
+        self.voiced_sum = 0.0
+        self.voiced_sum_sq = 0.0
+        self.live_pause_count = 0
+        self.was_quiet = None
+
+    @property
+    def duration(self):
+        return self.total_samples / self.sample_rate
+
+    @property
+    def rms(self):
+        return np.concatenate(self.rms_blocks) if self.rms_blocks else np.zeros(0, dtype=np.float32)
+
+    @property
+    def pitches(self):
+        return np.concatenate(self.pitch_blocks) if self.pitch_blocks else np.zeros(0, dtype=np.float32)
+
+    def add_pcm16(self, data):
+        """Feed little-endian 16-bit mono PCM bytes; returns indicators or None"""
+        samples = np.frombuffer(data[:len(data) - len(data) % 2], dtype='<i2').astype(np.float32) / 32768.0
+        return self.add_samples(samples)
+
+    def add_samples(self, samples):
+        self.total_samples += len(samples)
+        # pending always holds less than one frame, so this copies at most a frame plus the new samples
+        self.pending = np.concatenate([self.pending, samples])
+        if len(self.pending) < FRAME_LENGTH:
+            return None
+
+        n_frames = 1 + (len(self.pending) - FRAME_LENGTH) // HOP_LENGTH
+        window = self.pending[:(n_frames - 1) * HOP_LENGTH + FRAME_LENGTH]
+        frames = librosa.util.frame(window, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH)
+        rms = np.sqrt(np.mean(frames ** 2, axis=0))
+        pitches = librosa.yin(window, fmin=50, fmax=300, frame_length=FRAME_LENGTH,
+                              hop_length=HOP_LENGTH, center=False)
+        # The next frame starts n_frames hops in; keep its overlap with this window
+        self.pending = self.pending[n_frames * HOP_LENGTH:]
+
+        self.rms_blocks.append(rms)
+        self.pitch_blocks.append(pitches)
+        self.update_aggregates(rms, pitches)
+        return self.indicators()
+
+    def update_aggregates(self, rms, pitches):
+        self.rms_histogram += np.bincount(np.searchsorted(RMS_HISTOGRAM_EDGES, rms, side='right'),
+                                          minlength=len(self.rms_histogram))
+        for value in rms.tolist():
+            self.frame_count += 1
+            self.rms_sum += value
+            self.recent_rms.append(value)
+            # Pauses are judged against the mean so far; summary() uses the final mean
+            quiet = value < self.rms_sum / self.frame_count * 0.1
+            if quiet and self.was_quiet is False:
+                self.live_pause_count += 1
+            self.was_quiet = quiet
+        voiced = pitches[pitches > 0].astype(np.float64)
+        self.voiced_count += len(voiced)
+        self.voiced_sum += float(voiced.sum())
+        self.voiced_sum_sq += float(np.square(voiced).sum())
+
+    def frames_louder_than(self, level):
+        """
+        Estimated number of frames with RMS above level: every frame in the bins
+        above level's, plus the share of its own bin that lies above it
+        (assuming frames spread evenly within the bin).
+        """
+        if not self.frame_count:
+            return 0.0
+        index = int(np.searchsorted(RMS_HISTOGRAM_EDGES, level, side='right'))
+        louder = float(self.rms_histogram[index + 1:].sum())
+        if 0 < index < len(RMS_HISTOGRAM_EDGES):
+            low, high = np.log(RMS_HISTOGRAM_EDGES[index - 1:index + 1])
+            louder += self.rms_histogram[index] * float((high - np.log(level)) / (high - low))
+        return louder
+
+    def indicators(self):
+        """Live pace/volume/pause/pitch readings for the feedback UI"""
+        mean_rms = self.rms_sum / self.frame_count if self.frame_count else 0.0
+        speech_rate = self.frames_louder_than(mean_rms) * 60 / self.duration if self.duration > 0 else 0.0
+        if self.voiced_count:
+            voiced_mean = self.voiced_sum / self.voiced_count
+            pitch_variation = max(0.0, self.voiced_sum_sq / self.voiced_count - voiced_mean ** 2) ** 0.5
+        else:
+            pitch_variation = 0.0
+
+        volume = sum(self.recent_rms) / len(self.recent_rms) if self.recent_rms else 0.0
+        relative_volume = volume / (mean_rms or 1e-9)
+
+        if speech_rate < 100:
+            pace = 'slow'
+        elif speech_rate > 200:
+            pace = 'fast'
+        else:
+            pace = 'good'
+
+        return {
+            "elapsed": round(self.duration, 2),
+            "volume": volume,
+            "relative_volume": round(relative_volume, 2),
+            "speaking": bool(volume > (mean_rms or 1e-9) * 0.1),
+            "speech_rate": float(speech_rate),
+            "pace": pace,
+            "pause_count": self.live_pause_count,
+            "pitch_variation": float(pitch_variation),
+        }
+
+    def summary(self):
+        """Final metrics in the same shape as analyze_audio's result"""
+        return summarize_features(self.rms, self.pitches, self.duration)
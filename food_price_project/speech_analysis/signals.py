@@ -0,0 +1,32 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from predictor.conditional import bump_data_version
+
+from .models import SpeakingTask, ImpromptuTopic, ProgressSession, UserAssessment, SpeechAnalysis
+from .catalog import invalidate_catalog
+
+
+@receiver(post_save, sender=SpeakingTask)
+@receiver(post_delete, sender=SpeakingTask)
+@receiver(post_save, sender=ImpromptuTopic)
+@receiver(post_delete, sender=ImpromptuTopic)
+def catalog_changed(sender, **kwargs):
+    """Drop the cached task/topic catalog whenever an admin edits it"""
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=ProgressSession)
+@receiver(post_delete, sender=ProgressSession)
+@receiver(post_save, sender=UserAssessment)
+@receiver(post_delete, sender=UserAssessment)
+def session_changed(sender, instance, **kwargs):
+    """Invalidate the user's session and metric history ETags"""
+    bump_data_version('speech', instance.user_id)
+
+
+@receiver(post_save, sender=SpeechAnalysis)
+@receiver(post_delete, sender=SpeechAnalysis)
+def analysis_changed(sender, instance, **kwargs):
+    """Metric history averages the analyses, so a new or re-run analysis invalidates it too"""
+    bump_data_version('speech', instance.recording.user_id)
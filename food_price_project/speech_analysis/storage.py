@@ -0,0 +1,232 @@
+import os
+import shutil
+import datetime
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .utils import transcode_audio, TRANSCODE_FORMATS
+
+
+class RecordingStorage:
+    """
+    Where recording files live. Keys are relative, '/'-separated paths such as
+    'ab/abcdef...0123.opus'. Backends only need to move whole files around;
+    anything that reads audio asks for a local path via local_path().
+    """
+
+    def save(self, local_path, key):
+        """Store local_path under key. The local file is consumed."""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def size(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    @contextmanager
+    def local_path(self, key):
+        """Yield a filesystem path holding the object's bytes for the duration of the block"""
+        raise NotImplementedError
+
+    def iter_objects(self):
+        """Yield (key, last_modified) for every stored object"""
+        raise NotImplementedError
+
+
+class LocalRecordingStorage(RecordingStorage):
+    def __init__(self, location=None):
+        self.location = location or os.path.join(settings.MEDIA_ROOT, 'speech_recordings', 'store')
+        os.makedirs(self.location, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.location, *key.split('/'))
+
+    def save(self, local_path, key):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Move next to the target first so readers never see a half-written object
+        tmp_path = f"{path}.tmp"
+        shutil.move(local_path, tmp_path)
+        os.replace(tmp_path, path)
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def size(self, key):
+        return os.path.getsize(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def local_path(self, key):
+        yield self._path(key)
+
+    def iter_objects(self):
+        for dirpath, _, filenames in os.walk(self.location):
+            for name in filenames:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, self.location).replace(os.sep, '/')
+                modified = datetime.datetime.fromtimestamp(os.path.getmtime(path), tz=datetime.timezone.utc)
+                yield key, modified
+
+
+class S3RecordingStorage(RecordingStorage):
+    """
+    S3-compatible object storage. Point endpoint_url at MinIO (or any other
+    stand-in) to run it locally. Needs boto3, which is only imported here.
+    """
+
+    def __init__(self, bucket, prefix='speech_recordings/', endpoint_url=None, client=None, **client_kwargs):
+        self.bucket = bucket
+        self.prefix = prefix
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise ImproperlyConfigured("S3RecordingStorage requires boto3 (pip install boto3)") from e
+            client = boto3.client('s3', endpoint_url=endpoint_url, **client_kwargs)
+        self.client = client
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as e:
+            status = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if status in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def save(self, local_path, key):
+        self.client.upload_file(local_path, self.bucket, self._object_key(key))
+        os.remove(local_path)
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        head = self._head(key)
+        return head['ContentLength'] if head else None
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    @contextmanager
+    def local_path(self, key):
+        suffix = os.path.splitext(key)[1]
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self._object_key(key), path)
+            yield path
+        finally:
+            os.remove(path)
+
+    def iter_objects(self):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get('Contents', []):
+                yield obj['Key'][len(self.prefix):], obj['LastModified']
+
+
+@lru_cache(maxsize=None)
+def get_recording_storage():
+    """Build the backend configured in settings.SPEECH_RECORDING_STORAGE"""
+    config = settings.SPEECH_RECORDING_STORAGE
+    backend = import_string(config['BACKEND'])
+    return backend(**config.get('OPTIONS', {}))
+
+
+def content_key(content_hash, extension):
+    """Content-addressed key: identical uploads map to the same object"""
+    return f"{content_hash[:2]}/{content_hash}{extension}"
+
+
+def store_recording_file(local_path, content_hash, metadata):
+    """
+    Transcode an uploaded file to the configured codec and put it in storage
+    under its content address. If the same upload was stored before, the
+    existing object is reused. The local file is consumed.
+    Returns (storage_key, codec, stored_size).
+    """
+    storage = get_recording_storage()
+    codec = settings.SPEECH_RECORDING_CODEC
+    if codec in TRANSCODE_FORMATS:
+        key = content_key(content_hash, TRANSCODE_FORMATS[codec]['extension'])
+        if storage.exists(key):
+            os.remove(local_path)
+            return key, codec, storage.size(key)
+        transcoded = transcode_audio(local_path, codec)
+        if transcoded:
+            os.remove(local_path)
+            size = os.path.getsize(transcoded)
+            storage.save(transcoded, key)
+            return key, codec, size
+
+    # Keep the upload as-is when transcoding is disabled or not possible
+    key = content_key(content_hash, metadata['extension'] or '.webm')
+    if storage.exists(key):
+        os.remove(local_path)
+        return key, metadata['codec'] or '', storage.size(key)
+    size = os.path.getsize(local_path)
+    storage.save(local_path, key)
+    return key, metadata['codec'] or '', size
+
+
+@contextmanager
+def recording_local_path(recording):
+    """Yield a local path to a recording's audio, wherever it is stored"""
+    if recording.storage_key:
+        with get_recording_storage().local_path(recording.storage_key) as path:
+            yield path
+    else:
+        # Recordings uploaded before the storage backend existed
+        yield recording.file_path
+
+
+def artifact_key(recording, profile):
+    """
+    Key for a recording's playback artifacts. Content-addressed like the audio,
+    so duplicate uploads share them; the profile is part of the key because an
+    accurate reanalysis replaces a fast preview's artifacts.
+    """
+    if recording.content_hash:
+        return f"artifacts/{content_key(recording.content_hash, f'.{profile}.npz')}"
+    return f"artifacts/legacy/{recording.id}.{profile}.npz"
+
+
+def store_artifacts(recording, local_path, profile):
+    """Put an artifacts file written by analyze_audio into storage. The local file is consumed."""
+    storage = get_recording_storage()
+    key = artifact_key(recording, profile)
+    if storage.exists(key):
+        os.remove(local_path)
+    else:
+        storage.save(local_path, key)
+    return key
+
+
+def load_artifacts(key):
+    """Read a stored artifacts file into a dict of numpy arrays"""
+    with get_recording_storage().local_path(key) as path:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
@@ -1,3 +1,765 @@
-from django.test import TestCase
+import os
+import io
+import json
+import struct
+import hashlib
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import soundfile as sf
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+from django.urls import reverse
+
+from . import catalog, views
+from .management.commands import cleanup_recordings
+from .management.commands.benchmark_speech_pipeline import STAGES, run_stages
+from .corpus import CORPUS_CLIPS, clips_up_to, generate_clip, write_clip
+from .models import AudioRecording, ImpromptuTopic, ProgressSession, SpeakingTask, SpeechAnalysis, UploadSession
+from .probe import probe_audio_metadata, sniff_format
+from .storage import LocalRecordingStorage, S3RecordingStorage, get_recording_storage, store_recording_file
+from .consumers import LIVE_SUMMARY_KEY, LiveFeedbackConsumer
+from .realtime import RECENT_FRAMES, LiveSpeechAnalyzer
+from .utils import (analyze_audio, generate_feedback_from_analysis, lttb_indices, moving_average, ANALYSIS_PROFILES,
+                    FAST_PROFILE_TOLERANCE)
+
+# Metrics produced by analyze_audio on the 10 s corpus clips. A change that is
+# only meant to make the analyzer faster must keep these values.
+EXPECTED_METRICS = {
+    ('silence_10s', 'accurate'): {'speech_rate': 0.0, 'pause_count': 0, 'volume_variation': 0.0,
+                                  'pitch_variation': 0.0, 'energy_level': 0.0},
+    ('silence_10s', 'fast'): {'speech_rate': 0.0, 'pause_count': 0, 'volume_variation': 0.0,
+                              'pitch_variation': 0.0, 'energy_level': 0.0},
+    ('tone_10s', 'accurate'): {'speech_rate': 1638.0, 'pause_count': 0, 'volume_variation': 0.0078277,
+                               'pitch_variation': 0.0, 'energy_level': 0.3527611},
+    ('tone_10s', 'fast'): {'speech_rate': 1638.0, 'pause_count': 0, 'volume_variation': 0.0078279,
+                           'pitch_variation': 0.0, 'energy_level': 0.3527611},
+    ('speech_10s', 'accurate'): {'speech_rate': 1044.0, 'pause_count': 2, 'volume_variation': 0.0450337,
+                                 'pitch_variation': 51.0250933, 'energy_level': 0.0900954},
+    ('speech_10s', 'fast'): {'speech_rate': 1044.0, 'pause_count': 2, 'volume_variation': 0.0450336,
+                             'pitch_variation': 48.8816835, 'energy_level': 0.0900954},
+    ('speech_fast_10s', 'accurate'): {'speech_rate': 1116.0, 'pause_count': 1, 'volume_variation': 0.0289122,
+                                      'pitch_variation': 53.2616145, 'energy_level': 0.0956200},
+    ('speech_fast_10s', 'fast'): {'speech_rate': 1116.0, 'pause_count': 1, 'volume_variation': 0.0289101,
+                                  'pitch_variation': 58.4921855, 'energy_level': 0.0956205},
+}
+
+# Relative tolerance for float metrics; leaves room for library and platform noise only
+RELATIVE_TOLERANCE = 1e-4
+
+
+class CorpusTests(SimpleTestCase):
+    def test_clips_are_deterministic(self):
+        first, _ = generate_clip('speech_10s')
+        second, _ = generate_clip('speech_10s')
+        np.testing.assert_array_equal(first, second)
+
+    def test_clip_lengths(self):
+        for name in ('silence_10s', 'tone_10s', 'speech_10s'):
+            y, info = generate_clip(name)
+            self.assertEqual(len(y), CORPUS_CLIPS[name][1] * info['sample_rate'])
+
+    def test_speech_has_known_pauses(self):
+        _, info = generate_clip('speech_60s')
+        self.assertEqual(info['pause_count'], 16)
+
+
+class BenchmarkPipelineTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tmp = directory.name
+
+    def test_clips_up_to(self):
+        self.assertEqual(clips_up_to(10), ['silence_10s', 'tone_10s', 'speech_10s', 'speech_fast_10s'])
+        self.assertEqual(clips_up_to(60)[-1], 'speech_60s')
+
+    def test_stages_match_analyze_audio(self):
+        # The benchmark times the same pipeline the app runs, stage by stage
+        info = write_clip('speech_10s', self.tmp)
+        for profile, params in ANALYSIS_PROFILES.items():
+            with self.subTest(profile=profile):
+                stages = []
+                result = run_stages(info['path'], self.tmp, params, lambda stage, fn: stages.append(stage) or fn())
+                self.assertEqual(stages, STAGES)
+                expected = analyze_audio(info['path'], profile)
+                for metric in ('speech_rate', 'pause_count', 'volume_variation', 'pitch_variation', 'energy_level'):
+                    self.assertAlmostEqual(result[metric], expected[metric], places=6, msg=metric)
+
+    def test_command_writes_results(self):
+        output = os.path.join(self.tmp, 'results.json')
+        out = io.StringIO()
+        call_command('benchmark_speech_pipeline', clips='tone_10s', repeat=1, profile='fast', output=output, stdout=out)
+        self.assertIn('tone_10s', out.getvalue())
+        with open(output) as f:
+            (row,) = json.load(f)
+        self.assertEqual((row['clip'], row['duration'], row['profile']), ('tone_10s', 10.0, 'fast'))
+        self.assertEqual(set(row['seconds']), set(STAGES))
+        self.assertEqual(set(row['peak_mb']), set(STAGES))
+
+    def test_unknown_clip(self):
+        with self.assertRaisesMessage(CommandError, 'Unknown clips: speech_1h'):
+            call_command('benchmark_speech_pipeline', clips='tone_10s,speech_1h')
+
+
+class AnalyzerRegressionTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.clips = {name: write_clip(name, cls.tmp_dir.name) for name in {name for name, _ in EXPECTED_METRICS}}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+        super().tearDownClass()
+
+    def assertMetricsEqual(self, result, expected):
+        for metric, value in expected.items():
+            if isinstance(value, int):
+                self.assertEqual(result[metric], value, metric)
+            else:
+                self.assertAlmostEqual(result[metric], value, delta=max(abs(value) * RELATIVE_TOLERANCE, 1e-6),
+                                       msg=metric)
+
+    def test_pinned_metrics(self):
+        for (name, profile), expected in EXPECTED_METRICS.items():
+            with self.subTest(clip=name, profile=profile):
+                result = analyze_audio(self.clips[name]['path'], profile)
+                self.assertEqual(result['profile'], profile)
+                self.assertEqual(result['duration'], self.clips[name]['duration'])
+                self.assertMetricsEqual(result, expected)
+
+    def test_pause_count_matches_corpus(self):
+        for name in ('speech_10s', 'speech_fast_10s'):
+            for profile in ANALYSIS_PROFILES:
+                with self.subTest(clip=name, profile=profile):
+                    result = analyze_audio(self.clips[name]['path'], profile)
+                    self.assertEqual(result['pause_count'], self.clips[name]['pause_count'])
+
+    def test_fast_profile_within_documented_tolerance(self):
+        for name in ('speech_10s', 'speech_fast_10s'):
+            accurate = analyze_audio(self.clips[name]['path'], 'accurate')
+            fast = analyze_audio(self.clips[name]['path'], 'fast')
+            with self.subTest(clip=name):
+                self.assertEqual(fast['speech_rate'], accurate['speech_rate'])
+                self.assertEqual(fast['pause_count'], accurate['pause_count'])
+                for metric, tolerance in FAST_PROFILE_TOLERANCE.items():
+                    self.assertAlmostEqual(fast[metric], accurate[metric], delta=abs(accurate[metric]) * tolerance,
+                                           msg=metric)
+
+    def test_live_analyzer_matches_batch(self):
+        y, _ = generate_clip('speech_10s')
+        analyzer = LiveSpeechAnalyzer()
+        for start in range(0, len(y), 4096):
+            analyzer.add_samples(y[start:start + 4096])
+        live = analyzer.summary()
+        batch = analyze_audio(self.clips['speech_10s']['path'])
+        self.assertEqual(live['pause_count'], batch['pause_count'])
+        for metric in ('speech_rate', 'volume_variation', 'pitch_variation', 'energy_level'):
+            self.assertAlmostEqual(live[metric], batch[metric], delta=abs(batch[metric]) * 0.05, msg=metric)
+
+    def test_live_indicators_track_the_summary(self):
+        y, _ = generate_clip('speech_10s')
+        analyzer = LiveSpeechAnalyzer()
+        for start in range(0, len(y), 4096):
+            analyzer.add_samples(y[start:start + 4096])
+        indicators, summary = analyzer.indicators(), analyzer.summary()
+        # Running aggregates give the summary's figures: the speech rate to within the RMS histogram's
+        # resolution, and pauses are judged against the mean so far
+        self.assertAlmostEqual(indicators['speech_rate'], summary['speech_rate'], delta=summary['speech_rate'] * 0.01)
+        self.assertAlmostEqual(indicators['pitch_variation'], summary['pitch_variation'], places=3)
+        self.assertAlmostEqual(indicators['volume'], float(np.mean(analyzer.rms[-RECENT_FRAMES:])), places=5)
+
+    def test_artifacts(self):
+        artifacts_path = os.path.join(self.tmp_dir.name, 'artifacts.npz')
+        analyze_audio(self.clips['speech_10s']['path'], artifacts_path=artifacts_path)
+        with np.load(artifacts_path) as artifacts:
+            self.assertEqual(artifacts['peaks_0'].dtype, np.int8)
+            self.assertEqual(artifacts['loudness'].dtype, np.float16)
+            # Each zoom level is four times finer than the one before
+            self.assertEqual(len(artifacts['peaks_3']), int(np.ceil(10 * 16000 / 256)))
+            self.assertEqual(len(artifacts['peaks_0']), int(np.ceil(10 * 16000 / 16384)))
+            self.assertTrue(np.isnan(artifacts['pitch']).any())
+
+
+class FeedbackTests(SimpleTestCase):
+    def test_feedback_for_pinned_speech(self):
+        feedback = generate_feedback_from_analysis({**EXPECTED_METRICS[('speech_10s', 'accurate')], 'duration': 10.0})
+        self.assertEqual(feedback['chart_data']['pause_count'], 2)
+        self.assertIn('Consider slowing down slightly for better clarity.', feedback['suggestions'])
+
+    def test_feedback_for_silence(self):
+        feedback = generate_feedback_from_analysis({**EXPECTED_METRICS[('silence_10s', 'accurate')], 'duration': 10.0})
+        self.assertTrue(feedback['suggestions'])
+
+
+def ebml(element_id, payload=b'', size=None):
+    """One EBML element with an 8-byte size field; size=-1 writes the "unknown size" marker"""
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    length = (1 << 56) - 1 if size == -1 else len(payload)
+    return id_bytes + ((1 << 56) | length).to_bytes(8, 'big') + payload
+
+
+def webm(duration_ms=None, clusters=(), unknown_size=False):
+    """A minimal WebM: header, one Opus track, optionally a Duration and clusters of (timecode, [block offsets])"""
+    info = ebml(0x2AD7B1, (1000000).to_bytes(3, 'big'))
+    if duration_ms is not None:
+        info += ebml(0x4489, struct.pack('>d', duration_ms))
+    track = ebml(0xAE, ebml(0x86, b'A_OPUS') + ebml(0xE1, ebml(0xB5, struct.pack('>d', 48000.0)) + ebml(0x9F, b'\x01')))
+    body = ebml(0x1549A966, info) + ebml(0x1654AE6B, track)
+    for timecode, offsets in clusters:
+        blocks = b''.join(ebml(0xA3, b'\x81' + struct.pack('>h', offset) + b'\x80' + b'\x00' * 8) for offset in offsets)
+        body += ebml(0x1F43B675, ebml(0xE7, timecode.to_bytes(2, 'big')) + blocks)
+    segment = ebml(0x18538067, size=-1) + body if unknown_size else ebml(0x18538067, body)
+    return ebml(0x1A45DFA3, ebml(0x4282, b'webm')) + segment
+
+
+class ProbeTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def encoded(self, name, seconds=1.5, sample_rate=16000, **kwargs):
+        path = os.path.join(self.directory.name, name)
+        sf.write(path, np.zeros(int(seconds * sample_rate), dtype=np.float32), sample_rate, **kwargs)
+        return path
+
+    def test_wav(self):
+        meta = probe_audio_metadata(self.encoded('a.wav', subtype='PCM_16'))
+        self.assertEqual((meta['format'], meta['codec'], meta['sample_rate'], meta['channels']), ('wav', 'pcm', 16000, 1))
+        self.assertAlmostEqual(meta['duration'], 1.5)
+
+    def test_flac(self):
+        meta = probe_audio_metadata(self.encoded('a.flac', seconds=2.25, sample_rate=8000))
+        self.assertEqual((meta['format'], meta['codec'], meta['sample_rate']), ('flac', 'flac', 8000))
+        self.assertAlmostEqual(meta['duration'], 2.25)
+
+    def test_ogg_opus_and_vorbis(self):
+        opus = probe_audio_metadata(self.encoded('a.opus', format='OGG', subtype='OPUS'))
+        self.assertEqual((opus['format'], opus['codec'], opus['extension']), ('ogg', 'opus', '.ogg'))
+        self.assertAlmostEqual(opus['duration'], 1.5, places=2)
+        vorbis = probe_audio_metadata(self.encoded('a.ogg', format='OGG', subtype='VORBIS'))
+        self.assertEqual((vorbis['codec'], vorbis['sample_rate']), ('vorbis', 16000))
+        self.assertAlmostEqual(vorbis['duration'], 1.5, places=2)
+
+    def test_webm_duration_from_header(self):
+        meta = probe_audio_metadata(self.write('a.webm', webm(duration_ms=4200.0, clusters=[(0, [0, 20])])))
+        self.assertEqual((meta['format'], meta['codec'], meta['sample_rate'], meta['channels']), ('webm', 'opus', 48000, 1))
+        self.assertAlmostEqual(meta['duration'], 4.2)
+
+    def test_webm_duration_from_blocks(self):
+        # MediaRecorder output: unknown segment size and no Duration element
+        data = webm(clusters=[(0, [0, 20, 40]), (2000, [0, 500])], unknown_size=True)
+        path = self.write('a.webm', data)
+        self.assertAlmostEqual(probe_audio_metadata(path)['duration'], 2.5)
+        header_only = probe_audio_metadata(path, scan_blocks=False)
+        self.assertEqual(header_only['codec'], 'opus')
+        self.assertIsNone(header_only['duration'])
+
+    def test_sniff_format(self):
+        self.assertEqual(sniff_format(webm()[:64]), 'webm')
+        self.assertEqual(sniff_format(b'RIFF\x00\x00\x00\x00WAVEfmt '), 'wav')
+        self.assertEqual(sniff_format(b'\x00\x00\x00\x18ftypM4A '), 'mp4')
+        self.assertIsNone(sniff_format(b'not audio at all'))
+
+    def test_malformed_headers(self):
+        with open(self.encoded('full.wav', subtype='PCM_16'), 'rb') as f:
+            wav = f.read()
+        self.assertIsNone(probe_audio_metadata(self.write('garbage.bin', b'\x00' * 100)))
+        self.assertIsNone(probe_audio_metadata(self.write('empty.wav', b'')))
+        # Truncated files still give whatever their headers hold, without raising
+        self.assertIsNone(probe_audio_metadata(self.write('short.wav', wav[:20])))
+        self.assertIsNone(probe_audio_metadata(self.write('nodata.wav', wav[:40]))['duration'])
+        self.assertIsNone(probe_audio_metadata(self.write('short.ogg', b'OggS\x00\x02'))['codec'])
+        self.assertIsNone(probe_audio_metadata(self.write('short.flac', b'fLaC\x00\x00'))['duration'])
+        truncated = probe_audio_metadata(self.write('short.webm', webm(duration_ms=1000.0)[:60]))
+        self.assertEqual(truncated['format'], 'webm')
+        self.assertIsNone(truncated['duration'])
+
+    def test_streamed_wav_placeholder_size(self):
+        with open(self.encoded('a.wav', subtype='PCM_16'), 'rb') as f:
+            data = bytearray(f.read())
+        index = data.index(b'data')
+        data[index + 4:index + 8] = b'\xff\xff\xff\xff'
+        self.assertAlmostEqual(probe_audio_metadata(self.write('streamed.wav', bytes(data)))['duration'], 1.5)
+
+
+class TemporaryMediaMixin:
+    """Keeps uploads and recording storage in a temporary directory for the test"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media = directory.name
+        upload_folder = os.path.join(self.media, 'uploads')
+        os.makedirs(upload_folder)
+        settings = override_settings(MEDIA_ROOT=self.media, SPEECH_RECORDING_STORAGE={
+                'BACKEND': 'speech_analysis.storage.LocalRecordingStorage',
+                'OPTIONS': {'location': os.path.join(self.media, 'store')},
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for module in (views, cleanup_recordings):
+            patcher = mock.patch.object(module, 'UPLOAD_FOLDER', upload_folder)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        get_recording_storage.cache_clear()
+        self.addCleanup(get_recording_storage.cache_clear)
+
+
+def wav_bytes(seconds=1.0, sample_rate=16000):
+    buffer = io.BytesIO()
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    sf.write(buffer, (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), sample_rate, format='WAV', subtype='PCM_16')
+    return buffer.getvalue()
+
+
+class ChunkedUploadTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='uploader')
+        self.client.force_login(self.user)
+        self.data = wav_bytes()
+
+    def start(self, **fields):
+        response = self.client.post(reverse('speech_analysis:start_chunked_upload'),
+                                    {'size': len(self.data), 'filename': 'take.wav', **fields},
+                                    content_type='application/json')
+        return response
+
+    def put(self, upload_id, offset, chunk):
+        return self.client.put(reverse('speech_analysis:upload_chunk', args=[upload_id]), chunk,
+                               content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunks_resume_and_complete(self):
+        upload_id = self.start().json()['upload_id']
+        self.assertEqual(self.put(upload_id, 0, self.data[:10000]).json(), {'offset': 10000, 'complete': False})
+        # A worker that never saw the first chunk rebuilds the running hash from disk
+        views.forget_upload(upload_id)
+        self.assertTrue(self.put(upload_id, 10000, self.data[10000:]).json()['complete'])
+        response = self.client.post(reverse('speech_analysis:complete_chunked_upload', args=[upload_id]))
+        self.assertEqual(response.status_code, 200)
+        recording = AudioRecording.objects.get(pk=response.json()['recording_id'])
+        self.assertEqual(recording.content_hash, hashlib.sha256(self.data).hexdigest())
+        self.assertAlmostEqual(recording.duration, 1.0)
+        self.assertNotIn(upload_id, views._upload_hashers)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunk_at_a_stale_offset_is_refused(self):
+        upload_id = self.start().json()['upload_id']
+        self.put(upload_id, 0, self.data[:10000])
+        # The same chunk again, e.g. a retry racing the original: it must not be appended twice
+        response = self.put(upload_id, 0, self.data[:10000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 10000)
+        self.assertEqual(os.path.getsize(UploadSession.objects.get().part_path), 10000)
+
+    def test_offset_claimed_by_another_worker_meanwhile(self):
+        upload_id = self.start().json()['upload_id']
+        request = RequestFactory().put('/', self.data[:10000], content_type='application/octet-stream',
+                                       HTTP_UPLOAD_OFFSET='0')
+        request.user = self.user
+        read = request.read
+
+        # Another worker appends its chunk while this body is still arriving, after the early offset check
+        def read_while_another_appends(size):
+            UploadSession.objects.update(received_bytes=5000)
+            return read(size)
+        request.read = read_while_another_appends
+        response = views.upload_chunk(request, upload_id)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)['offset'], 5000)
+        self.assertEqual(os.path.getsize(UploadSession.objects.get().part_path), 0)
+
+    def test_unknown_format_is_rejected_on_the_first_chunk(self):
+        upload_id = self.start().json()['upload_id']
+        self.assertEqual(self.put(upload_id, 0, b'\x00' * 1000).status_code, 415)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_non_numeric_duration_is_a_bad_request(self):
+        self.assertEqual(self.start(duration='about a minute').status_code, 400)
+        self.assertEqual(self.start(duration='nan').status_code, 400)
+        self.assertEqual(self.start(duration='12.5').status_code, 201)
+        response = self.client.post(reverse('speech_analysis:upload_recording'),
+                                    {'audio': io.BytesIO(self.data), 'duration': 'inf'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_hasher_cache_is_bounded_and_cleaned_up(self):
+        with mock.patch.object(views, 'UPLOAD_HASHER_CACHE_SIZE', 2):
+            ids = [self.start().json()['upload_id'] for _ in range(3)]
+            for upload_id in ids:
+                self.put(upload_id, 0, self.data[:100])
+            self.assertEqual(list(views._upload_hashers), ids[1:])
+        UploadSession.objects.update(updated_at=timezone.now() - datetime.timedelta(days=2))
+        call_command('cleanup_recordings', stdout=io.StringIO())
+        self.assertEqual(list(views._upload_hashers), [])
+
+
+class WaveformTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='listener')
+        self.client.force_login(self.user)
+        self.recording = AudioRecording.objects.create(user=self.user, filename='r.opus', original_filename='r.webm')
+
+    def test_window_bounds_must_be_finite_numbers(self):
+        url = reverse('speech_analysis:recording_waveform', args=[self.recording.pk])
+        for query in ('start=nan', 'start=inf', 'end=-inf', 'end=NaN', 'start=soon', 'zoom=1.5'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'{url}?{query}').status_code, 400)
+
+
+class LiveAnalysisTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='speaker')
+        self.client.force_login(self.user)
+
+    def test_live_summary_does_not_stand_in_for_an_analysis(self):
+        live = {'duration': 1.0, 'speech_rate': 1.0, 'pause_count': 0, 'volume_variation': 0.0,
+                'pitch_variation': 0.0, 'energy_level': 0.0}
+        cache.set(LIVE_SUMMARY_KEY.format('session-1'), {'user_id': self.user.pk, 'analysis': live})
+        response = self.client.post(reverse('speech_analysis:upload_recording'),
+                                    {'audio': io.BytesIO(wav_bytes()), 'liveSession': 'session-1'})
+        recording = AudioRecording.objects.get(pk=response.json()['recording_id'])
+        self.assertEqual(recording.speechanalysis.detailed_analysis['profile'], 'live')
+
+        analysis = self.client.get(reverse('speech_analysis:analyze_recording', args=[recording.pk])).json()['analysis']
+        self.assertEqual(analysis['profile'], 'accurate')
+        self.assertNotEqual(analysis['speech_rate'], 1.0)
+        recording.speechanalysis.refresh_from_db()
+        self.assertEqual(recording.speechanalysis.detailed_analysis['profile'], 'accurate')
+
+    def test_start_message_with_a_bad_sample_rate(self):
+        consumer = LiveFeedbackConsumer()
+        consumer.analyzer = None
+        consumer.send = mock.Mock()
+        for sample_rate in ('sixteen thousand', None, [16000], 44100):
+            consumer.receive(text_data=json.dumps({'type': 'start', 'sample_rate': sample_rate}))
+            self.assertEqual(json.loads(consumer.send.call_args.kwargs['text_data'])['type'], 'error')
+        self.assertIsNone(consumer.analyzer)
+
+
+class AnalyzeRecordingsCommandTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_user(username='batch')
+        self.client.force_login(user)
+        self.ids = [self.client.post(reverse('speech_analysis:upload_recording'),
+                                     {'audio': io.BytesIO(wav_bytes(seconds))}).json()['recording_id']
+                    for seconds in (1.0, 1.5, 2.0)]
+        self.checkpoint = os.path.join(self.media, 'checkpoint.json')
+
+    def test_analyzes_in_worker_processes(self):
+        out = io.StringIO()
+        call_command('analyze_recordings', '--ids', ','.join(map(str, self.ids[:2])), workers=2, batch_size=1,
+                     checkpoint=self.checkpoint, stdout=out)
+        self.assertIn('Analyzing 2 recordings with 2 workers', out.getvalue())
+        analyses = SpeechAnalysis.objects.order_by('recording_id')
+        self.assertEqual([analysis.recording_id for analysis in analyses], self.ids[:2])
+        self.assertTrue(all(analysis.artifacts_key for analysis in analyses))
+        self.assertAlmostEqual(analyses[1].detailed_analysis['duration'], 1.5, places=2)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_ids_must_be_integers(self):
+        with self.assertRaisesMessage(CommandError, "must be comma-separated recording ids, not '1,two'"):
+            call_command('analyze_recordings', '--ids', '1,two', checkpoint=self.checkpoint)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+
+class FakeS3Client:
+    """The handful of boto3 S3 client calls S3RecordingStorage makes, against a dict"""
+
+    class NotFound(Exception):
+        response = {'Error': {'Code': '404'}}
+
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> (bytes, last modified)
+
+    def upload_file(self, filename, bucket, key):
+        with open(filename, 'rb') as f:
+            self.objects[bucket, key] = (f.read(), timezone.now())
+
+    def download_file(self, bucket, key, filename):
+        with open(filename, 'wb') as f:
+            f.write(self.objects[bucket, key][0])
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound()
+        return {'ContentLength': len(self.objects[Bucket, Key][0])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def get_paginator(self, operation):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                yield {'Contents': [{'Key': key, 'LastModified': modified}
+                                    for (bucket, key), (_, modified) in sorted(client.objects.items())
+                                    if bucket == Bucket and key.startswith(Prefix)]}
+        return Paginator()
+
+
+class RecordingStorageTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tmp = directory.name
+
+    def local_file(self, data=b'audio bytes'):
+        fd, path = tempfile.mkstemp(dir=self.tmp)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return path
+
+    def check_backend(self, storage):
+        source = self.local_file()
+        storage.save(source, 'ab/abc.opus')
+        self.assertFalse(os.path.exists(source))  # consumed
+        self.assertTrue(storage.exists('ab/abc.opus'))
+        self.assertFalse(storage.exists('ab/missing.opus'))
+        self.assertEqual(storage.size('ab/abc.opus'), len(b'audio bytes'))
+        with storage.local_path('ab/abc.opus') as path:
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'audio bytes')
+        self.assertEqual([key for key, _ in storage.iter_objects()], ['ab/abc.opus'])
+        storage.delete('ab/abc.opus')
+        storage.delete('ab/abc.opus')  # deleting twice is fine
+        self.assertFalse(storage.exists('ab/abc.opus'))
+        self.assertEqual(list(storage.iter_objects()), [])
+
+    def test_local_backend(self):
+        storage = LocalRecordingStorage(os.path.join(self.tmp, 'store'))
+        self.check_backend(storage)
+        # Half-written objects are never listed
+        os.makedirs(os.path.join(self.tmp, 'store', 'cd'))
+        open(os.path.join(self.tmp, 'store', 'cd', 'cde.opus.tmp'), 'wb').close()
+        self.assertEqual(list(storage.iter_objects()), [])
+
+    def test_s3_backend(self):
+        client = FakeS3Client()
+        storage = S3RecordingStorage('recordings', prefix='speech/', client=client)
+        self.check_backend(storage)
+        storage.save(self.local_file(), 'ab/abc.opus')
+        self.assertEqual(list(client.objects), [('recordings', 'speech/ab/abc.opus')])
+        with storage.local_path('ab/abc.opus') as path:
+            pass
+        self.assertFalse(os.path.exists(path))  # downloads are temporary
+
+    def test_s3_backend_needs_boto3_or_a_client(self):
+        with mock.patch.dict('sys.modules', {'boto3': None}):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'requires boto3'):
+                S3RecordingStorage('recordings')
+
+
+@override_settings(SPEECH_RECORDING_CODEC='original')
+class StoreRecordingTests(TemporaryMediaMixin, TestCase):
+    def test_identical_uploads_share_one_object(self):
+        data = wav_bytes()
+        content_hash = hashlib.sha256(data).hexdigest()
+        metadata = {'extension': '.wav', 'codec': 'pcm'}
+        keys = []
+        for _ in range(2):
+            path = os.path.join(self.media, 'upload.wav')
+            with open(path, 'wb') as f:
+                f.write(data)
+            keys.append(store_recording_file(path, content_hash, metadata))
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(keys[0], (f'{content_hash[:2]}/{content_hash}.wav', 'pcm', len(data)))
+        self.assertEqual(len(list(get_recording_storage().iter_objects())), 1)
+
+    def test_cleanup_removes_only_unreferenced_objects(self):
+        storage = get_recording_storage()
+        user = get_user_model().objects.create_user(username='keeper')
+        for key in ('aa/kept.wav', 'bb/orphan.wav', 'cc/new-orphan.wav'):
+            storage.save(self.create_file(), key)
+        AudioRecording.objects.create(user=user, filename='kept.wav', original_filename='kept.wav',
+                                      storage_key='aa/kept.wav')
+        old = (timezone.now() - datetime.timedelta(days=2)).timestamp()
+        for key in ('aa/kept.wav', 'bb/orphan.wav'):
+            os.utime(storage._path(key), (old, old))
+
+        call_command('cleanup_recordings', '--dry-run', stdout=io.StringIO())
+        self.assertTrue(storage.exists('bb/orphan.wav'))
+        call_command('cleanup_recordings', stdout=io.StringIO())
+        # Orphans inside the grace period are left alone, as they may be about to be claimed
+        self.assertEqual(sorted(key for key, _ in storage.iter_objects()), ['aa/kept.wav', 'cc/new-orphan.wav'])
+
+    def create_file(self):
+        fd, path = tempfile.mkstemp(dir=self.media)
+        os.close(fd)
+        return path
+
+
+class ProgressSessionPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='learner')
+        other = get_user_model().objects.create_user(username='other-learner')
+        start = timezone.now() - datetime.timedelta(days=10)
+        # Pairs of sessions share a timestamp, so pages have to break ties on id
+        for i in range(9):
+            for user in (cls.user, other):
+                recording = AudioRecording.objects.create(user=user, filename=f'{i}.opus', original_filename='r.webm')
+                session = ProgressSession.objects.create(user=user, recording=recording)
+                ProgressSession.objects.filter(pk=session.pk).update(session_date=start + datetime.timedelta(hours=i // 2))
+        cls.expected = list(ProgressSession.objects.filter(user=cls.user).order_by('-session_date', '-id')
+                            .values_list('id', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_cursor_walks_every_session_once(self):
+        url = reverse('speech_analysis:progress_sessions')
+        seen, cursor, pages = [], None, 0
+        while True:
+            body = self.client.get(url, {'page_size': 2, **({'cursor': cursor} if cursor else {})}).json()
+            seen += [session['id'] for session in body['sessions']]
+            pages += 1
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 5)
+
+    def test_page_size_is_clamped(self):
+        url = reverse('speech_analysis:progress_sessions')
+        self.assertEqual(len(self.client.get(url, {'page_size': 0}).json()['sessions']), 1)
+        body = self.client.get(url, {'page_size': 1000}).json()
+        self.assertEqual(len(body['sessions']), 9)
+        self.assertIsNone(body['next_cursor'])
+
+    def test_bad_parameters(self):
+        url = reverse('speech_analysis:progress_sessions')
+        for params in ({'cursor': 'not-a-cursor'}, {'cursor': views._encode_session_cursor(timezone.now(), 1)[:-4]},
+                       {'page_size': 'many'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+class DownsamplingTests(SimpleTestCase):
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        x = np.arange(1000, dtype=float)
+        y = np.sin(x / 50)
+        y[437] = 25.0
+        y[812] = -25.0
+        keep = lttb_indices(x, y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(437, keep)
+        self.assertIn(812, keep)
+
+    def test_lttb_short_series_unchanged(self):
+        self.assertEqual(list(lttb_indices([1, 2, 3], [5, 1, 4], 10)), [0, 1, 2])
+        self.assertEqual(list(lttb_indices(range(5), range(5), 2)), [0, 1, 2, 3, 4])
+
+    def test_moving_average(self):
+        np.testing.assert_allclose(moving_average([2, 4, 6, 8], 3), [2, 3, 4, 6])
+
+
+class MetricHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='charted')
+        start = datetime.datetime(2026, 1, 5, 9, tzinfo=datetime.timezone.utc)
+        for i in range(40):
+            recording = AudioRecording.objects.create(user=cls.user, filename=f'{i}.opus', original_filename='r.webm')
+            analysis = SpeechAnalysis.objects.create(recording=recording, speech_rate=100.0 + i, pause_count=i,
+                                                     volume_variation=0.1, pitch_variation=20.0, energy_level=0.5)
+            session = ProgressSession.objects.create(user=cls.user, recording=recording, analysis=analysis)
+            # Two sessions a day
+            ProgressSession.objects.filter(pk=session.pk).update(
+                session_date=start + datetime.timedelta(days=i // 2, hours=i % 2))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('speech_analysis:metric_history')
+
+    def test_full_history(self):
+        body = self.client.get(self.url).json()
+        self.assertEqual((body['total_points'], body['downsampled']), (40, False))
+        self.assertEqual([point['speech_rate'] for point in body['history']], [100.0 + i for i in range(40)])
+
+    def test_downsampled(self):
+        body = self.client.get(self.url, {'points': 10, 'metric': 'pause_count'}).json()
+        self.assertEqual((body['total_points'], len(body['history']), body['downsampled']), (40, 10, True))
+        self.assertEqual((body['history'][0]['pause_count'], body['history'][-1]['pause_count']), (0, 39))
+
+    def test_daily_buckets_with_moving_average(self):
+        body = self.client.get(self.url, {'bucket': 'day', 'window': 2}).json()
+        first, second = body['history'][:2]
+        self.assertEqual(len(body['history']), 20)
+        self.assertEqual((first['date'], first['sessions']), ('2026-01-05', 2))
+        self.assertEqual((first['speech_rate'], first['speech_rate_min'], first['speech_rate_max']), (100.5, 100, 101))
+        self.assertEqual(second['speech_rate_ma'], 101.5)
+
+    def test_bad_parameters(self):
+        for params in ({'bucket': 'hour'}, {'metric': 'mood'}, {'points': 'all'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.delete(catalog.CATALOG_VERSION_KEY)
+        catalog._catalog = None
+        self.addCleanup(setattr, catalog, '_catalog', None)
+
+    def test_seeded_by_the_migration(self):
+        loaded = catalog.get_catalog()
+        self.assertEqual(len(loaded.tasks), len(catalog.SPEAKING_TASKS))
+        self.assertEqual(set(loaded.topics), set(catalog.IMPROMPTU_TOPICS))
+        self.assertIn(loaded.random_topic(), catalog.IMPROMPTU_TOPICS)
+
+    def test_served_from_memory_until_the_version_changes(self):
+        loaded = catalog.get_catalog()
+        with self.assertNumQueries(0):
+            self.assertIs(catalog.get_catalog(), loaded)
+
+        # Another worker's admin edit: only the shared version counter changes here
+        cache.incr(catalog.CATALOG_VERSION_KEY)
+        reloaded = catalog.get_catalog()
+        self.assertIsNot(reloaded, loaded)
+        self.assertEqual(reloaded.version, loaded.version + 1)
+
+    def test_edits_invalidate_through_signals(self):
+        catalog.get_catalog()
+        SpeakingTask.objects.create(task_id='toast', title='Wedding Toast', description='', instructions='',
+                                    time_limit=2)
+        ImpromptuTopic.objects.filter(topic=catalog.IMPROMPTU_TOPICS[0]).delete()
+        loaded = catalog.get_catalog()
+        self.assertIn('toast', loaded.tasks_by_id)
+        self.assertNotIn(catalog.IMPROMPTU_TOPICS[0], loaded.topics)
+
+    def test_reloaded_after_max_age(self):
+        loaded = catalog.get_catalog()
+        later = loaded.loaded_at + catalog.CATALOG_MAX_AGE + 1
+        with mock.patch('speech_analysis.catalog.time.monotonic', return_value=later):
+            self.assertIsNot(catalog.get_catalog(), loaded)
+
+    def test_seed_command_adds_only_what_is_missing(self):
+        SpeakingTask.objects.filter(task_id='elevator-pitch').delete()
+        catalog.get_catalog()
+        out = io.StringIO()
+        call_command('seed_speech_catalog', stdout=out)
+        self.assertIn('Added 1 tasks and 0 topics', out.getvalue())
+        self.assertIn('elevator-pitch', catalog.get_catalog().tasks_by_id)
@@ -6,7 +6,12 @@ app_name = 'speech_analysis'
 urlpatterns = [
     path('', views.speech_dashboard, name='dashboard'),
     path('upload/', views.upload_recording, name='upload_recording'),
+    path('upload/chunked/', views.start_chunked_upload, name='start_chunked_upload'),
+    path('upload/chunked/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('upload/chunked/<uuid:upload_id>/complete/', views.complete_chunked_upload, name='complete_chunked_upload'),
     path('analyze/<int:recording_id>/', views.analyze_recording, name='analyze_recording'),
+    path('recordings/<int:recording_id>/waveform/', views.recording_waveform, name='recording_waveform'),
+    path('recordings/<int:recording_id>/contours/', views.recording_contours, name='recording_contours'),
     path('submit-assessment/', views.submit_assessment, name='submit_assessment'),
     path('sessions/', views.get_progress_sessions, name='progress_sessions'),
     path('metrics/', views.get_metric_history, name='metric_history'),
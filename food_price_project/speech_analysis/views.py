@@ -1,106 +1,73 @@
 import os
 import json
+import uuid
+import hashlib
+import math
 import datetime
+import base64
+import tempfile
+import threading
+from collections import OrderedDict
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
+from django.db.models import Q, Avg, Min, Max, Count
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from django.conf import settings
-from pydub import AudioSegment
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+import numpy as np
 
-from .models import AudioRecording, SpeechAnalysis, UserAssessment, SpeakingTask, ProgressSession, ImpromptuTopic
-from .utils import analyze_audio, generate_feedback_from_analysis, convert_numpy_types
-import random
+from .models import AudioRecording, SpeechAnalysis, UserAssessment, ProgressSession, UploadSession
+from .utils import analyze_audio, ANALYSIS_PROFILES, DEFAULT_ANALYSIS_PROFILE, WAVEFORM_PEAK_SAMPLES, generate_feedback_from_analysis, convert_numpy_types, export_wav, lttb_indices, moving_average
+from .probe import sniff_format, probe_audio_metadata
+from .storage import store_recording_file, recording_local_path, store_artifacts, load_artifacts
+from .catalog import get_catalog
+from .consumers import LIVE_SUMMARY_KEY
+from .realtime import LIVE_ANALYSIS_PROFILE
+from predictor.conditional import conditional
+from predictor.query_budget import query_budget
 
 # Create upload directory
 UPLOAD_FOLDER = os.path.join(settings.MEDIA_ROOT, "speech_recordings")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Default speaking tasks
-SPEAKING_TASKS = [
-    {
-        "id": "short-presentation", 
-        "title": "Short Presentation",
-        "description": "Practice delivering a focused presentation on a topic of your choice",
-        "instructions": "Prepare and deliver a 3-5 minute presentation on any topic you're passionate about. Structure your talk with a clear introduction, main points, and conclusion. Focus on engaging your audience and speaking with confidence.",
-        "time_limit": 5
-    },
-    {
-        "id": "elevator-pitch", 
-        "title": "Elevator Pitch",
-        "description": "Perfect your 60-second personal pitch",
-        "instructions": "Create a compelling 60-second pitch about yourself, your skills, or your business idea. Imagine you're in an elevator with someone important - make every second count!",
-        "time_limit": 1
-    },
-    {
-        "id": "storytelling", 
-        "title": "Storytelling Challenge",
-        "description": "Tell an engaging story that captivates your audience",
-        "instructions": "Share a personal story, anecdote, or fictional tale. Focus on using vivid details, emotional connection, and a clear narrative arc to keep your audience engaged.",
-        "time_limit": 4
-    },
-    {
-        "id": "impromptu-speech", 
-        "title": "Impromptu Speech",
-        "description": "Speak spontaneously on a random topic",
-        "instructions": "You'll be given a random topic and have 30 seconds to think before delivering a 2-3 minute impromptu speech. Practice thinking on your feet and organizing your thoughts quickly.",
-        "time_limit": 3
-    },
-    {
-        "id": "product-demo", 
-        "title": "Product Demo",
-        "description": "Demonstrate and sell a product or service",
-        "instructions": "Choose a product (real or imaginary) and give a compelling demonstration. Explain its features, benefits, and why your audience should buy it. Focus on persuasion and clarity.",
-        "time_limit": 4
-    },
-]
-
-# Impromptu speech topics
-IMPROMPTU_TOPICS = [
-    "If you could have dinner with anyone from history, who would it be and why?",
-    "What skill do you wish you could master instantly?",
-    "Describe your ideal vacation destination",
-    "What's the most important lesson you've learned in life?",
-    "If you could solve one world problem, what would it be?",
-    "What technology from the future would you most want to use?",
-    "Describe a moment that changed your perspective",
-    "What advice would you give to your younger self?",
-    "If you could start a new tradition, what would it be?",
-    "What's the best compliment you've ever received?",
-    "Describe your dream job",
-    "What book or movie has influenced you the most?",
-    "If you could live in any time period, when would it be?",
-    "What's your definition of success?",
-    "Describe a challenge that made you stronger",
-]
-
-def init_speaking_tasks():
-    """Initialize default speaking tasks and topics in the database"""
-    for task_data in SPEAKING_TASKS:
-        SpeakingTask.objects.get_or_create(
-            task_id=task_data["id"],
-            defaults={
-                "title": task_data["title"],
-                "description": task_data["description"],
-                "instructions": task_data["instructions"],
-                "time_limit": task_data["time_limit"]
-            }
-        )
-    
-    # Initialize impromptu topics
-    for topic in IMPROMPTU_TOPICS:
-        ImpromptuTopic.objects.get_or_create(
-            topic=topic,
-            defaults={"category": "general", "is_active": True}
-        )
+# Progress session pagination
+SESSION_PAGE_SIZE = 20
+SESSION_MAX_PAGE_SIZE = 100
+
+# Metric history charts
+METRIC_FIELDS = ['speech_rate', 'pause_count', 'volume_variation', 'pitch_variation', 'energy_level']
+METRIC_BUCKETS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+METRIC_POINT_BUDGET = 500
+METRIC_MAX_POINT_BUDGET = 5000
+
+# Playback artifacts are immutable per storage key, so browsers may reuse them for a while
+ARTIFACT_MAX_AGE = 24 * 60 * 60
+
+# Size of the blocks read from the request stream while writing uploads to disk
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Running SHA-256 of in-flight chunked uploads as {upload_id: [offset, hasher]}, least recently used
+# first. It is only a per-process shortcut: a worker that has not seen an upload (or has evicted it)
+# rebuilds the hash once from the bytes already on disk, so the cache is capped, and finished,
+# cancelled or cleaned-up uploads are dropped from it.
+UPLOAD_HASHER_CACHE_SIZE = 64
+_upload_hashers = OrderedDict()
+_upload_hashers_lock = threading.Lock()
 
 @login_required
+@query_budget(3)
 def speech_dashboard(request):
     """Main dashboard for speech analysis"""
-    init_speaking_tasks()
-    tasks = SpeakingTask.objects.all()
-    recent_sessions = ProgressSession.objects.filter(user=request.user)[:5]
+    tasks = get_catalog().tasks
+    recent_sessions = ProgressSession.objects.filter(user=request.user).select_related('assessment__task')[:5]
     
     context = {
         'tasks': tasks,
@@ -108,10 +75,62 @@ def speech_dashboard(request):
     }
     return render(request, 'speech_analysis/dashboard.html', context)
 
+def _validate_recording(metadata):
+    """Check probed metadata against the upload limits; returns (error, status) or None"""
+    if not metadata:
+        return "Unsupported audio format", 415
+    if metadata['duration'] and metadata['duration'] > settings.SPEECH_MAX_RECORDING_SECONDS:
+        return f"Recording is longer than {settings.SPEECH_MAX_RECORDING_SECONDS} seconds", 413
+    return None
+
+def _store_recording(user, part_path, original_filename, content_hash, metadata,
+                     task=None, client_duration=None, virtual_scene='small-audience', topic=''):
+    """Hand a fully received upload to recording storage and create its AudioRecording"""
+    storage_key, codec, stored_size = store_recording_file(part_path, content_hash, metadata)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    filename = f"recording_{user.id}_{timestamp}{os.path.splitext(storage_key)[1]}"
+
+    # Only fall back to the client's duration (checked by _parse_duration) when the container does not tell us
+    duration = metadata['duration']
+    if duration is None and client_duration:
+        duration = min(client_duration, settings.SPEECH_MAX_RECORDING_SECONDS)
+
+    return AudioRecording.objects.create(
+        user=user,
+        task=task,
+        filename=filename,
+        original_filename=original_filename,
+        storage_key=storage_key,
+        file_size=stored_size,
+        duration=duration,
+        virtual_scene=virtual_scene,
+        topic=topic,
+        content_hash=content_hash,
+        codec=codec,
+    )
+
+def _parse_duration(value):
+    """A client-reported duration in seconds, or None if not given. Raises ValueError if it isn't a usable number."""
+    if value in (None, ''):
+        return None
+    duration = float(value)
+    if not math.isfinite(duration) or duration < 0:
+        raise ValueError(value)
+    return duration
+
+def _recording_response(recording):
+    return JsonResponse({
+        "message": "Audio uploaded",
+        "filename": recording.filename,
+        "recording_id": recording.id,
+        "duration": recording.duration,
+        "codec": recording.codec,
+    })
+
 @login_required
 @csrf_exempt
 def upload_recording(request):
-    """Handle audio file upload"""
+    """Handle a single-request audio file upload"""
     if request.method != 'POST':
         return JsonResponse({"error": "Method not allowed"}, status=405)
     
@@ -119,78 +138,318 @@ def upload_recording(request):
         return JsonResponse({"error": "No audio file uploaded"}, status=400)
 
     audio_file = request.FILES["audio"]
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    filename = f"recording_{request.user.id}_{timestamp}.webm"
-    
-    # Save file
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    with open(filepath, 'wb') as f:
+    if audio_file.size > settings.SPEECH_MAX_UPLOAD_SIZE:
+        return JsonResponse({"error": "Recording is too large"}, status=413)
+
+    try:
+        client_duration = _parse_duration(request.POST.get('duration'))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "duration must be a number of seconds"}, status=400)
+
+    # Save file, hashing it on the way
+    part_path = os.path.join(UPLOAD_FOLDER, f"upload_{uuid.uuid4().hex}.part")
+    hasher = hashlib.sha256()
+    with open(part_path, 'wb') as f:
         for chunk in audio_file.chunks():
             f.write(chunk)
-    
-    # Get additional data from request
-    task_id = request.POST.get('taskId', '')
-    duration = request.POST.get('duration', 0)
-    virtual_scene = request.POST.get('virtualScene', 'small-audience')
-    topic = request.POST.get('topic', '')
+            hasher.update(chunk)
+
+    metadata = probe_audio_metadata(part_path)
+    error = _validate_recording(metadata)
+    if error:
+        os.remove(part_path)
+        return JsonResponse({"error": error[0]}, status=error[1])
     
     # Get task object if provided
-    task = None
-    if task_id:
-        task = SpeakingTask.objects.filter(task_id=task_id).first()
+    task = get_catalog().tasks_by_id.get(request.POST.get('taskId', ''))
     
-    # Create database record
-    recording = AudioRecording.objects.create(
+    recording = _store_recording(
+        request.user, part_path, audio_file.name, hasher.hexdigest(), metadata,
+        task=task,
+        client_duration=client_duration,
+        virtual_scene=request.POST.get('virtualScene', 'small-audience'),
+        topic=request.POST.get('topic', ''),
+    )
+    _attach_live_analysis(recording, request.POST.get('liveSession'))
+    return _recording_response(recording)
+
+def _upload_hasher(session):
+    """Return the [offset, hasher] entry for a chunked upload, rebuilding it if needed"""
+    key = str(session.upload_id)
+    with _upload_hashers_lock:
+        entry = _upload_hashers.get(key)
+        if entry is not None:
+            _upload_hashers.move_to_end(key)
+    if entry is None or entry[0] != session.received_bytes:
+        hasher = hashlib.sha256()
+        remaining = session.received_bytes
+        with open(session.part_path, 'rb') as f:
+            while remaining > 0:
+                block = f.read(min(STREAM_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        entry = [session.received_bytes, hasher]
+        with _upload_hashers_lock:
+            _upload_hashers[key] = entry
+            while len(_upload_hashers) > UPLOAD_HASHER_CACHE_SIZE:
+                _upload_hashers.popitem(last=False)
+    return entry
+
+def forget_upload(upload_id):
+    """Drop an upload's running hash from this process's cache"""
+    with _upload_hashers_lock:
+        _upload_hashers.pop(str(upload_id), None)
+
+def _discard_upload(session):
+    forget_upload(session.upload_id)
+    if os.path.exists(session.part_path):
+        os.remove(session.part_path)
+    session.delete()
+
+@login_required
+@csrf_exempt
+def start_chunked_upload(request):
+    """Open a resumable upload; the client then sends the file in chunks"""
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        total_size = int(data.get("size", 0))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({"error": "Invalid upload request"}, status=400)
+    try:
+        client_duration = _parse_duration(data.get("duration"))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "duration must be a number of seconds"}, status=400)
+
+    if total_size <= 0:
+        return JsonResponse({"error": "Upload size is required"}, status=400)
+    if total_size > settings.SPEECH_MAX_UPLOAD_SIZE:
+        return JsonResponse({"error": "Recording is too large"}, status=413)
+
+    task = get_catalog().tasks_by_id.get(data.get("taskId"))
+
+    session = UploadSession(
         user=request.user,
         task=task,
-        filename=filename,
-        original_filename=audio_file.name,
-        file_path=filepath,
-        file_size=audio_file.size,
-        duration=float(duration) if duration else None,
-        virtual_scene=virtual_scene,
-        topic=topic
+        original_filename=str(data.get("filename", "recording"))[:255],
+        total_size=total_size,
+        client_duration=client_duration,
+        virtual_scene=data.get("virtualScene", "small-audience"),
+        topic=data.get("topic", ""),
     )
+    session.part_path = os.path.join(UPLOAD_FOLDER, f"upload_{session.upload_id.hex}.part")
+    open(session.part_path, 'wb').close()
+    session.save()
+
+    return JsonResponse({
+        "upload_id": str(session.upload_id),
+        "offset": 0,
+        "chunk_size": settings.SPEECH_UPLOAD_CHUNK_SIZE,
+        "max_size": settings.SPEECH_MAX_UPLOAD_SIZE,
+    }, status=201)
 
+@login_required
+@csrf_exempt
+def upload_chunk(request, upload_id):
+    """
+    GET returns the current offset so an interrupted upload can resume.
+    PUT appends the raw request body at the Upload-Offset header position,
+    streaming it straight to disk. DELETE abandons the upload.
+    """
+    session = get_object_or_404(UploadSession, upload_id=upload_id, user=request.user)
+
+    if request.method in ('GET', 'HEAD'):
+        return JsonResponse({
+            "upload_id": str(session.upload_id),
+            "offset": session.received_bytes,
+            "size": session.total_size,
+        })
+    if request.method == 'DELETE':
+        _discard_upload(session)
+        return JsonResponse({"message": "Upload cancelled"})
+    if request.method not in ('PUT', 'PATCH'):
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.GET.get('offset', '')))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({"error": "Invalid chunk offset"}, status=400)
+
+    if offset != session.received_bytes:
+        return JsonResponse({"error": "Offset mismatch", "offset": session.received_bytes}, status=409)
+    if length <= 0:
+        return JsonResponse({"error": "Empty chunk"}, status=400)
+    if offset + length > session.total_size:
+        return JsonResponse({"error": "Chunk exceeds declared upload size"}, status=413)
+
+    # Receive the body into a scratch file first, so the session is only locked while the chunk is appended
+    chunk_path = f"{session.part_path}.{uuid.uuid4().hex[:8]}.chunk"
+    try:
+        written = 0
+        with open(chunk_path, 'wb') as f:
+            while written < length:
+                block = request.read(min(STREAM_BLOCK_SIZE, length - written))
+                if not block:
+                    break  # client went away; keep what arrived so it can resume
+                f.write(block)
+                written += len(block)
+        if not written:
+            return JsonResponse({"error": "Empty chunk"}, status=400)
+
+        with transaction.atomic():
+            # The conditional UPDATE both checks the offset and locks the session row (the whole database
+            # on SQLite) until commit: of two chunks sent for the same offset, concurrently or from
+            # different workers, only the first is appended and the other gets a 409.
+            if not UploadSession.objects.filter(pk=session.pk, received_bytes=offset).update(updated_at=timezone.now()):
+                current = UploadSession.objects.filter(pk=session.pk).values_list('received_bytes', flat=True).first()
+                if current is None:
+                    raise Http404("Upload not found")
+                return JsonResponse({"error": "Offset mismatch", "offset": current}, status=409)
+            session.refresh_from_db()
+            return _append_chunk(session, chunk_path, written)
+    finally:
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+
+def _append_chunk(session, chunk_path, length):
+    """Append a received chunk at the session's offset. Runs with the session locked."""
+    offset = session.received_bytes
+    entry = _upload_hasher(session)
+    hasher = entry[1]
+    # Until the chunk is in, the hasher matches no offset, so a failure here means a rebuild, not a wrong hash
+    entry[0] = None
+    with open(chunk_path, 'rb') as chunk, open(session.part_path, 'r+b') as f:
+        f.seek(offset)
+        for block in iter(lambda: chunk.read(STREAM_BLOCK_SIZE), b''):
+            f.write(block)
+            hasher.update(block)
+        f.truncate()
+    session.received_bytes = offset + length
+    entry[0] = session.received_bytes
+
+    # Reject unknown formats and over-long recordings as soon as the header is in
+    if not session.detected_format:
+        with open(session.part_path, 'rb') as f:
+            session.detected_format = sniff_format(f.read(64)) or ''
+        if not session.detected_format:
+            _discard_upload(session)
+            return JsonResponse({"error": "Unsupported audio format"}, status=415)
+    metadata = probe_audio_metadata(session.part_path, scan_blocks=False)
+    if metadata and metadata['duration'] and metadata['duration'] > settings.SPEECH_MAX_RECORDING_SECONDS:
+        _discard_upload(session)
+        return JsonResponse({"error": f"Recording is longer than {settings.SPEECH_MAX_RECORDING_SECONDS} seconds"}, status=413)
+
+    UploadSession.objects.filter(pk=session.pk).update(
+        received_bytes=session.received_bytes,
+        detected_format=session.detected_format,
+        updated_at=timezone.now(),
+    )
     return JsonResponse({
-        "message": "Audio uploaded", 
-        "filename": filename,
-        "recording_id": recording.id
+        "offset": session.received_bytes,
+        "complete": session.received_bytes == session.total_size,
     })
 
 @login_required
-def analyze_recording(request, recording_id):
-    """Analyze a specific recording"""
-    recording = get_object_or_404(AudioRecording, id=recording_id, user=request.user)
-    
-    # Convert to WAV if needed
-    input_path = recording.file_path
-    wav_filename = os.path.splitext(recording.filename)[0] + ".wav"
-    wav_path = os.path.join(UPLOAD_FOLDER, wav_filename)
+@csrf_exempt
+def complete_chunked_upload(request, upload_id):
+    """Verify a fully received chunked upload and turn it into an AudioRecording"""
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    session = get_object_or_404(UploadSession, upload_id=upload_id, user=request.user)
+    if session.received_bytes != session.total_size:
+        return JsonResponse({"error": "Upload is incomplete", "offset": session.received_bytes}, status=409)
+
+    content_hash = _upload_hasher(session)[1].hexdigest()
+    metadata = probe_audio_metadata(session.part_path)
+    error = _validate_recording(metadata)
+    if error:
+        _discard_upload(session)
+        return JsonResponse({"error": error[0]}, status=error[1])
+
+    recording = _store_recording(
+        request.user, session.part_path, session.original_filename, content_hash, metadata,
+        task=session.task,
+        client_duration=session.client_duration,
+        virtual_scene=session.virtual_scene,
+        topic=session.topic,
+    )
+    forget_upload(session.upload_id)
+    session.delete()
 
     try:
-        # Convert audio format
-        audio = AudioSegment.from_file(input_path)
-        audio = audio.set_channels(1).set_frame_rate(16000)
-        audio.export(wav_path, format="wav")
-        
+        live_session = json.loads(request.body or b'{}').get("liveSession")
+    except ValueError:
+        live_session = None
+    _attach_live_analysis(recording, live_session)
+    return _recording_response(recording)
+
+def _run_analysis(recording, profile):
+    """Analyze a recording and store its playback artifacts. Returns (result, artifacts_key)."""
+    # Decode to a temporary WAV that is removed as soon as analysis is done
+    with recording_local_path(recording) as input_path, tempfile.TemporaryDirectory() as tmp_dir:
+        wav_path = os.path.join(tmp_dir, "audio.wav")
+        export_wav(input_path, wav_path)
+
         # Analyze audio
-        analysis_result = analyze_audio(wav_path)
+        artifacts_path = os.path.join(tmp_dir, "artifacts.npz")
+        analysis_result = analyze_audio(wav_path, profile, artifacts_path)
         if not analysis_result:
-            return JsonResponse({"error": "Analysis failed"}, status=500)
+            return None, ''
+        return analysis_result, store_artifacts(recording, artifacts_path, profile)
 
-        # Save analysis to database
-        analysis, created = SpeechAnalysis.objects.get_or_create(
-            recording=recording,
-            defaults={
-                'speech_rate': analysis_result['speech_rate'],
-                'pause_count': analysis_result['pause_count'],
-                'volume_variation': analysis_result['volume_variation'],
-                'pitch_variation': analysis_result['pitch_variation'],
-                'energy_level': analysis_result['energy_level'],
-                'detailed_analysis': analysis_result
-            }
-        )
+def _save_analysis(recording, analysis_result, artifacts_key=''):
+    """Save analysis to database"""
+    analysis, created = SpeechAnalysis.objects.update_or_create(
+        recording=recording,
+        defaults={
+            'speech_rate': analysis_result['speech_rate'],
+            'pause_count': analysis_result['pause_count'],
+            'volume_variation': analysis_result['volume_variation'],
+            'pitch_variation': analysis_result['pitch_variation'],
+            'energy_level': analysis_result['energy_level'],
+            'detailed_analysis': analysis_result,
+            'artifacts_key': artifacts_key,
+        }
+    )
+    return analysis
+
+def _attach_live_analysis(recording, live_session):
+    """Store the summary computed over the WebSocket while this recording was made"""
+    if not live_session:
+        return
+    live = cache.get(LIVE_SUMMARY_KEY.format(live_session))
+    if live and live["user_id"] == recording.user_id:
+        # Shown until a real analysis replaces it; analyze_recording and analyze_recordings don't count it as one
+        _save_analysis(recording, {**live["analysis"], "profile": LIVE_ANALYSIS_PROFILE, "source": "live"})
+        cache.delete(LIVE_SUMMARY_KEY.format(live_session))
+
+@login_required
+def analyze_recording(request, recording_id):
+    """Analyze a specific recording. ?profile=fast returns a quicker preview."""
+    recording = get_object_or_404(AudioRecording, id=recording_id, user=request.user)
+    profile = request.GET.get('profile', DEFAULT_ANALYSIS_PROFILE)
+    if profile not in ANALYSIS_PROFILES:
+        return JsonResponse({"error": f"profile must be one of: {', '.join(ANALYSIS_PROFILES)}"}, status=400)
+    
+    try:
+        # An earlier request may already have produced the analysis. An accurate analysis
+        # (including ones stored before profiles existed) serves any request; a live summary none.
+        analysis = SpeechAnalysis.objects.filter(recording=recording).first()
+        stored_profile = analysis.detailed_analysis.get("profile", "accurate") if analysis else None
+        if stored_profile in ('accurate', profile):
+            analysis_result = analysis.detailed_analysis
+        else:
+            analysis_result, artifacts_key = _run_analysis(recording, profile)
+            if not analysis_result:
+                return JsonResponse({"error": "Analysis failed"}, status=500)
+
+            _save_analysis(recording, analysis_result, artifacts_key)
 
         # Generate feedback
         feedback = generate_feedback_from_analysis(analysis_result)
@@ -206,6 +465,94 @@ def analyze_recording(request, recording_id):
     except Exception as e:
         return JsonResponse({"error": f"Analysis error: {str(e)}"}, status=500)
 
+def _analysis_with_artifacts(recording):
+    """
+    The recording's analysis, making sure it has playback artifacts. Analyses
+    from live feedback or from before artifacts existed get them built once here.
+    """
+    analysis = SpeechAnalysis.objects.filter(recording=recording).first()
+    if analysis and analysis.artifacts_key:
+        return analysis
+    profile = analysis.detailed_analysis.get("profile", DEFAULT_ANALYSIS_PROFILE) if analysis else DEFAULT_ANALYSIS_PROFILE
+    if profile not in ANALYSIS_PROFILES:
+        profile = DEFAULT_ANALYSIS_PROFILE  # live summaries; the live analyzer frames audio like this one
+    analysis_result, artifacts_key = _run_analysis(recording, profile)
+    if not analysis_result:
+        return None
+    if analysis is None:
+        return _save_analysis(recording, analysis_result, artifacts_key)
+    analysis.artifacts_key = artifacts_key
+    analysis.save(update_fields=['artifacts_key'])
+    return analysis
+
+def _artifact_response(request, analysis, variant, build):
+    """Serve one view of a recording's artifacts with an ETag, answering revalidations with 304"""
+    etag = quote_etag(f"{analysis.artifacts_key}:{variant}")
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(convert_numpy_types(build(load_artifacts(analysis.artifacts_key))))
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=ARTIFACT_MAX_AGE)
+    return response
+
+def _contour_values(values):
+    return [None if np.isnan(v) else round(v, 4) for v in values.astype(np.float64).tolist()]
+
+@login_required
+def recording_waveform(request, recording_id):
+    """
+    Waveform min/max peaks (int8, full scale 127) for one zoom level. Zoom 0 is
+    the coarsest; start/end (seconds) limit the response to a window.
+    """
+    recording = get_object_or_404(AudioRecording, id=recording_id, user=request.user)
+    try:
+        zoom = int(request.GET.get('zoom', 0))
+        start = float(request.GET.get('start', 0))
+        end = float(request.GET['end']) if request.GET.get('end') else None
+    except ValueError:
+        return JsonResponse({"error": "zoom must be an integer, start and end numbers of seconds"}, status=400)
+    if not (math.isfinite(start) and (end is None or math.isfinite(end))):
+        return JsonResponse({"error": "start and end must be finite numbers of seconds"}, status=400)
+    if not 0 <= zoom < len(WAVEFORM_PEAK_SAMPLES):
+        return JsonResponse({"error": f"zoom must be between 0 and {len(WAVEFORM_PEAK_SAMPLES) - 1}"}, status=400)
+
+    analysis = _analysis_with_artifacts(recording)
+    if analysis is None:
+        return JsonResponse({"error": "Analysis failed"}, status=500)
+
+    def build(artifacts):
+        seconds_per_peak = int(artifacts['peak_samples'][zoom]) / int(artifacts['sample_rate'])
+        peaks = artifacts[f'peaks_{zoom}']
+        first = min(len(peaks), max(0, int(start / seconds_per_peak)))
+        last = len(peaks) if end is None else max(first, min(len(peaks), int(np.ceil(end / seconds_per_peak))))
+        return {
+            "zoom": zoom,
+            "zoom_levels": len(WAVEFORM_PEAK_SAMPLES),
+            "duration": float(artifacts['duration']),
+            "seconds_per_peak": seconds_per_peak,
+            "start": first * seconds_per_peak,
+            "peaks": peaks[first:last].tolist(),
+        }
+
+    return _artifact_response(request, analysis, f"waveform:{zoom}:{start}:{end}", build)
+
+@login_required
+def recording_contours(request, recording_id):
+    """Loudness (RMS) and pitch (Hz, null while pausing) contours for playback"""
+    recording = get_object_or_404(AudioRecording, id=recording_id, user=request.user)
+    analysis = _analysis_with_artifacts(recording)
+    if analysis is None:
+        return JsonResponse({"error": "Analysis failed"}, status=500)
+
+    def build(artifacts):
+        return {
+            "duration": float(artifacts['duration']),
+            "loudness": {"rate": float(artifacts['loudness_rate']), "values": _contour_values(artifacts['loudness'])},
+            "pitch": {"rate": float(artifacts['pitch_rate']), "values": _contour_values(artifacts['pitch'])},
+        }
+
+    return _artifact_response(request, analysis, "contours", build)
+
 @login_required
 @csrf_exempt
 def submit_assessment(request):
@@ -223,9 +570,7 @@ def submit_assessment(request):
         recording = get_object_or_404(AudioRecording, id=data["recordingId"], user=request.user)
         
         # Get task if specified
-        task = None
-        if "taskId" in data:
-            task = SpeakingTask.objects.filter(task_id=data["taskId"]).first()
+        task = get_catalog().tasks_by_id.get(data.get("taskId"))
 
         # Create assessment
         assessment = UserAssessment.objects.create(
@@ -252,63 +597,167 @@ def submit_assessment(request):
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
+def _encode_session_cursor(session_date, session_id):
+    raw = f"{session_date.isoformat()}|{session_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_session_cursor(cursor):
+    """Return (session_date, id) from a cursor, or None if it is malformed"""
+    try:
+        session_date, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return parse_datetime(session_date), int(session_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
 @login_required
+@conditional('speech', private=True, no_cache=True)
+@query_budget(3)
 def get_progress_sessions(request):
-    """Get user's progress sessions"""
-    sessions = ProgressSession.objects.filter(user=request.user)
-    
-    session_data = []
-    for session in sessions:
-        task_name = session.assessment.task.title if session.assessment and session.assessment.task else "Free Practice"
-        
-        session_data.append({
-            "id": session.id,
-            "recording_id": session.recording.id,
-            "task_name": task_name,
-            "date": session.session_date.strftime("%Y-%m-%d"),
-            "timestamp": session.session_date.isoformat(),
-            "average_score": session.assessment.average_score if session.assessment else None,
-            "confidence": session.assessment.confidence if session.assessment else None,
-            "clarity": session.assessment.clarity if session.assessment else None,
-            "pace": session.assessment.pace if session.assessment else None,
-        })
+    """
+    Get a page of the user's progress sessions, newest first.
+    Pass the returned next_cursor back as ?cursor= to fetch the following page.
+    """
+    try:
+        page_size = int(request.GET.get('page_size', SESSION_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "Invalid page_size"}, status=400)
+    page_size = max(1, min(page_size, SESSION_MAX_PAGE_SIZE))
+
+    # (session_date, id) keyset pagination over the (user, session_date) index
+    sessions = ProgressSession.objects.filter(user=request.user).order_by('-session_date', '-id')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = _decode_session_cursor(cursor)
+        if not position or position[0] is None:
+            return JsonResponse({"error": "Invalid cursor"}, status=400)
+        session_date, session_id = position
+        sessions = sessions.filter(
+            Q(session_date__lt=session_date) | Q(session_date=session_date, id__lt=session_id)
+        )
+
+    # One query: the assessment and its task come in through joins
+    rows = list(sessions.values(
+        'id',
+        'recording_id',
+        'session_date',
+        'assessment__task__title',
+        'assessment__average_score',
+        'assessment__confidence',
+        'assessment__clarity',
+        'assessment__pace',
+    )[:page_size + 1])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _encode_session_cursor(rows[-1]['session_date'], rows[-1]['id'])
+
+    session_data = [{
+        "id": row['id'],
+        "recording_id": row['recording_id'],
+        "task_name": row['assessment__task__title'] or "Free Practice",
+        "date": row['session_date'].strftime("%Y-%m-%d"),
+        "timestamp": row['session_date'].isoformat(),
+        "average_score": row['assessment__average_score'],
+        "confidence": row['assessment__confidence'],
+        "clarity": row['assessment__clarity'],
+        "pace": row['assessment__pace'],
+    } for row in rows]
     
-    return JsonResponse({"sessions": session_data})
+    return JsonResponse({"sessions": session_data, "next_cursor": next_cursor})
 
 @login_required
+@conditional('speech', private=True, no_cache=True)
+@query_budget(3)
 def get_metric_history(request):
-    """Get user's metric history for charts"""
-    sessions = ProgressSession.objects.filter(
-        user=request.user,
-        analysis__isnull=False
-    ).order_by('session_date')
-    
-    history = []
-    for session in sessions:
-        if session.analysis:
-            history.append({
-                "date": session.session_date.strftime("%Y-%m-%d"),
-                "speech_rate": session.analysis.speech_rate or 0,
-                "pause_count": session.analysis.pause_count or 0,
-                "volume_variation": session.analysis.volume_variation or 0,
-                "pitch_variation": session.analysis.pitch_variation or 0,
-                "energy_level": session.analysis.energy_level or 0,
-            })
+    """
+    Get user's metric history for charts.
+
+    Query parameters:
+      bucket  - 'day', 'week' or 'month' to average sessions per period in the
+                database; each point then also carries <metric>_min/_max bands
+      points  - maximum number of points to return (default 500); longer series
+                are downsampled with LTTB, keeping the shape of `metric`
+      metric  - the metric whose shape drives downsampling (default speech_rate)
+      window  - add a trailing <metric>_ma moving average over this many points
+    """
+    bucket = request.GET.get('bucket')
+    metric = request.GET.get('metric', 'speech_rate')
+    if bucket and bucket not in METRIC_BUCKETS:
+        return JsonResponse({"error": f"bucket must be one of {', '.join(METRIC_BUCKETS)}"}, status=400)
+    if metric not in METRIC_FIELDS:
+        return JsonResponse({"error": f"metric must be one of {', '.join(METRIC_FIELDS)}"}, status=400)
+    try:
+        budget = int(request.GET.get('points', METRIC_POINT_BUDGET))
+        window = int(request.GET.get('window', 0))
+    except ValueError:
+        return JsonResponse({"error": "points and window must be integers"}, status=400)
+    budget = max(3, min(budget, METRIC_MAX_POINT_BUDGET))
+
+    sessions = ProgressSession.objects.filter(user=request.user, analysis__isnull=False)
+
+    if bucket:
+        aggregates = {'sessions': Count('id')}
+        for field in METRIC_FIELDS:
+            aggregates[field] = Avg(f'analysis__{field}')
+            aggregates[f'{field}_min'] = Min(f'analysis__{field}')
+            aggregates[f'{field}_max'] = Max(f'analysis__{field}')
+        rows = list(
+            sessions.annotate(period=METRIC_BUCKETS[bucket]('session_date'))
+            .values('period')
+            .annotate(**aggregates)
+            .order_by('period')
+        )
+        history = []
+        for row in rows:
+            point = {"date": row['period'].strftime("%Y-%m-%d"), "sessions": row['sessions']}
+            for field in METRIC_FIELDS:
+                point[field] = row[field] or 0
+                point[f'{field}_min'] = row[f'{field}_min'] or 0
+                point[f'{field}_max'] = row[f'{field}_max'] or 0
+            history.append(point)
+        timestamps = [row['period'].timestamp() for row in rows]
+    else:
+        rows = list(
+            sessions.order_by('session_date')
+            .values('session_date', *[f'analysis__{field}' for field in METRIC_FIELDS])
+        )
+        history = [{
+            "date": row['session_date'].strftime("%Y-%m-%d"),
+            **{field: row[f'analysis__{field}'] or 0 for field in METRIC_FIELDS},
+        } for row in rows]
+        timestamps = [row['session_date'].timestamp() for row in rows]
+
+    if window > 1 and history:
+        for field in METRIC_FIELDS:
+            averaged = moving_average([point[field] for point in history], window)
+            for point, value in zip(history, averaged):
+                point[f'{field}_ma'] = float(value)
+
+    total_points = len(history)
+    if total_points > budget:
+        keep = lttb_indices(timestamps, [point[metric] for point in history], budget)
+        history = [history[i] for i in keep]
     
-    return JsonResponse({"history": history})
+    return JsonResponse({
+        "history": history,
+        "bucket": bucket,
+        "total_points": total_points,
+        "downsampled": total_points > len(history),
+    })
 
 @login_required
 def practice_task(request, task_id):
     """Practice a specific speaking task"""
-    init_speaking_tasks()  # Ensure tasks are initialized
-    task = get_object_or_404(SpeakingTask, task_id=task_id)
+    catalog = get_catalog()
+    task = catalog.tasks_by_id.get(task_id)
+    if task is None:
+        raise Http404("No such speaking task")
     
     # Get random impromptu topic if this is an impromptu speech task
     impromptu_topic = None
     if task_id == "impromptu-speech":
-        topics = list(ImpromptuTopic.objects.filter(is_active=True))
-        if topics:
-            impromptu_topic = random.choice(topics).topic
+        impromptu_topic = catalog.random_topic()
     
     # Virtual scene options
     virtual_scenes = {
@@ -327,8 +776,11 @@ def practice_task(request, task_id):
 @login_required
 def get_random_topic(request):
     """API endpoint to get a random impromptu topic"""
-    topics = list(ImpromptuTopic.objects.filter(is_active=True))
-    if topics:
-        topic = random.choice(topics)
-        return JsonResponse({'topic': topic.topic})
-    return JsonResponse({'error': 'No topics available'}, status=404)
\ No newline at end of file
+    topic = get_catalog().random_topic()
+    if topic:
+        response = JsonResponse({'topic': topic})
+    else:
+        response = JsonResponse({'error': 'No topics available'}, status=404)
+    # Every call should draw a new topic, so nothing may cache or revalidate this
+    patch_cache_control(response, no_store=True)
+    return response
\ No newline at end of file